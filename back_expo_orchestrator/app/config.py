@@ -25,10 +25,94 @@ class Settings(BaseSettings):
     GEMINI_MODEL: str = "gemini-2.5-flash-preview-09-2025"
     GEMINI_API_URL: str = "https://generativelanguage.googleapis.com/v1beta/models"
     
+    # Cliente HTTP de Gemini (compartido, HTTP/2 + keep-alive)
+    GEMINI_HTTP2: bool = True
+    GEMINI_TIMEOUT: float = 30.0
+    GEMINI_MAX_CONNECTIONS: int = 20
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GEMINI_KEEPALIVE_EXPIRY: float = 30.0
+    
+    # Control de admisión: llamadas concurrentes a Gemini y cola de espera
+    GEMINI_MAX_CONCURRENT: int = 16
+    GEMINI_QUEUE_MAX_SIZE: int = 64
+    GEMINI_QUEUE_TIMEOUT: float = 10.0
+    GEMINI_RETRY_AFTER_SECONDS: int = 5
+    
+    # Precio de Gemini en USD por millón de tokens (costo estimado por turno)
+    GEMINI_PRICE_INPUT_PER_MTOK: float = 0.30
+    GEMINI_PRICE_OUTPUT_PER_MTOK: float = 2.50
+    
+    # RAG: "retrieval" inyecta solo los productos relevantes, "full" todo el catálogo
+    RAG_MODE: str = "retrieval"
+    RAG_TOP_K: int = 8
+    RAG_FULL_CATALOG_FALLBACK: bool = True
+    # Intervalo de revalidación condicional del catálogo (ETag); 0 la desactiva
+    RAG_REVALIDATE_SECONDS: float = 60.0
+    
+    # Feed de cambios de productos (long-polling a /products/changes)
+    CHANGE_FEED_ENABLED: bool = True
+    CHANGE_FEED_TIMEOUT: float = 25.0
+    CHANGE_FEED_RETRY_SECONDS: float = 5.0
+    
+    # Caché de resultados de herramientas (TTL en segundos)
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_STOCK_TTL: float = 10.0
+    TOOL_CACHE_PRICE_TTL: float = 300.0
+    TOOL_CACHE_SEARCH_TTL: float = 30.0
+    TOOL_CACHE_MAX_SIZE: int = 1000
+    
+    # Camino rápido sin LLM para consultas simples de stock/precio
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_MIN_CONFIDENCE: float = 0.8
+    FAST_PATH_MAX_PRODUCTS: int = 3
+    
+    # Caché de respuestas completas (preguntas repetidas)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: float = 300.0
+    RESPONSE_CACHE_MAX_SIZE: int = 500
+    RESPONSE_CACHE_HISTORY_TURNS: int = 2
+    
+    # Presupuesto de latencia por turno de chat (se propaga a herramientas y Gemini)
+    CHAT_DEADLINE_SECONDS: float = 25.0
+    
+    # Llamadas a productos: timeout por intento, reintentos con jitter y hedging (0 lo desactiva)
+    TOOL_TIMEOUT: float = 3.0
+    TOOL_MAX_RETRIES: int = 2
+    TOOL_RETRY_BACKOFF: float = 0.1
+    TOOL_HEDGE_DELAY_MS: float = 0.0
+    
+    # Circuit breaker del servicio de productos
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SECONDS: float = 10.0
+    
+    # Ventana de agrupación de consultas de productos (ms)
+    TOOL_BATCH_WINDOW_MS: float = 2.0
+    TOOL_BATCH_MAX_SIZE: int = 100
+    
+    # Sesiones en el servidor ("memory" o "sqlite")
+    SESSION_BACKEND: str = "memory"
+    SESSION_SQLITE_PATH: str = "sessions.db"
+    SESSION_MAX_SESSIONS: int = 10000
+    SESSION_MAX_MESSAGES: int = 200
+    SESSION_TTL_SECONDS: float = 86400.0
+    
+    # Calentamiento al arrancar (catálogo y conexiones) antes de /ready
+    WARMUP_ENABLED: bool = True
+    WARMUP_RETRY_SECONDS: float = 5.0
+    
     # Límites
     MAX_RECURSION_DEPTH: int = 5
     MAX_HISTORY_LENGTH: int = 20
     
+    # Compactación del historial (tokens estimados)
+    HISTORY_TOKEN_BUDGET: int = 2000
+    HISTORY_SUMMARY_MAX_TOKENS: int = 300
+    HISTORY_SUMMARY_FOLD_STEP: int = 6
+    HISTORY_SUMMARY_CACHE_SIZE: int = 1000
+    HISTORY_SUMMARY_TTL: float = 3600.0
+    # Tiempo máximo del resumen (y a lo sumo la mitad del presupuesto restante del turno)
+    HISTORY_SUMMARY_TIMEOUT: float = 5.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -2,13 +2,18 @@
 Microservicio Orquestador LLM
 Maneja conversaciones con Gemini y Tool Calling
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
+import asyncio
 import os
+import time
 
 from app.routers import chat
 from app.config import get_settings
+from app.metrics import render_metrics
 
 # Cargar variables de entorno
 load_dotenv()
@@ -16,13 +21,43 @@ load_dotenv()
 # Obtener configuración
 settings = get_settings()
 
+
+async def warm_up(app: FastAPI):
+    """Catálogo RAG y conexiones listos antes de marcar el servicio como listo"""
+    start = time.perf_counter()
+    await chat.gemini_service.warm_up()
+    app.state.ready = True
+    print(f"✅ Orquestador listo en {time.perf_counter() - start:.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la aplicación
+    Calienta el servicio en segundo plano (/ready responde 503 hasta
+    terminar), inicia la revalidación periódica del catálogo y el
+    seguimiento del feed de cambios de productos, y cierra los clientes
+    HTTP compartidos al apagar el servicio
+    """
+    app.state.ready = not settings.WARMUP_ENABLED
+    warmup_task = asyncio.create_task(warm_up(app)) if settings.WARMUP_ENABLED else None
+    chat.gemini_service.rag_service.start_revalidation()
+    chat.gemini_service.change_subscriber.start()
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await chat.gemini_service.close()
+    await chat.session_store.close()
+
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="LLM Orchestrator - Microservicio de Chat",
     description="Orquestador de conversaciones con Gemini usando RAG + Tool Calling",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -34,6 +69,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
 
 # Incluir routers
@@ -52,8 +88,11 @@ def root():
         "docs": "/docs",
         "endpoints": {
             "chat": "POST /api/chat",
+            "chat_stream": "POST /api/chat/stream",
             "reset": "POST /api/chat/reset",
-            "health": "GET /api/chat/health"
+            "health": "GET /api/chat/health",
+            "ready": "GET /ready",
+            "metrics": "GET /metrics"
         }
     }
 
@@ -69,6 +108,27 @@ def health_check():
     }
 
 
+@app.get("/ready")
+def readiness_check(response: Response):
+    """
+    Readiness: 200 cuando el catálogo está cargado y las conexiones con
+    productos y Gemini están abiertas, 503 mientras tanto
+    """
+    if not app.state.ready:
+        response.status_code = 503
+        return {"status": "starting"}
+    return {"status": "ready", "catalog_version": chat.gemini_service.rag_service.catalog_version}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Métricas en formato de texto de Prometheus
+    (latencia de Gemini por salto, latencia por herramienta, recursión y tokens)
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,221 @@
+"""
+Métricas en formato de texto de Prometheus
+Histogramas en memoria para latencia de Gemini por salto, latencia de
+herramientas, profundidad de recursión y tokens, más contadores y gauges
+del uso de Gemini (tokens, bytes de prompt y costo), del control de admisión,
+del circuit breaker y de los deadlines. Se exponen en /metrics
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+DEPTH_BUCKETS = (0, 1, 2, 3, 4, 5, 10)
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas (equivalente al de prometheus_client)"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # valores de etiquetas -> [conteo por bucket, suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str):
+        """Registra una observación"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        """Líneas en formato de texto de Prometheus"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total_sum, count) in sorted(self._series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {bucket_count}")
+            bucket_labels = ",".join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total_sum}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """Incrementa el valor"""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        """Líneas en formato de texto de Prometheus"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            labels = ",".join(f'{name}="{label}"' for name, label in zip(self.labelnames, key))
+            suffix = "{" + labels + "}" if labels else ""
+            lines.append(f"{self.name}{suffix} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Valor instantáneo con etiquetas (puede subir o bajar)"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        """Fija el valor"""
+        self._values[self._key(labels)] = value
+
+
+class Timer:
+    """Duración medida por timed()"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str):
+    """Mide el bloque y lo registra en el histograma"""
+    timer = Timer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        histogram.observe(timer.seconds, **labels)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Header Server-Timing a partir de duraciones por etapa en segundos"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en formato de texto de Prometheus"""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+REGISTRY: List[Histogram | Counter] = []
+
+LLM_LATENCY = Histogram(
+    "orchestrator_llm_request_duration_seconds",
+    "Latencia de cada llamada a Gemini por salto de recursión",
+    LATENCY_BUCKETS,
+    ("hop",)
+)
+TOOL_LATENCY = Histogram(
+    "orchestrator_tool_duration_seconds",
+    "Latencia de ejecución de cada herramienta",
+    LATENCY_BUCKETS,
+    ("tool",)
+)
+CHAT_LATENCY = Histogram(
+    "orchestrator_chat_duration_seconds",
+    "Latencia total de una petición de chat según cómo se resolvió",
+    LATENCY_BUCKETS,
+    ("path",)
+)
+RECURSION_DEPTH = Histogram(
+    "orchestrator_recursion_depth",
+    "Saltos de tool calling por petición",
+    DEPTH_BUCKETS
+)
+TOKENS_USED = Histogram(
+    "orchestrator_tokens_per_request",
+    "Tokens de Gemini por petición (suma de todos los saltos)",
+    TOKEN_BUCKETS,
+    ("kind",)
+)
+LLM_TOKENS = Counter(
+    "orchestrator_llm_tokens_total",
+    "Tokens de Gemini acumulados por tipo y salto",
+    ("kind", "hop")
+)
+PROMPT_BYTES = Counter(
+    "orchestrator_prompt_bytes_total",
+    "Bytes de prompt enviados a Gemini por sección",
+    ("section",)
+)
+LLM_COST = Counter(
+    "orchestrator_llm_cost_usd_total",
+    "Costo estimado de Gemini en USD por salto",
+    ("hop",)
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "orchestrator_single_flight_calls_total",
+    "Llamadas agrupadas por single flight (leader ejecuta, shared reutiliza)",
+    ("name", "role")
+)
+GEMINI_IN_FLIGHT = Gauge(
+    "orchestrator_gemini_in_flight",
+    "Llamadas a Gemini en curso"
+)
+GEMINI_QUEUE_DEPTH = Gauge(
+    "orchestrator_gemini_queue_depth",
+    "Llamadas a Gemini esperando un cupo"
+)
+GEMINI_QUEUE_WAIT = Histogram(
+    "orchestrator_gemini_queue_wait_seconds",
+    "Tiempo de espera por un cupo para llamar a Gemini",
+    LATENCY_BUCKETS,
+    ("priority",)
+)
+GEMINI_REJECTED = Counter(
+    "orchestrator_gemini_rejected_total",
+    "Llamadas a Gemini rechazadas por el control de admisión",
+    ("reason",)
+)
+CIRCUIT_STATE = Gauge(
+    "orchestrator_circuit_state",
+    "Estado del circuit breaker (0 closed, 1 half_open, 2 open)",
+    ("name",)
+)
+CIRCUIT_REJECTED = Counter(
+    "orchestrator_circuit_rejected_total",
+    "Llamadas rechazadas sin tocar la red por un circuito abierto",
+    ("name",)
+)
+PRODUCTS_RETRIES = Counter(
+    "orchestrator_products_retries_total",
+    "Reintentos de peticiones al servicio de productos"
+)
+PRODUCTS_HEDGES = Counter(
+    "orchestrator_products_hedged_total",
+    "Peticiones al servicio de productos que lanzaron un respaldo, por la que respondió primero",
+    ("winner",)
+)
+DEADLINE_EXCEEDED = Counter(
+    "orchestrator_deadline_exceeded_total",
+    "Etapas cortadas por el presupuesto de latencia del turno",
+    ("stage",)
+)
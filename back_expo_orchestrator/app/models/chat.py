@@ -10,7 +10,7 @@ class Message(BaseModel):
     """Modelo de mensaje en la conversación"""
     role: str = Field(..., description="Rol: 'user' o 'assistant'")
     content: str = Field(..., description="Contenido del mensaje")
-    timestamp: Optional[datetime] = Field(default_factory=datetime.now)
+    timestamp: Optional[datetime] = Field(default=None)
 
 
 class ChatRequest(BaseModel):
@@ -18,7 +18,15 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="Mensaje del usuario", min_length=1)
     conversation_history: List[Message] = Field(
         default_factory=list,
-        description="Historial de conversación previo"
+        description="Historial de conversación previo (no es necesario en modo sesión)"
+    )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="ID de sesión: el historial se toma del servidor y solo se envía el mensaje nuevo"
+    )
+    use_session: bool = Field(
+        default=False,
+        description="Inicia el modo sesión; la respuesta incluye el session_id a reutilizar"
     )
     
     class Config:
@@ -48,7 +56,15 @@ class ChatResponse(BaseModel):
     )
     tokens_used: Optional[Dict[str, int]] = Field(
         default=None,
-        description="Tokens utilizados en la llamada"
+        description="Tokens utilizados (suma de todos los saltos a Gemini)"
+    )
+    usage: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Desglose por salto: tokens, bytes del prompt por sección y costo estimado"
+    )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="ID de sesión (solo en modo sesión)"
     )
     
     class Config:
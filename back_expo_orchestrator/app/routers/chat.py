@@ -1,9 +1,16 @@
 """
 Router de Chat - Endpoint para conversación con el LLM
 """
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from app.metrics import server_timing_header
 from app.models.chat import ChatRequest, ChatResponse
+from app.services.admission import AdmissionRejected
 from app.services.gemini_service import GeminiService
+from app.services.session_store import create_session_store
 
 router = APIRouter(
     prefix="/api",
@@ -13,24 +20,74 @@ router = APIRouter(
 # Instancia global del servicio de Gemini
 gemini_service = GeminiService()
 
+# Historial de conversaciones en modo sesión
+session_store = create_session_store()
+
+
+async def resolve_history(request: ChatRequest) -> tuple[list[dict], Optional[str]]:
+    """
+    Historial a usar para la petición y el ID de sesión (si aplica)
+    
+    - Sin sesión: el historial enviado por el cliente
+    - Con session_id existente: el historial guardado en el servidor
+    - Con use_session o session_id expirado: una sesión nueva, inicializada
+      con el historial enviado por el cliente (si lo hay)
+    """
+    client_history = [
+        {"role": msg.role, "content": msg.content}
+        for msg in request.conversation_history
+    ]
+    
+    if request.session_id is None and not request.use_session:
+        return client_history, None
+    
+    if request.session_id is not None:
+        history = await session_store.get(request.session_id)
+        if history is not None:
+            return history, request.session_id
+    
+    session_id = await session_store.create()
+    if client_history:
+        await session_store.append(session_id, client_history)
+    return client_history, session_id
+
+
+async def save_turn(session_id: Optional[str], user_message: str, response: str):
+    """Guarda el turno (mensaje del usuario y respuesta) en la sesión"""
+    if session_id is None:
+        return
+    await session_store.append(session_id, [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": response}
+    ])
+
+
+def rejection_error(error: AdmissionRejected) -> HTTPException:
+    """429/503 con Retry-After para una llamada a Gemini no admitida"""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=error.detail,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest, response: Response) -> ChatResponse:
     """
     Endpoint principal de chat con el LLM
     
     - **message**: Mensaje del usuario
     - **conversation_history**: Historial de conversación previo (opcional)
+    - **session_id** / **use_session**: Modo sesión (historial guardado en el servidor)
     
     Returns:
-        Respuesta del asistente con metadata de funciones llamadas y tokens usados
+        Respuesta del asistente con metadata de funciones llamadas y tokens usados.
+        El header Server-Timing desglosa la duración por etapa (llm, tools, history, rag, total)
     """
+    start = time.perf_counter()
     try:
-        # Convertir historial al formato correcto
-        history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in request.conversation_history
-        ]
+        # Historial del cliente o de la sesión
+        history, session_id = await resolve_history(request)
         
         # Generar respuesta
         result = await gemini_service.generate_response(
@@ -38,12 +95,21 @@ async def chat(request: ChatRequest) -> ChatResponse:
             conversation_history=history
         )
         
+        await save_turn(session_id, request.message, result["response"])
+        
+        timings = {**result.get("timings", {}), "total": time.perf_counter() - start}
+        response.headers["Server-Timing"] = server_timing_header(timings)
+        
         return ChatResponse(
             response=result["response"],
             functions_called=result.get("functions_called"),
-            tokens_used=result.get("tokens_used")
+            tokens_used=result.get("tokens_used"),
+            usage=result.get("usage"),
+            session_id=session_id
         )
         
+    except AdmissionRejected as e:
+        raise rejection_error(e)
     except Exception as e:
         print(f"❌ Error en /api/chat: {str(e)}")
         raise HTTPException(
@@ -52,19 +118,87 @@ async def chat(request: ChatRequest) -> ChatResponse:
         )
 
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Endpoint de chat en streaming (Server-Sent Events)
+    
+    - **message**: Mensaje del usuario
+    - **conversation_history**: Historial de conversación previo (opcional)
+    - **session_id** / **use_session**: Modo sesión (historial guardado en el servidor)
+    
+    Eventos emitidos:
+    - **tool_call_start** / **tool_call_end**: ejecución de cada función
+    - **token**: fragmento de texto de la respuesta
+    - **done**: funciones llamadas, tokens usados, desglose de uso y session_id
+    - **error**: detalle del error si la generación falla
+    
+    Si Gemini no admite la petición antes del primer evento se responde
+    429/503 con Retry-After en lugar de abrir el stream
+    """
+    history, session_id = await resolve_history(request)
+    
+    events = gemini_service.stream_response(
+        user_message=request.message,
+        conversation_history=history
+    )
+    # Se espera el primer evento antes de enviar los headers del stream
+    try:
+        first_event = await anext(events, None)
+    except AdmissionRejected as e:
+        raise rejection_error(e)
+    except Exception as e:
+        first_event = e
+    
+    async def all_events():
+        if isinstance(first_event, Exception):
+            raise first_event
+        if first_event is not None:
+            yield first_event
+        async for event in events:
+            yield event
+    
+    async def event_stream():
+        try:
+            response_text = ""
+            async for event in all_events():
+                if event["event"] == "token":
+                    response_text += event["data"]["text"]
+                elif event["event"] == "done":
+                    await save_turn(session_id, request.message, response_text)
+                    event["data"]["session_id"] = session_id
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+        except AdmissionRejected as e:
+            error = {"detail": e.detail, "retry_after": e.retry_after}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            print(f"❌ Error en /api/chat/stream: {str(e)}")
+            error = {"detail": f"Error generando respuesta: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/chat/reset")
 async def reset_conversation():
     """
     Reinicia el contexto de la conversación
-    Limpia cachés y logs
+    Revalida el catálogo con una petición condicional (solo se descarga si
+    cambió) y limpia el caché de herramientas
     """
     try:
-        gemini_service.rag_service.clear_cache()
-        gemini_service.tool_executor.clear_log()
-        gemini_service.catalog_loaded = False
+        changed = await gemini_service.rag_service.revalidate()
+        gemini_service.tool_executor.invalidate_cache()
+        gemini_service.response_cache.clear()
+        gemini_service.catalog_loaded = True
         
         return {
             "message": "Conversación reiniciada exitosamente",
+            "catalog_changed": changed,
             "status": "success"
         }
     except Exception as e:
@@ -74,6 +208,52 @@ async def reset_conversation():
         )
 
 
+@router.delete("/chat/session/{session_id}")
+async def delete_session(session_id: str):
+    """
+    Elimina una sesión y su historial guardado en el servidor
+    """
+    if not await session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Sesión {session_id} no encontrada")
+    return {"message": "Sesión eliminada", "status": "success"}
+
+
+@router.get("/chat/cache/stats")
+async def cache_stats():
+    """
+    Métricas de los cachés de herramientas y de respuestas
+    (tamaño, aciertos, fallos, hit rate), de las llamadas agrupadas y del
+    feed de cambios de productos
+    """
+    return {
+        **gemini_service.tool_executor.cache_stats(),
+        "responses": gemini_service.response_cache.stats(),
+        "single_flight": {
+            "tools": gemini_service.tool_executor.flight.stats(),
+            "catalog": gemini_service.rag_service.flight.stats()
+        },
+        "change_feed": gemini_service.change_subscriber.stats()
+    }
+
+
+@router.post("/chat/cache/invalidate")
+async def invalidate_cache(product_id: Optional[str] = None):
+    """
+    Invalida los resultados de herramientas en caché
+    
+    - **product_id**: Producto a invalidar (opcional; sin él se limpia todo,
+      incluido el caché de respuestas)
+    """
+    gemini_service.tool_executor.invalidate_cache(product_id)
+    if product_id is None:
+        gemini_service.response_cache.clear()
+    return {
+        "message": "Caché invalidado",
+        "product_id": product_id,
+        "status": "success"
+    }
+
+
 @router.get("/chat/health")
 async def health_check():
     """
@@ -82,5 +262,7 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "LLM Orchestrator",
-        "catalog_loaded": gemini_service.catalog_loaded
+        "catalog_loaded": gemini_service.catalog_loaded,
+        "admission": gemini_service.admission.stats(),
+        "products_circuit": gemini_service.tool_executor.products.stats()
     }
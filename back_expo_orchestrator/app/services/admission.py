@@ -0,0 +1,156 @@
+"""
+Admission Control - Limita las llamadas concurrentes a Gemini
+Las llamadas que no encuentran cupo esperan en una cola acotada ordenada por
+prioridad. Si la cola está llena o la espera supera el timeout se rechazan de
+inmediato con un tiempo de reintento, en lugar de saturar la API de Gemini
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from app.config import get_settings
+from app.metrics import GEMINI_IN_FLIGHT, GEMINI_QUEUE_DEPTH, GEMINI_QUEUE_WAIT, GEMINI_REJECTED
+
+settings = get_settings()
+
+# Prioridades (menor = se atiende antes)
+PRIORITY_CONTINUATION = 0   # saltos de tool calling de una conversación ya iniciada
+PRIORITY_NEW = 1            # primera llamada de una petición nueva
+PRIORITY_BACKGROUND = 2     # resúmenes del historial (tienen alternativa sin LLM)
+
+PRIORITY_NAMES = {
+    PRIORITY_CONTINUATION: "continuation",
+    PRIORITY_NEW: "new",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class AdmissionRejected(Exception):
+    """La llamada no fue admitida; status_code y retry_after van a la respuesta HTTP"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str, reason: str = ""):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+        # queue_full, timeout o upstream_429 (igual que la etiqueta de GEMINI_REJECTED)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Semáforo con cola de espera acotada y prioridades"""
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None
+    ):
+        self.max_concurrent = max_concurrent or settings.GEMINI_MAX_CONCURRENT
+        self.max_queue = settings.GEMINI_QUEUE_MAX_SIZE if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout or settings.GEMINI_QUEUE_TIMEOUT
+        self.active = 0
+        self.queued = 0
+        # Heap de (prioridad, orden de llegada, future); las entradas canceladas se descartan al liberar
+        self._waiters: list = []
+        self._order = itertools.count()
+        # Promedio móvil de cuánto se retiene un cupo (para estimar Retry-After)
+        self.avg_hold_seconds = 1.0
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NEW, timeout: Optional[float] = None):
+        """
+        Reserva un cupo durante el bloque
+
+        Args:
+            priority: Prioridad de la petición (menor = antes)
+            timeout: Espera máxima en cola (por defecto GEMINI_QUEUE_TIMEOUT)
+
+        Raises:
+            AdmissionRejected: 429 si la cola está llena, 503 si la espera
+                supera el timeout
+        """
+        await self._acquire(priority, self.queue_timeout if timeout is None else timeout)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - start
+            self.avg_hold_seconds = 0.8 * self.avg_hold_seconds + 0.2 * held
+            self._release()
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se libere la cola"""
+        estimate = self.avg_hold_seconds * (self.queued + 1) / self.max_concurrent
+        return max(1, min(60, math.ceil(estimate)))
+
+    def stats(self) -> dict:
+        """Estado actual del control de admisión"""
+        return {
+            "in_flight": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "avg_hold_seconds": round(self.avg_hold_seconds, 3)
+        }
+
+    async def _acquire(self, priority: int, timeout: float):
+        priority_name = PRIORITY_NAMES.get(priority, str(priority))
+
+        if self.active < self.max_concurrent and self.queued == 0:
+            self.active += 1
+            GEMINI_IN_FLIGHT.set(self.active)
+            GEMINI_QUEUE_WAIT.observe(0.0, priority=priority_name)
+            return
+
+        if self.queued >= self.max_queue:
+            GEMINI_REJECTED.inc(reason="queue_full")
+            print(f"🚦 Cola de Gemini llena ({self.queued}), petición rechazada")
+            raise AdmissionRejected(429, self.retry_after(), "Demasiadas peticiones, intenta más tarde", "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self.queued += 1
+        GEMINI_QUEUE_DEPTH.set(self.queued)
+        start = time.perf_counter()
+
+        try:
+            done, _ = await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            # El cliente se desconectó: si el cupo ya se había transferido, devolverlo
+            self._abandon(future)
+            raise
+        finally:
+            GEMINI_QUEUE_WAIT.observe(time.perf_counter() - start, priority=priority_name)
+
+        if not done:
+            self._abandon(future)
+            GEMINI_REJECTED.inc(reason="timeout")
+            print(f"🚦 Timeout esperando cupo para Gemini ({timeout:.1f}s)")
+            raise AdmissionRejected(503, self.retry_after(), "Servicio saturado, intenta más tarde", "timeout")
+
+    def _abandon(self, future: asyncio.Future):
+        """Retira una espera de la cola (o libera el cupo si ya se le había asignado)"""
+        if future.done() and not future.cancelled():
+            self._release()
+            return
+        future.cancel()
+        self.queued -= 1
+        GEMINI_QUEUE_DEPTH.set(self.queued)
+
+    def _release(self):
+        """Transfiere el cupo al siguiente en la cola por prioridad o lo libera"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.queued -= 1
+            GEMINI_QUEUE_DEPTH.set(self.queued)
+            future.set_result(True)
+            return
+
+        self.active -= 1
+        GEMINI_IN_FLIGHT.set(self.active)
@@ -0,0 +1,111 @@
+"""
+Change Subscriber - Sigue el feed de cambios del servicio de productos
+Con long-polling sobre /products/changes invalida solo las entradas de caché
+de los productos que cambiaron y actualiza el índice RAG en el lugar, en vez
+de esperar a que venzan los TTL o a la revalidación periódica del catálogo
+"""
+import asyncio
+import httpx
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.services.rag_service import RAGService
+from app.services.response_cache import ResponseCache
+from app.services.tool_executor import ToolExecutor
+
+settings = get_settings()
+
+
+class ChangeSubscriber:
+    """Consumidor del feed de cambios de productos"""
+
+    def __init__(self, tool_executor: ToolExecutor, rag_service: RAGService, response_cache: ResponseCache):
+        self.products_api_url = settings.PRODUCTS_API_URL
+        self.tool_executor = tool_executor
+        self.rag_service = rag_service
+        self.response_cache = response_cache
+        # Margen sobre la espera del servidor para no cortar el long-polling
+        self.client = httpx.AsyncClient(timeout=settings.CHANGE_FEED_TIMEOUT + 10.0)
+        self.version: Optional[int] = None
+        self.applied = 0
+        self.resets = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Inicia el seguimiento del feed (CHANGE_FEED_ENABLED)"""
+        if settings.CHANGE_FEED_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Detiene el seguimiento del feed"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.rag_service.change_feed_healthy = False
+
+    async def _loop(self):
+        """Long-polling continuo; ante errores espera CHANGE_FEED_RETRY_SECONDS"""
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"⚠️ Error siguiendo el feed de cambios: {e}")
+                # Sin feed se vuelve a la revalidación periódica del catálogo
+                self.rag_service.change_feed_healthy = False
+                await asyncio.sleep(settings.CHANGE_FEED_RETRY_SECONDS)
+
+    async def poll(self):
+        """Espera el siguiente lote de cambios y lo aplica"""
+        params: Dict[str, Any] = {}
+        if self.version is not None:
+            params = {"since": self.version, "timeout": settings.CHANGE_FEED_TIMEOUT}
+
+        response = await self.client.get(f"{self.products_api_url}/products/changes", params=params)
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("reset"):
+            await self._reset()
+        elif self.version is not None:
+            self.apply(data)
+        self.version = data["version"]
+        self.rag_service.change_feed_healthy = True
+
+    def apply(self, data: Dict[str, Any]):
+        """Invalida los productos cambiados y actualiza el índice RAG"""
+        changes = data.get("changes", [])
+        if not changes:
+            return
+
+        for change in changes:
+            self.tool_executor.invalidate_cache(change["product_id"])
+        # La versión del catálogo forma parte de la clave del caché de respuestas
+        self.rag_service.apply_changes(changes, data["version"])
+        self.applied += len(changes)
+
+    async def _reset(self):
+        """El feed se reinició (base recreada): se descarta todo lo derivado del catálogo"""
+        print("📡 Feed de productos reiniciado, recargando el catálogo")
+        self.resets += 1
+        self.tool_executor.invalidate_cache()
+        self.response_cache.clear()
+        await self.rag_service.revalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del seguimiento del feed"""
+        return {
+            "enabled": settings.CHANGE_FEED_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "healthy": self.rag_service.change_feed_healthy,
+            "version": self.version,
+            "applied": self.applied,
+            "resets": self.resets
+        }
+
+    async def close(self):
+        """Detiene el seguimiento y cierra el cliente HTTP"""
+        await self.stop()
+        await self.client.aclose()
@@ -0,0 +1,114 @@
+"""
+Chat Context - Estado de una única petición de chat
+Permite que una sola instancia de GeminiService atienda conversaciones concurrentes
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class Deadline:
+    """Instante límite de un turno de chat (presupuesto de latencia)"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = settings.CHAT_DEADLINE_SECONDS if seconds is None else seconds
+        self.expires_at = time.monotonic() + self.seconds
+
+    def remaining(self) -> float:
+        """Segundos restantes (0 si ya venció)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """Timeout para una etapa: el menor entre su límite propio y lo que queda del turno"""
+        return min(cap, self.remaining())
+
+
+# Deadline del turno que ejecuta una herramienta. Lo lee ProductsClient para
+# acotar timeouts y reintentos; las tareas de single flight y del batcher lo
+# heredan de quien las creó
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+class ChatContext:
+    """Estado por petición: log de herramientas, tokens y recursión"""
+
+    def __init__(self, max_recursion: int = None, deadline: Optional[Deadline] = None):
+        self.execution_log: list[Dict[str, Any]] = []
+        self.tokens_used: Dict[str, int] = {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0
+        }
+        self.remaining_recursion = (
+            settings.MAX_RECURSION_DEPTH if max_recursion is None else max_recursion
+        )
+        # System Prompt calculado una vez por petición y reutilizado en cada recursión
+        self.system_instruction: str | None = None
+        # Llamadas a Gemini hechas en esta petición (salto actual del loop)
+        self.llm_calls = 0
+        # Duración acumulada por etapa (llm, tools, history...) para Server-Timing
+        self.timings: Dict[str, float] = {}
+        # Herramientas que fallaron (no quedan en el log); sus respuestas no se cachean
+        self.tool_errors = 0
+        # Presupuesto de latencia del turno (se crea al recibir la petición)
+        self.deadline = deadline or Deadline()
+        # El turno se cortó por el deadline (respuesta parcial, no se cachea)
+        self.deadline_exceeded = False
+        # Uso de Gemini por salto: tokens, bytes del prompt por sección y costo
+        self.usage_by_hop: list[Dict[str, Any]] = []
+        # Bytes del System Prompt por sección (system, catalog, history), fijos en todo el loop
+        self.instruction_bytes: Dict[str, int] = {}
+        # Turnos de historial al inicio de contents (el resto son el mensaje y las herramientas)
+        self.history_turns = 0
+
+    def log_execution(self, name: str, args: Dict[str, Any], result: Dict[str, Any]):
+        """Registra la ejecución de una herramienta"""
+        self.execution_log.append({
+            "name": name,
+            "args": args,
+            "result": result
+        })
+
+    def record_usage(self, tokens: Dict[str, int], prompt_bytes: Dict[str, int], cost_usd: float):
+        """Registra el uso de un salto y lo suma al total de la petición"""
+        self.usage_by_hop.append({
+            "hop": len(self.usage_by_hop) + 1,
+            **tokens,
+            "prompt_bytes": prompt_bytes,
+            "cost_usd": round(cost_usd, 6)
+        })
+        for kind, count in tokens.items():
+            self.tokens_used[kind] = self.tokens_used.get(kind, 0) + count
+
+    def usage(self) -> Dict[str, Any]:
+        """Desglose del uso de la petición: saltos, bytes por sección y costo total"""
+        prompt_bytes: Dict[str, int] = {}
+        for hop in self.usage_by_hop:
+            for section, size in hop["prompt_bytes"].items():
+                prompt_bytes[section] = prompt_bytes.get(section, 0) + size
+        return {
+            "hops": self.usage_by_hop,
+            "prompt_bytes": prompt_bytes,
+            "cost_usd": round(sum(hop["cost_usd"] for hop in self.usage_by_hop), 6)
+        }
+
+    def add_timing(self, stage: str, seconds: float):
+        """Acumula la duración de una etapa"""
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def has_tool_errors(self) -> bool:
+        """
+        True si alguna herramienta falló: por excepción o timeout (tool_errors)
+        o con un resultado {"error": ...} (backend caído, producto no encontrado)
+        """
+        return self.tool_errors > 0 or any("error" in entry["result"] for entry in self.execution_log)
+
+    def get_execution_log(self) -> list[Dict[str, Any]]:
+        """Retorna el log de ejecuciones de esta petición"""
+        return self.execution_log
@@ -0,0 +1,83 @@
+"""
+Circuit Breaker - Falla rápido cuando un servicio externo no responde
+Tras CIRCUIT_FAILURE_THRESHOLD fallos consecutivos el circuito se abre y las
+llamadas se rechazan sin tocar la red. Pasado CIRCUIT_RESET_SECONDS se deja
+pasar una llamada de prueba (half-open): si funciona el circuito se cierra,
+si falla vuelve a abrirse
+"""
+import time
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.metrics import CIRCUIT_STATE, CIRCUIT_REJECTED
+
+settings = get_settings()
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Valor del gauge por estado
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Circuito por servicio externo (closed -> open -> half_open -> closed)"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.CIRCUIT_RESET_SECONDS
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_started = 0.0
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], name=name)
+
+    def allow(self) -> bool:
+        """True si la llamada puede hacerse; False si el circuito la rechaza"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and time.monotonic() - self._probe_started >= self.reset_timeout:
+            # Una sola llamada de prueba a la vez (o una nueva si la anterior nunca terminó)
+            self._probe_started = time.monotonic()
+            return True
+
+        self.rejected += 1
+        CIRCUIT_REJECTED.inc(name=self.name)
+        return False
+
+    def record_success(self):
+        """La llamada funcionó: se cierra el circuito"""
+        self.failures = 0
+        if self.state != CLOSED:
+            print(f"🟢 Circuito {self.name} cerrado")
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        """La llamada falló: abre el circuito al superar el umbral o si falló la prueba"""
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            print(f"🔴 Circuito {self.name} abierto tras {self.failures} fallos")
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.set(STATE_VALUES[state], name=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado actual del circuito"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected
+        }
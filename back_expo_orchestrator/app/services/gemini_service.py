@@ -2,15 +2,47 @@
 Gemini Service - Maneja las llamadas al API de Gemini
 Implementa RAG + Tool Calling con recursión
 """
+import asyncio
+import json
+import time
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from app.config import get_settings
+from app.metrics import (
+    LLM_LATENCY, CHAT_LATENCY, RECURSION_DEPTH, TOKENS_USED, LLM_TOKENS, PROMPT_BYTES, LLM_COST,
+    GEMINI_REJECTED, DEADLINE_EXCEEDED, timed
+)
 from app.schemas.tools import TOOL_SCHEMAS
 from app.services.tool_executor import ToolExecutor
 from app.services.rag_service import RAGService
+from app.services.chat_context import ChatContext, Deadline
+from app.services.history_manager import HistoryManager
+from app.services.response_cache import ResponseCache
+from app.services.intent_router import IntentRouter
+from app.services.single_flight import SingleFlight
+from app.services.change_subscriber import ChangeSubscriber
+from app.services.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    PRIORITY_BACKGROUND,
+    PRIORITY_CONTINUATION,
+    PRIORITY_NEW,
+)
 
 settings = get_settings()
 
+# Respuesta cuando se agota el presupuesto del turno (CHAT_DEADLINE_SECONDS)
+DEADLINE_MESSAGE = "No pude completar la consulta a tiempo. Por favor intenta de nuevo en unos momentos."
+
+
+def _json_bytes(value: Any) -> int:
+    """Tamaño en bytes de un fragmento del payload serializado (0 si está vacío)"""
+    return len(json.dumps(value, ensure_ascii=False).encode()) if value else 0
+
+
+# Las declaraciones de herramientas viajan idénticas en cada salto
+TOOL_SCHEMAS_BYTES = _json_bytes(TOOL_SCHEMAS)
+
 
 class GeminiService:
     """Servicio para interactuar con Gemini API"""
@@ -18,23 +50,94 @@ class GeminiService:
     def __init__(self):
         self.api_key = settings.GEMINI_API_KEY
         self.api_url = f"{settings.GEMINI_API_URL}/{settings.GEMINI_MODEL}:generateContent"
+        self.stream_url = f"{settings.GEMINI_API_URL}/{settings.GEMINI_MODEL}:streamGenerateContent"
+        # Cliente compartido: reutiliza conexiones TCP/TLS entre llamadas
+        self.client = httpx.AsyncClient(
+            http2=settings.GEMINI_HTTP2,
+            timeout=settings.GEMINI_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GEMINI_KEEPALIVE_EXPIRY
+            )
+        )
         self.tool_executor = ToolExecutor()
         self.rag_service = RAGService()
+        self.history_manager = HistoryManager(self.summarize_history)
+        self.response_cache = ResponseCache()
+        self.intent_router = IntentRouter()
+        # Invalidación por producto a partir del feed de cambios
+        self.change_subscriber = ChangeSubscriber(self.tool_executor, self.rag_service, self.response_cache)
+        # Límite de llamadas concurrentes a Gemini con cola acotada
+        self.admission = AdmissionController()
         self.catalog_loaded = False
+        self.startup = SingleFlight("initialize")
     
     async def initialize(self):
-        """Inicializa el servicio cargando el catálogo"""
+        """
+        Inicializa el servicio cargando el catálogo
+        Las peticiones concurrentes de un arranque en frío esperan la misma carga
+        """
         if not self.catalog_loaded:
-            print("📚 Cargando catálogo para RAG...")
+            await self.startup.do("catalog", self._load_catalog)
+    
+    async def warm_up(self):
+        """
+        Calienta el servicio antes de recibir tráfico: catálogo RAG (y la
+        conexión al backend de productos), conexión de las herramientas y
+        conexión con Gemini, en paralelo
+        """
+        await asyncio.gather(
+            self._warm_up_catalog(),
+            self.tool_executor.warm_up(),
+            self._warm_up_gemini()
+        )
+    
+    async def _warm_up_catalog(self):
+        """Carga el catálogo reintentando hasta que el backend de productos responda"""
+        while self.rag_service.catalog_cache is None:
             await self.rag_service.load_catalog()
-            self.catalog_loaded = True
-            print("✅ Catálogo cargado")
+            if self.rag_service.catalog_cache is None:
+                await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+        self.catalog_loaded = True
+    
+    async def _warm_up_gemini(self):
+        """
+        Abre la conexión HTTP/2 con Gemini consultando los metadatos del
+        modelo (no genera contenido ni consume tokens)
+        """
+        try:
+            await self.client.get(f"{settings.GEMINI_API_URL}/{settings.GEMINI_MODEL}?key={self.api_key}")
+        except httpx.HTTPError as e:
+            print(f"⚠️ No se pudo precalentar la conexión con Gemini: {e}")
+    
+    async def _load_catalog(self):
+        """Carga el catálogo para RAG"""
+        print("📚 Cargando catálogo para RAG...")
+        await self.rag_service.load_catalog()
+        self.catalog_loaded = True
+        print("✅ Catálogo cargado")
     
-    def get_system_instruction(self) -> str:
+    def get_system_instruction(
+        self,
+        query: str = "",
+        history_summary: Optional[str] = None,
+        catalog: Optional[str] = None
+    ) -> str:
         """
         Genera el System Prompt con RAG integrado
+        
+        Args:
+            query: Texto usado para recuperar los productos relevantes del turno
+            history_summary: Resumen de los turnos antiguos de la conversación
+            catalog: Contexto del catálogo ya recuperado (si no, se recupera con query)
         """
-        catalog = self.rag_service.catalog_cache or "Catálogo no disponible"
+        if catalog is None:
+            catalog = self.rag_service.get_context(query) or "Catálogo no disponible"
+        summary = (
+            f"\nRESUMEN DE LA CONVERSACIÓN PREVIA:\n{history_summary}\n"
+            if history_summary else ""
+        )
         
         return f"""
 Eres un Agente de Soporte de Pedidos de una tienda de tecnología.
@@ -44,7 +147,7 @@ Siempre mantente profesional y amigable.
 {catalog}
 
 IMPORTANTE - USO DE HERRAMIENTAS:
-- La lista anterior es SOLO REFERENCIA para conocer qué productos existen
+- La lista anterior es SOLO REFERENCIA de productos relacionados con la consulta
 - Para verificar STOCK en tiempo real, SIEMPRE usa la herramienta verificar_stock(product_id)
 - Para BUSCAR productos específicos, usa la herramienta buscar_productos(query)
 - Para consultar PRECIO actualizado, usa la herramienta consultar_precio(product_id)
@@ -66,7 +169,15 @@ RESTRICCIONES:
 - Solo respondes sobre productos de tecnología
 - No hablas de otros temas (deportes, cocina, etc.)
 - Siempre usas las herramientas para datos actualizados
-"""
+{summary}"""
+    
+    def build_retrieval_query(self, user_message: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Texto para la recuperación: el mensaje actual más el último intercambio,
+        para que preguntas de seguimiento ("¿y su precio?") mantengan el producto
+        """
+        recent = [msg["content"] for msg in messages[-2:]]
+        return " ".join([*recent, user_message])
     
     def format_conversation_history(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """
@@ -94,119 +205,608 @@ RESTRICCIONES:
             conversation_history: Historial de conversación previo
             
         Returns:
-            Dict con la respuesta y metadata
+            Dict con la respuesta, metadata y duración por etapa ("timings")
         """
-        # Asegurar que el catálogo esté cargado
+        start = time.perf_counter()
+        # Presupuesto de latencia del turno: cubre herramientas y saltos a Gemini
+        deadline = Deadline()
         await self.initialize()
         
-        # Limpiar log de ejecuciones previas
-        self.tool_executor.clear_log()
+        # Consultas simples de stock/precio: respuesta directa sin LLM
+        fast = await self._try_fast_path(user_message, deadline)
+        if fast is not None:
+            CHAT_LATENCY.observe(time.perf_counter() - start, path="fast_path")
+            return fast
         
-        # Preparar historial
-        history = self.format_conversation_history(conversation_history or [])
+        # Preguntas repetidas: respuesta en caché si sus datos siguen vigentes
+        cache_key = self.response_cache.make_key(
+            user_message, conversation_history or [], self.rag_service.catalog_version
+        )
+        cached = await self._get_cached_response(cache_key, deadline)
+        if cached is not None:
+            CHAT_LATENCY.observe(time.perf_counter() - start, path="cache")
+            return cached
         
-        # Construir contenido
-        contents = [
-            *history,
-            {"role": "user", "parts": [{"text": user_message}]}
-        ]
+        context, contents = await self._prepare_request(user_message, conversation_history, deadline)
         
         # Primera llamada a Gemini
-        response_text, tokens_used = await self._call_gemini_with_tools(contents)
+        response_text = await self._call_gemini_with_tools(contents, context)
         
-        return {
+        result = {
             "response": response_text,
-            "functions_called": self.tool_executor.get_execution_log(),
-            "tokens_used": tokens_used
+            "functions_called": context.get_execution_log(),
+            "tokens_used": context.tokens_used,
+            "usage": context.usage(),
+            "timings": context.timings
         }
+        if not context.has_tool_errors() and not context.deadline_exceeded:
+            self.response_cache.set(cache_key, result)
+        
+        CHAT_LATENCY.observe(time.perf_counter() - start, path="llm")
+        self._observe_usage(context)
+        return result
     
-    async def _call_gemini_with_tools(
-        self,
-        contents: List[Dict[str, Any]],
-        max_recursion: int = None
-    ) -> tuple[str, Dict[str, int]]:
+    def _observe_usage(self, context: ChatContext):
+        """Registra profundidad de recursión y tokens de una petición que usó el LLM"""
+        RECURSION_DEPTH.observe(max(0, context.llm_calls - 1))
+        for kind, count in context.tokens_used.items():
+            TOKENS_USED.observe(count, kind=kind.removesuffix("_tokens"))
+    
+    async def _get_cached_response(self, cache_key: tuple, deadline: Deadline) -> Optional[Dict[str, Any]]:
         """
-        Llama a Gemini API con soporte para Tool Calling recursivo
+        Respuesta en caché validada contra los datos actuales
+        
+        Se vuelven a ejecutar las herramientas que se usaron para generarla
+        (pasan por el caché de herramientas y el batching); si algún resultado
+        de stock o precio cambió, la entrada se invalida y se retorna None
+        """
+        cached = self.response_cache.get(cache_key)
+        if cached is None:
+            return None
+        
+        functions_called = cached["functions_called"]
+        context = ChatContext(deadline=deadline)
+        start = time.perf_counter()
+        current_results = await asyncio.gather(*(
+            self.tool_executor.execute(f["name"], f["args"], context)
+            for f in functions_called
+        ))
+        tools_seconds = time.perf_counter() - start
+        
+        # Sin datos actuales no se puede validar la entrada (pero sigue en caché)
+        if context.has_tool_errors():
+            return None
+        
+        if any(f["result"] != current for f, current in zip(functions_called, current_results)):
+            print("♻️ Respuesta en caché invalidada: cambiaron los datos de herramientas")
+            self.response_cache.invalidate(cache_key)
+            return None
+        
+        print("⚡ Respuesta servida desde caché")
+        return {
+            "response": cached["response"],
+            "functions_called": [dict(f) for f in functions_called],
+            "tokens_used": context.tokens_used,
+            "usage": context.usage(),
+            "timings": {"tools": tools_seconds}
+        }
+    
+    async def _try_fast_path(self, user_message: str, deadline: Deadline) -> Optional[Dict[str, Any]]:
+        """
+        Resuelve consultas simples ("¿hay stock de S001?", "precio de M005")
+        llamando directamente al ToolExecutor y usando una plantilla (0 tokens)
         
         Returns:
-            Tupla (respuesta_texto, tokens_usados)
+            Resultado con el formato de generate_response, o None si el
+            mensaje no califica o alguna herramienta falla (se usa el LLM)
         """
-        if max_recursion is None:
-            max_recursion = settings.MAX_RECURSION_DEPTH
+        intent = self.intent_router.route(user_message)
+        if intent is None:
+            return None
+        
+        # Con el catálogo cargado, un ID que no existe va al LLM ("¿tienen A100?")
+        known_ids = {p["id"] for p in self.rag_service.products}
+        if known_ids and not known_ids.issuperset(intent["product_ids"]):
+            return None
+        
+        context = ChatContext(deadline=deadline)
+        calls = [(rule, pid) for pid in intent["product_ids"] for rule in intent["rules"]]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            self.tool_executor.execute(rule.tool, {"product_id": pid}, context)
+            for rule, pid in calls
+        ))
+        context.add_timing("tools", time.perf_counter() - start)
+        
+        if context.has_tool_errors():
+            print("↩️ Camino rápido descartado, se continúa con el LLM")
+            return None
+        
+        # Nombres desde el catálogo del RAG o desde los resultados de stock
+        names = {p["id"]: p["name"] for p in self.rag_service.products}
+        for (_, pid), result in zip(calls, results):
+            names.setdefault(pid, result.get("product_name"))
+        response = " ".join(
+            rule.render(result, names.get(pid))
+            for (rule, pid), result in zip(calls, results)
+        )
         
+        intents = ", ".join(rule.name for rule in intent["rules"])
+        print(f"⚡ Camino rápido sin LLM ({intents}, confianza {intent['confidence']})")
+        return {
+            "response": response,
+            "functions_called": context.get_execution_log(),
+            "tokens_used": context.tokens_used,
+            "usage": context.usage(),
+            "timings": context.timings
+        }
+    
+    async def _prepare_request(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        deadline: Deadline
+    ) -> tuple[ChatContext, List[Dict[str, Any]]]:
+        """
+        Prepara el contexto y el contenido inicial de una petición
+        
+        - Asegura que el catálogo esté cargado
+        - Compacta el historial al presupuesto de tokens (resumen + turnos recientes)
+        - Calcula el System Prompt una sola vez para todo el loop de herramientas
+        """
+        await self.initialize()
+        
+        messages = conversation_history or []
+        
+        # Estado propio de esta petición (aislado de peticiones concurrentes)
+        context = ChatContext(deadline=deadline)
+        
+        start = time.perf_counter()
+        history_summary, recent = await self.history_manager.compact(messages, deadline)
+        context.add_timing("history", time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        query = self.build_retrieval_query(user_message, messages)
+        catalog = self.rag_service.get_context(query) or "Catálogo no disponible"
+        context.system_instruction = self.get_system_instruction(query, history_summary, catalog)
+        context.add_timing("rag", time.perf_counter() - start)
+        
+        # Atribución de bytes del System Prompt (el resto son instrucciones fijas)
+        catalog_bytes = len(catalog.encode())
+        summary_bytes = len(history_summary.encode()) if history_summary else 0
+        context.instruction_bytes = {
+            "system": len(context.system_instruction.encode()) - catalog_bytes - summary_bytes,
+            "catalog": catalog_bytes,
+            "history": summary_bytes
+        }
+        context.history_turns = len(recent)
+        
+        contents = [
+            *self.format_conversation_history(recent),
+            {"role": "user", "parts": [{"text": user_message}]}
+        ]
+        return context, contents
+    
+    async def summarize_history(self, text: str, timeout: Optional[float] = None) -> str:
+        """
+        Resume turnos antiguos de la conversación con Gemini (sin herramientas)
+        Lo invoca HistoryManager solo cuando el resumen no está en caché
+        
+        Args:
+            text: Conversación a resumir
+            timeout: Espera máxima en cola y de la llamada (por defecto GEMINI_QUEUE_TIMEOUT / GEMINI_TIMEOUT)
+        """
         payload = {
+            "contents": [{"role": "user", "parts": [{"text": text}]}],
+            "systemInstruction": {"parts": [{"text": (
+                "Resume la siguiente conversación entre un cliente y un agente de soporte "
+                "de una tienda de tecnología. Conserva IDs de productos, precios, stock, "
+                "preferencias y preguntas pendientes del cliente. Responde solo con el resumen."
+            )}]},
+            "generationConfig": {
+                "temperature": 0.2,
+                "maxOutputTokens": settings.HISTORY_SUMMARY_MAX_TOKENS,
+            }
+        }
+        
+        async with self.admission.slot(PRIORITY_BACKGROUND, timeout):
+            with timed(LLM_LATENCY, hop="summary"):
+                response = await self.client.post(
+                    f"{self.api_url}?key={self.api_key}",
+                    json=payload,
+                    timeout=settings.GEMINI_TIMEOUT if timeout is None else timeout
+                )
+                self._raise_for_status(response)
+        result = response.json()
+        
+        tokens = self._parse_tokens(result.get("usageMetadata", {}))
+        for kind, count in tokens.items():
+            LLM_TOKENS.inc(count, kind=kind.removesuffix("_tokens"), hop="summary")
+        LLM_COST.inc(self._cost_usd(tokens), hop="summary")
+        
+        parts = result.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+        summary = "".join(p.get("text", "") for p in parts).strip()
+        if not summary:
+            raise ValueError("Gemini no retornó un resumen")
+        return summary
+    
+    def _priority(self, context: ChatContext) -> int:
+        """Los saltos de una conversación ya iniciada pasan antes que las peticiones nuevas"""
+        return PRIORITY_CONTINUATION if context.llm_calls > 1 else PRIORITY_NEW
+    
+    def _queue_timeout(self, context: ChatContext) -> float:
+        """Espera máxima por un cupo de Gemini dentro del presupuesto del turno"""
+        return context.deadline.timeout(settings.GEMINI_QUEUE_TIMEOUT)
+    
+    def _rejected_by_deadline(self, e: AdmissionRejected, queue_timeout: float) -> bool:
+        """La espera en cola se cortó porque la limitaba el presupuesto del turno (no la saturación)"""
+        return e.reason == "timeout" and queue_timeout < settings.GEMINI_QUEUE_TIMEOUT
+    
+    def _deadline_exceeded(self, context: ChatContext) -> str:
+        """Corta el loop de herramientas al vencer el presupuesto del turno"""
+        print(f"⏱️ Presupuesto del turno agotado ({context.deadline.seconds}s), no se llama a Gemini")
+        DEADLINE_EXCEEDED.inc(stage="llm")
+        context.deadline_exceeded = True
+        return DEADLINE_MESSAGE
+    
+    def _raise_for_status(self, response: httpx.Response):
+        """
+        Verifica la respuesta de Gemini
+        Un 429 de Gemini se propaga como 503 con Retry-After en lugar de un 500
+        """
+        if response.status_code == 429:
+            GEMINI_REJECTED.inc(reason="upstream_429")
+            retry_after = response.headers.get("Retry-After", "")
+            raise AdmissionRejected(
+                503,
+                int(retry_after) if retry_after.isdigit() else settings.GEMINI_RETRY_AFTER_SECONDS,
+                "Gemini limitó las peticiones, intenta más tarde",
+                "upstream_429"
+            )
+        response.raise_for_status()
+    
+    def _build_payload(
+        self,
+        contents: List[Dict[str, Any]],
+        context: ChatContext
+    ) -> Dict[str, Any]:
+        """Construye el payload de generateContent / streamGenerateContent"""
+        return {
             "contents": contents,
-            "systemInstruction": {"parts": [{"text": self.get_system_instruction()}]},
+            "systemInstruction": {"parts": [{"text": context.system_instruction}]},
             "tools": [{"functionDeclarations": TOOL_SCHEMAS}],
             "generationConfig": {
                 "temperature": 0.7,
                 "maxOutputTokens": 1000,
             }
         }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.api_url}?key={self.api_key}",
-                json=payload
-            )
-            response.raise_for_status()
-            result = response.json()
-        
-        # Extraer metadata de tokens
-        tokens_used = result.get("usageMetadata", {})
-        tokens_info = {
-            "prompt_tokens": tokens_used.get("promptTokenCount", 0),
-            "completion_tokens": tokens_used.get("candidatesTokenCount", 0),
-            "total_tokens": tokens_used.get("totalTokenCount", 0)
+    
+    def _parse_tokens(self, usage: Dict[str, Any]) -> Dict[str, int]:
+        """Convierte usageMetadata de Gemini al formato de ChatResponse"""
+        return {
+            "prompt_tokens": usage.get("promptTokenCount", 0),
+            "completion_tokens": usage.get("candidatesTokenCount", 0),
+            "total_tokens": usage.get("totalTokenCount", 0)
         }
+    
+    def _cost_usd(self, tokens: Dict[str, int]) -> float:
+        """Costo estimado de un salto (los tokens de razonamiento se cobran como salida)"""
+        prompt = tokens["prompt_tokens"]
+        output = max(tokens["completion_tokens"], tokens["total_tokens"] - prompt)
+        return (
+            prompt * settings.GEMINI_PRICE_INPUT_PER_MTOK
+            + output * settings.GEMINI_PRICE_OUTPUT_PER_MTOK
+        ) / 1_000_000
+    
+    def _prompt_bytes(self, contents: List[Dict[str, Any]], context: ChatContext) -> Dict[str, int]:
+        """
+        Bytes del prompt de un salto por sección: instrucciones fijas, catálogo,
+        historial (resumen + turnos recientes), mensaje del usuario, llamadas y
+        resultados de herramientas acumulados y declaraciones de herramientas
+        """
+        turns = context.history_turns
+        sections = dict(context.instruction_bytes)
+        sections["history"] = sections.get("history", 0) + _json_bytes(contents[:turns])
+        sections["user"] = _json_bytes(contents[turns:turns + 1])
+        sections["tool_results"] = _json_bytes(contents[turns + 1:])
+        sections["tool_schemas"] = TOOL_SCHEMAS_BYTES
+        return sections
+    
+    def _record_usage(self, context: ChatContext, usage: Dict[str, Any], prompt_bytes: Dict[str, int]):
+        """Suma el uso de un salto a la petición y a las métricas agregadas"""
+        tokens = self._parse_tokens(usage)
+        cost = self._cost_usd(tokens)
+        context.record_usage(tokens, prompt_bytes, cost)
+        
+        hop = str(context.llm_calls)
+        for kind, count in tokens.items():
+            LLM_TOKENS.inc(count, kind=kind.removesuffix("_tokens"), hop=hop)
+        for section, size in prompt_bytes.items():
+            PROMPT_BYTES.inc(size, section=section)
+        LLM_COST.inc(cost, hop=hop)
+    
+    def _build_function_turns(
+        self,
+        function_calls: List[Dict[str, Any]],
+        function_results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Construye el turno del modelo con las llamadas y el turno de función
+        con todas las respuestas, en el mismo orden
+        """
+        return [
+            {
+                "role": "model",
+                "parts": [{"functionCall": fc} for fc in function_calls]
+            },
+            {
+                "role": "function",
+                "parts": [
+                    {
+                        "functionResponse": {
+                            "name": fc["name"],
+                            "response": fr
+                        }
+                    }
+                    for fc, fr in zip(function_calls, function_results)
+                ]
+            }
+        ]
+    
+    async def _call_gemini_with_tools(
+        self,
+        contents: List[Dict[str, Any]],
+        context: ChatContext
+    ) -> str:
+        """
+        Llama a Gemini API con soporte para Tool Calling recursivo
+        
+        El log de herramientas, los tokens y la recursión restante
+        se guardan en el contexto de la petición
+        
+        Returns:
+            Texto de la respuesta
+        """
+        if context.deadline.expired():
+            return self._deadline_exceeded(context)
+        
+        payload = self._build_payload(contents, context)
+        prompt_bytes = self._prompt_bytes(contents, context)
+        
+        context.llm_calls += 1
+        queue_start = time.perf_counter()
+        queue_timeout = self._queue_timeout(context)
+        try:
+            async with self.admission.slot(self._priority(context), queue_timeout):
+                context.add_timing("queue", time.perf_counter() - queue_start)
+                with timed(LLM_LATENCY, hop=str(context.llm_calls)) as timer:
+                    response = await self.client.post(
+                        f"{self.api_url}?key={self.api_key}",
+                        json=payload,
+                        timeout=context.deadline.timeout(settings.GEMINI_TIMEOUT)
+                    )
+                    self._raise_for_status(response)
+        except httpx.TimeoutException:
+            if not context.deadline.expired():
+                raise
+            return self._deadline_exceeded(context)
+        except AdmissionRejected as e:
+            if not self._rejected_by_deadline(e, queue_timeout):
+                raise
+            return self._deadline_exceeded(context)
+        context.add_timing("llm", timer.seconds)
+        result = response.json()
+        
+        # Tokens de este salto (se suman a los de los saltos anteriores)
+        self._record_usage(context, result.get("usageMetadata", {}), prompt_bytes)
         
         # Obtener candidato
         candidate = result.get("candidates", [{}])[0]
         parts = candidate.get("content", {}).get("parts", [])
         
-        # ¿Hay una llamada a función?
-        function_call_part = next((p for p in parts if "functionCall" in p), None)
+        # ¿Hay llamadas a funciones? Gemini puede pedir varias en un mismo turno
+        function_calls = [p["functionCall"] for p in parts if "functionCall" in p]
         
-        if function_call_part:
-            function_call = function_call_part["functionCall"]
-            print(f"🎯 LLM decidió llamar: {function_call['name']}")
+        if function_calls:
+            print(f"🎯 LLM decidió llamar: {', '.join(fc['name'] for fc in function_calls)}")
             
-            # Ejecutar la función
-            function_result = await self.tool_executor.execute(
-                function_call["name"],
-                function_call.get("args", {})
-            )
+            # Ejecutar todas las funciones del turno en paralelo
+            start = time.perf_counter()
+            function_results = await asyncio.gather(*(
+                self.tool_executor.execute(fc["name"], fc.get("args", {}), context)
+                for fc in function_calls
+            ))
+            context.add_timing("tools", time.perf_counter() - start)
             
-            # Construir nuevo contenido con el resultado
+            # Construir nuevo contenido con todos los resultados en un único turno
             updated_contents = [
                 *contents,
-                {"role": "model", "parts": [{"functionCall": function_call}]},
-                {
-                    "role": "function",
-                    "parts": [{
-                        "functionResponse": {
-                            "name": function_call["name"],
-                            "response": function_result
-                        }
-                    }]
-                }
+                *self._build_function_turns(function_calls, function_results)
             ]
             
             # Llamada recursiva si quedan iteraciones
-            if max_recursion > 0:
-                print(f"🔄 Continuando conversación (recursión restante: {max_recursion})")
-                return await self._call_gemini_with_tools(updated_contents, max_recursion - 1)
+            if context.remaining_recursion > 0:
+                print(f"🔄 Continuando conversación (recursión restante: {context.remaining_recursion})")
+                context.remaining_recursion -= 1
+                return await self._call_gemini_with_tools(updated_contents, context)
             else:
                 print("⚠️ Máximo de recursiones alcanzado")
-                return "He recopilado la información necesaria.", tokens_info
+                return "He recopilado la información necesaria."
         
         # Respuesta de texto final
         text_part = next((p for p in parts if "text" in p), None)
         if text_part:
-            return text_part["text"], tokens_info
+            return text_part["text"]
+        
+        return "No pude generar una respuesta."
+    
+    async def stream_response(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera una respuesta en streaming usando streamGenerateContent
+        
+        Emite eventos a medida que avanza el loop de Tool Calling:
+        - tool_call_start / tool_call_end: por cada función ejecutada
+        - token: fragmentos de texto de la respuesta
+        - done: metadata final (funciones llamadas, tokens y desglose de uso)
+        
+        Args:
+            user_message: Mensaje del usuario
+            conversation_history: Historial de conversación previo
+            
+        Yields:
+            Dicts con las claves "event" y "data"
+        """
+        start = time.perf_counter()
+        deadline = Deadline()
+        await self.initialize()
+        
+        fast = await self._try_fast_path(user_message, deadline)
+        if fast is not None:
+            CHAT_LATENCY.observe(time.perf_counter() - start, path="fast_path")
+            for call in fast["functions_called"]:
+                yield {"event": "tool_call_start", "data": {"name": call["name"], "args": call["args"]}}
+                yield {"event": "tool_call_end", "data": {"name": call["name"], "result": call["result"]}}
+            yield {"event": "token", "data": {"text": fast["response"]}}
+            yield {
+                "event": "done",
+                "data": {
+                    "functions_called": fast["functions_called"],
+                    "tokens_used": fast["tokens_used"],
+                    "usage": fast["usage"]
+                }
+            }
+            return
+        
+        cache_key = self.response_cache.make_key(
+            user_message, conversation_history or [], self.rag_service.catalog_version
+        )
+        cached = await self._get_cached_response(cache_key, deadline)
+        if cached is not None:
+            CHAT_LATENCY.observe(time.perf_counter() - start, path="cache")
+            yield {"event": "token", "data": {"text": cached["response"]}}
+            yield {
+                "event": "done",
+                "data": {
+                    "functions_called": cached["functions_called"],
+                    "tokens_used": cached["tokens_used"],
+                    "usage": cached["usage"]
+                }
+            }
+            return
+        
+        context, contents = await self._prepare_request(user_message, conversation_history, deadline)
+        response_text = ""
+        
+        while True:
+            if context.deadline.expired():
+                yield {"event": "token", "data": {"text": self._deadline_exceeded(context)}}
+                break
+            
+            function_calls: List[Dict[str, Any]] = []
+            # usageMetadata llega acumulado en los chunks; cuenta el último del salto
+            usage: Dict[str, Any] = {}
+            prompt_bytes = self._prompt_bytes(contents, context)
+            context.llm_calls += 1
+            
+            # La latencia del salto incluye el envío de los tokens al cliente
+            queue_start = time.perf_counter()
+            queue_timeout = self._queue_timeout(context)
+            try:
+                async with self.admission.slot(self._priority(context), queue_timeout):
+                    context.add_timing("queue", time.perf_counter() - queue_start)
+                    with timed(LLM_LATENCY, hop=str(context.llm_calls)) as timer:
+                        async with self.client.stream(
+                            "POST",
+                            f"{self.stream_url}?alt=sse&key={self.api_key}",
+                            json=self._build_payload(contents, context),
+                            timeout=context.deadline.timeout(settings.GEMINI_TIMEOUT)
+                        ) as response:
+                            self._raise_for_status(response)
+                            
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                chunk = json.loads(line[len("data:"):].strip())
+                                
+                                if "usageMetadata" in chunk:
+                                    usage = chunk["usageMetadata"]
+                                
+                                candidate = chunk.get("candidates", [{}])[0]
+                                for part in candidate.get("content", {}).get("parts", []):
+                                    if "functionCall" in part:
+                                        function_calls.append(part["functionCall"])
+                                    elif part.get("text"):
+                                        response_text += part["text"]
+                                        yield {"event": "token", "data": {"text": part["text"]}}
+            except httpx.TimeoutException:
+                if not context.deadline.expired():
+                    raise
+                yield {"event": "token", "data": {"text": self._deadline_exceeded(context)}}
+                break
+            except AdmissionRejected as e:
+                if not self._rejected_by_deadline(e, queue_timeout):
+                    raise
+                yield {"event": "token", "data": {"text": self._deadline_exceeded(context)}}
+                break
+            context.add_timing("llm", timer.seconds)
+            self._record_usage(context, usage, prompt_bytes)
+            
+            if not function_calls:
+                break
+            
+            # Las funciones pedidas se ejecutan aunque no queden saltos (igual que sin streaming)
+            for fc in function_calls:
+                yield {"event": "tool_call_start", "data": {"name": fc["name"], "args": fc.get("args", {})}}
+            
+            tools_start = time.perf_counter()
+            function_results = await asyncio.gather(*(
+                self.tool_executor.execute(fc["name"], fc.get("args", {}), context)
+                for fc in function_calls
+            ))
+            context.add_timing("tools", time.perf_counter() - tools_start)
+            
+            for fc, fr in zip(function_calls, function_results):
+                yield {"event": "tool_call_end", "data": {"name": fc["name"], "result": fr}}
+            
+            if context.remaining_recursion <= 0:
+                print("⚠️ Máximo de recursiones alcanzado")
+                closing = "He recopilado la información necesaria."
+                response_text += closing
+                yield {"event": "token", "data": {"text": closing}}
+                break
+            
+            contents = [
+                *contents,
+                *self._build_function_turns(function_calls, function_results)
+            ]
+            context.remaining_recursion -= 1
         
-        return "No pude generar una respuesta.", tokens_info
+        if not context.has_tool_errors() and not context.deadline_exceeded:
+            self.response_cache.set(cache_key, {
+                "response": response_text,
+                "functions_called": context.get_execution_log(),
+                "tokens_used": context.tokens_used
+            })
+        
+        CHAT_LATENCY.observe(time.perf_counter() - start, path="llm")
+        self._observe_usage(context)
+        
+        yield {
+            "event": "done",
+            "data": {
+                "functions_called": context.get_execution_log(),
+                "tokens_used": context.tokens_used,
+                "usage": context.usage()
+            }
+        }
     
     async def close(self):
         """Cierra conexiones"""
+        await self.change_subscriber.close()
+        await self.client.aclose()
         await self.tool_executor.close()
+        await self.rag_service.close()
@@ -0,0 +1,192 @@
+"""
+History Manager - Compacta el historial de conversación por presupuesto de tokens
+Conserva los turnos recientes tal cual y resume los antiguos en un resumen
+acumulativo que se calcula una sola vez y se reutiliza en los turnos siguientes
+"""
+import asyncio
+import hashlib
+from typing import List, Dict, Callable, Awaitable, Optional, Tuple
+from app.config import get_settings
+from app.metrics import DEADLINE_EXCEEDED
+from app.services.chat_context import Deadline
+from app.services.tool_cache import TTLCache
+
+settings = get_settings()
+
+# Por debajo de este tiempo restante no vale la pena pedir el resumen a Gemini
+MIN_SUMMARY_SECONDS = 0.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token)"""
+    return len(text) // 4 + 1
+
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """Tokens de un mensaje incluyendo el overhead de rol/estructura"""
+    return estimate_tokens(message["content"]) + 4
+
+
+def truncate_words(text: str, limit: int) -> str:
+    """Recorta el texto a limit caracteres sin cortar palabras (agrega "…")"""
+    if len(text) <= limit:
+        return text
+    cut = text[:max(0, limit - 1)].rsplit(" ", 1)[0].rstrip()
+    return f"{cut}…"
+
+
+class HistoryManager:
+    """Aplica el presupuesto de tokens al historial y mantiene el resumen acumulativo"""
+
+    def __init__(self, summarize: Callable[[str, float], Awaitable[str]]):
+        """
+        Args:
+            summarize: Corrutina que recibe el texto a resumir y el timeout, y retorna el resumen
+        """
+        self.summarize = summarize
+        # Hash del prefijo resumido -> resumen
+        self.summaries = TTLCache(
+            "history_summaries",
+            settings.HISTORY_SUMMARY_TTL,
+            settings.HISTORY_SUMMARY_CACHE_SIZE
+        )
+
+    def split(self, messages: List[Dict[str, str]]) -> int:
+        """
+        Índice desde el cual los mensajes se conservan tal cual
+
+        Recorre desde el final mientras quepan en HISTORY_TOKEN_BUDGET y no se
+        supere MAX_HISTORY_LENGTH. El corte avanza en pasos de
+        HISTORY_SUMMARY_FOLD_STEP mensajes para que el prefijo resumido (y su
+        resumen en caché) se mantenga estable durante varios turnos. La parte
+        conservada siempre empieza con un mensaje del usuario
+        """
+        budget = settings.HISTORY_TOKEN_BUDGET
+        start = len(messages)
+        used = 0
+
+        for i in range(len(messages) - 1, -1, -1):
+            cost = estimate_message_tokens(messages[i])
+            if used + cost > budget or len(messages) - i > settings.MAX_HISTORY_LENGTH:
+                break
+            used += cost
+            start = i
+
+        step = max(1, settings.HISTORY_SUMMARY_FOLD_STEP)
+        if start > 0:
+            start = min(len(messages), -(-start // step) * step)
+
+        while start < len(messages) and messages[start]["role"] != "user":
+            start += 1
+
+        return start
+
+    async def compact(
+        self,
+        messages: List[Dict[str, str]],
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """
+        Compacta el historial
+
+        Args:
+            messages: Historial completo
+            deadline: Presupuesto del turno; limita la espera del resumen
+
+        Returns:
+            Tupla (resumen de los turnos antiguos o None, turnos recientes)
+        """
+        start = self.split(messages)
+        older, recent = messages[:start], messages[start:]
+
+        if not older:
+            return None, recent
+
+        return await self._summary_for(older, deadline), recent
+
+    async def _summary_for(self, older: List[Dict[str, str]], deadline: Optional[Deadline] = None) -> str:
+        """
+        Resumen de los mensajes antiguos
+
+        Cada prefijo del historial se identifica por un hash encadenado; se
+        reutiliza el resumen del prefijo más largo ya calculado y solo se
+        resumen los mensajes nuevos junto con ese resumen
+        """
+        prefix_hashes = []
+        digest = b""
+        for message in older:
+            digest = hashlib.sha256(
+                digest + message["role"].encode() + b"\0" + message["content"].encode()
+            ).digest()
+            prefix_hashes.append(digest)
+
+        cached = self.summaries.get(prefix_hashes[-1])
+        if cached is not None:
+            return cached
+
+        previous_summary = None
+        resume_from = 0
+        for i in range(len(prefix_hashes) - 2, -1, -1):
+            previous_summary = self.summaries.get(prefix_hashes[i])
+            if previous_summary is not None:
+                resume_from = i + 1
+                break
+
+        # A lo sumo la mitad del tiempo restante: el resto queda para responder
+        timeout = settings.HISTORY_SUMMARY_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining() / 2)
+        budget_limited = timeout < settings.HISTORY_SUMMARY_TIMEOUT
+
+        if timeout < MIN_SUMMARY_SECONDS:
+            print("⏱️ Sin tiempo para resumir el historial, se usa resumen truncado")
+            DEADLINE_EXCEEDED.inc(stage="summary")
+            return self._fallback_summary(previous_summary, older[resume_from:])
+
+        text = self._render(previous_summary, older[resume_from:])
+        try:
+            # wait_for corta también la espera en la cola de admisión
+            summary = await asyncio.wait_for(self.summarize(text, timeout), timeout)
+        except Exception as e:
+            # El resumen truncado nunca se guarda: el próximo turno vuelve a intentar con el modelo
+            print(f"⚠️ Error resumiendo historial, se usa resumen truncado: {e!r}")
+            if budget_limited and isinstance(e, asyncio.TimeoutError):
+                DEADLINE_EXCEEDED.inc(stage="summary")
+            return self._fallback_summary(previous_summary, older[resume_from:])
+
+        self.summaries.set(prefix_hashes[-1], summary)
+        return summary
+
+    def _render(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Texto de entrada para el resumen"""
+        lines = []
+        if previous_summary:
+            lines.append(f"Resumen previo: {previous_summary}")
+        for message in messages:
+            speaker = "Cliente" if message["role"] == "user" else "Asistente"
+            lines.append(f"{speaker}: {message['content']}")
+        return "\n".join(lines)
+
+    def _fallback_summary(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """
+        Resumen extractivo (sin LLM): primeras palabras de cada mensaje, acotado al presupuesto
+
+        Se conservan las líneas más recientes completas; solo si la última no
+        cabe se recorta, siempre en un límite de palabra
+        """
+        limit = settings.HISTORY_SUMMARY_MAX_TOKENS * 4
+        lines = self._render(
+            previous_summary,
+            [{"role": m["role"], "content": truncate_words(m["content"], 200)} for m in messages]
+        ).split("\n")
+
+        kept: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            if used + len(line) + 1 > limit:
+                if not kept:
+                    kept.append(truncate_words(line, limit))
+                break
+            kept.append(line)
+            used += len(line) + 1
+        return "\n".join(reversed(kept))
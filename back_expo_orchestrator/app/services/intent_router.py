@@ -0,0 +1,161 @@
+"""
+Intent Router - Camino rápido determinista para consultas simples
+Reconoce IDs de producto (S001, M005...) junto con intenciones simples de
+stock o precio y las resuelve llamando directamente al ToolExecutor, sin LLM.
+Si el mensaje contiene algo más que la consulta simple, la confianza baja y
+la petición sigue por Gemini
+"""
+import re
+from typing import List, Dict, Any, Callable, Optional
+from app.config import get_settings
+from app.services.response_cache import normalize_message
+
+settings = get_settings()
+
+# IDs de producto sobre el mensaje original: "S001" o "S-001", pero no
+# "a 100" ni "S001-2" (la normalización borra los guiones y los confundiría)
+PRODUCT_ID_PATTERN = re.compile(r"(?<![\w-])([a-z])-?(\d{3})(?![\w-])", re.IGNORECASE)
+PRODUCT_ID_TOKEN = "__producto__"
+
+# Palabras de relleno que no cambian el sentido de una consulta simple
+FILLER_WORDS = {
+    "a", "al", "cual", "cuanto", "cuantos", "cuantas", "de", "del", "decir",
+    "dime", "el", "en", "es", "favor", "hola", "la", "las", "los", "me", "o",
+    "para", "podrias", "por", "producto", "productos", "puedes", "que",
+    "quiero", "saber", "sabes", "si", "tiene", "tienen", "un", "una", "ver", "y",
+    "ahora", "actualmente", "todavia",
+}
+
+# Palabras funcionales: no explican la consulta (bajan la confianza) pero
+# tampoco le agregan contenido. Cualquier otra palabra no explicada sí lo hace
+# ("¿cuánto cuesta S001 en euros?") y la petición va al LLM
+FUNCTION_WORDS = {
+    "con", "e", "esa", "ese", "eso", "esta", "este", "esto", "le", "les",
+    "lo", "mi", "mis", "se", "su", "sus", "tu", "tus", "u", "ya",
+}
+
+# Negaciones: "no quiero saber el precio de S001..." nunca va por el camino rápido
+NEGATION_WORDS = {"no", "ni", "nunca", "jamas", "tampoco", "sin"}
+
+
+class IntentRule:
+    """Intención simple: palabras clave, herramienta a llamar y plantilla de respuesta"""
+
+    def __init__(
+        self,
+        name: str,
+        keywords: set[str],
+        tool: str,
+        render: Callable[[Dict[str, Any], Optional[str]], str]
+    ):
+        """
+        Args:
+            name: Nombre de la intención
+            keywords: Palabras (normalizadas) que la activan
+            tool: Herramienta del ToolExecutor que la resuelve
+            render: Recibe el resultado de la herramienta y el nombre del
+                producto (si se conoce) y retorna el texto de la respuesta
+        """
+        self.name = name
+        self.keywords = keywords
+        self.tool = tool
+        self.render = render
+
+
+def product_label(result: Dict[str, Any], product_name: Optional[str]) -> str:
+    """'Nombre (ID)' o solo el ID si no se conoce el nombre"""
+    if product_name:
+        return f"{product_name} ({result['product_id']})"
+    return str(result["product_id"])
+
+
+def render_stock(result: Dict[str, Any], product_name: Optional[str]) -> str:
+    """Respuesta para verificar_stock"""
+    label = product_label(result, product_name)
+    if result["stock"] > 0:
+        return f"Sí, tenemos {result['stock']} unidades disponibles de {label}."
+    return f"Por ahora {label} no tiene stock disponible."
+
+
+def render_price(result: Dict[str, Any], product_name: Optional[str]) -> str:
+    """Respuesta para consultar_precio"""
+    label = product_label(result, product_name)
+    return f"El precio de {label} es {result['price']:,.2f} {result['currency']}."
+
+
+DEFAULT_RULES = [
+    IntentRule(
+        "stock",
+        {"stock", "hay", "disponible", "disponibles", "disponibilidad",
+         "queda", "quedan", "existencias", "inventario", "unidades"},
+        "verificar_stock",
+        render_stock
+    ),
+    IntentRule(
+        "precio",
+        {"precio", "precios", "cuesta", "cuestan", "vale", "valen",
+         "costo", "coste", "valor"},
+        "consultar_precio",
+        render_price
+    ),
+]
+
+
+class IntentRouter:
+    """Clasifica mensajes en intenciones simples con un puntaje de confianza"""
+
+    def __init__(self, rules: Optional[List[IntentRule]] = None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+
+    def register(self, rule: IntentRule):
+        """Agrega una intención al router"""
+        self.rules.append(rule)
+
+    def route(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Intención del mensaje
+
+        La confianza es la fracción de palabras del mensaje explicadas por
+        IDs de producto, palabras clave o relleno: "¿hay stock de S001?" da
+        1.0. El mensaje va al LLM si la confianza no supera
+        FAST_PATH_MIN_CONFIDENCE, si contiene una negación o si alguna palabra
+        no explicada aporta contenido (no es una palabra funcional)
+
+        Returns:
+            Dict con "rules", "product_ids" y "confidence", o None si el
+            mensaje no cumple el umbral y debe ir al LLM
+        """
+        if not settings.FAST_PATH_ENABLED:
+            return None
+
+        product_ids = list(dict.fromkeys(
+            f"{letter.upper()}{digits}" for letter, digits in PRODUCT_ID_PATTERN.findall(message)
+        ))
+        if not product_ids or len(product_ids) > settings.FAST_PATH_MAX_PRODUCTS:
+            return None
+
+        words = normalize_message(PRODUCT_ID_PATTERN.sub(f" {PRODUCT_ID_TOKEN} ", message)).split()
+        if NEGATION_WORDS.intersection(words):
+            return None
+
+        rules = [rule for rule in self.rules if rule.keywords.intersection(words)]
+        if not rules:
+            return None
+
+        keywords = set().union(*(rule.keywords for rule in rules))
+        unexplained = [
+            word for word in words
+            if word != PRODUCT_ID_TOKEN and word not in keywords and word not in FILLER_WORDS
+        ]
+        if any(word not in FUNCTION_WORDS for word in unexplained):
+            return None
+
+        confidence = 1 - len(unexplained) / len(words)
+        if confidence <= settings.FAST_PATH_MIN_CONFIDENCE:
+            return None
+
+        return {
+            "rules": rules,
+            "product_ids": product_ids,
+            "confidence": round(confidence, 2)
+        }
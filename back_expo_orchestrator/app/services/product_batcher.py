@@ -0,0 +1,89 @@
+"""
+Product Batcher - Agrupa las consultas de productos de un mismo turno
+Varias llamadas a verificar_stock / consultar_precio se resuelven con
+una sola petición a /products/batch
+"""
+import asyncio
+from typing import Dict, Any
+from app.config import get_settings
+from app.services.products_client import ProductsClient
+
+settings = get_settings()
+
+
+class ProductBatcher:
+    """Micro-batching de consultas de stock y precio por ID de producto"""
+
+    def __init__(self, client: ProductsClient):
+        self.products_api_url = settings.PRODUCTS_API_URL
+        self.client = client
+        self.window = settings.TOOL_BATCH_WINDOW_MS / 1000
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    async def load(self, product_id: str) -> Dict[str, Any] | None:
+        """
+        Obtiene stock y precio de un producto, agrupándolo con las
+        consultas que lleguen dentro de la misma ventana
+
+        Returns:
+            Item del lote o None si el producto no existe
+        """
+        future = self._pending.get(product_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[product_id] = future
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+
+        # shield: si este llamador se cancela, el resto del lote sigue esperando
+        return await asyncio.shield(future)
+
+    async def _flush(self):
+        """Espera la ventana de agrupación y resuelve el lote pendiente"""
+        await asyncio.sleep(self.window)
+
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+
+        ids = list(batch)
+        chunks = [
+            ids[i:i + settings.TOOL_BATCH_MAX_SIZE]
+            for i in range(0, len(ids), settings.TOOL_BATCH_MAX_SIZE)
+        ]
+        try:
+            await asyncio.gather(*(
+                self._fetch_chunk({pid: batch[pid] for pid in chunk})
+                for chunk in chunks
+            ))
+        except asyncio.CancelledError:
+            # Apagado: los llamadores no deben quedarse esperando para siempre
+            for future in batch.values():
+                future.cancel()
+            raise
+
+    async def _fetch_chunk(self, batch: Dict[str, asyncio.Future]):
+        """Resuelve un grupo de IDs con una petición a /products/batch"""
+        # Futuros ya resueltos o cancelados no necesitan la petición
+        batch = {pid: future for pid, future in batch.items() if not future.done()}
+        if not batch:
+            return
+
+        try:
+            response = await self.client.post(
+                f"{self.products_api_url}/products/batch",
+                json={"ids": list(batch)}
+            )
+            response.raise_for_status()
+            items = {p["product_id"]: p for p in response.json()["products"]}
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        print(f"📦 Lote de productos resuelto: {len(batch)} IDs en una petición")
+        for product_id, future in batch.items():
+            if not future.done():
+                future.set_result(items.get(product_id))
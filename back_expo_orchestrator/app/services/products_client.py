@@ -0,0 +1,138 @@
+"""
+Products Client - Llamadas resilientes al microservicio de productos
+Envuelve el cliente HTTP de las herramientas con:
+- timeout corto por intento (TOOL_TIMEOUT) en lugar de un timeout único largo
+- reintentos con backoff exponencial y jitter completo ante errores de red y 5xx
+- petición de respaldo (hedging) opcional si la primera tarda más de TOOL_HEDGE_DELAY_MS
+- circuit breaker compartido que falla rápido si el servicio no está sano
+- timeouts y reintentos acotados al presupuesto del turno (current_deadline)
+Todas las peticiones al servicio de productos son lecturas (el POST de
+/products/batch también), por lo que reintentarlas o duplicarlas es seguro
+"""
+import asyncio
+import random
+import httpx
+from typing import Any, Dict
+from app.config import get_settings
+from app.metrics import PRODUCTS_RETRIES, PRODUCTS_HEDGES
+from app.services.chat_context import Deadline, current_deadline
+from app.services.circuit_breaker import CircuitBreaker
+
+settings = get_settings()
+
+# Respuestas del servidor que vale la pena reintentar
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """El circuito está abierto: la petición se rechaza sin llegar a la red"""
+
+
+class DeadlineExceededError(httpx.TimeoutException):
+    """No queda presupuesto del turno para (re)intentar la petición"""
+
+
+class ProductsClient:
+    """Cliente con reintentos, hedging y circuit breaker para el backend de productos"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.breaker = CircuitBreaker("products")
+        self.max_retries = settings.TOOL_MAX_RETRIES
+        self.backoff = settings.TOOL_RETRY_BACKOFF
+        self.hedge_delay = settings.TOOL_HEDGE_DELAY_MS / 1000
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Envía la petición con reintentos
+
+        Returns:
+            La primera respuesta no reintentable (o la del último intento)
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto
+            DeadlineExceededError: Si se agotó el presupuesto del turno
+            httpx.HTTPError: Si el último intento falla por red o timeout
+        """
+        deadline = current_deadline.get()
+        for attempt in range(self.max_retries + 1):
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceededError("Presupuesto del turno agotado")
+            if not self.breaker.allow():
+                raise CircuitOpenError("Servicio de productos no disponible (circuito abierto)")
+
+            # Cada intento espera a lo sumo lo que queda del turno
+            timeout = settings.TOOL_TIMEOUT if deadline is None else deadline.timeout(settings.TOOL_TIMEOUT)
+            # Backoff exponencial con jitter completo: evita reintentos sincronizados
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            try:
+                response = await self._send(method, url, **{**kwargs, "timeout": timeout})
+            except httpx.TimeoutException:
+                if deadline is not None and deadline.expired():
+                    # El corte es del presupuesto del turno, no una falla del servicio
+                    raise DeadlineExceededError("Presupuesto del turno agotado")
+                self.breaker.record_failure()
+                if self._last_attempt(attempt, deadline, delay):
+                    raise
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                if self._last_attempt(attempt, deadline, delay):
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if self._last_attempt(attempt, deadline, delay):
+                    return response
+
+            PRODUCTS_RETRIES.inc()
+            await asyncio.sleep(delay)
+
+    def _last_attempt(self, attempt: int, deadline: Deadline | None, delay: float) -> bool:
+        """Sin reintentos restantes o sin tiempo del turno para el backoff y otro intento"""
+        return attempt == self.max_retries or (deadline is not None and deadline.remaining() <= delay)
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Un intento; con hedging lanza una segunda petición si la primera se demora"""
+        if self.hedge_delay <= 0:
+            return await self.client.request(method, url, **kwargs)
+
+        primary = asyncio.ensure_future(self.client.request(method, url, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.ensure_future(self.client.request(method, url, **kwargs))
+        pending = {primary, hedge}
+        retryable: httpx.Response | None = None
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif task.result().status_code in RETRYABLE_STATUS:
+                        # Un 5xx rápido no gana: se espera a la otra petición
+                        retryable = task.result()
+                    else:
+                        PRODUCTS_HEDGES.inc(winner="hedge" if task is hedge else "primary")
+                        return task.result()
+            # Ninguna respuesta válida: el 5xx (o el error) pasa a la lógica de reintentos
+            if retryable is not None:
+                return retryable
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del circuito del servicio de productos"""
+        return self.breaker.stats()
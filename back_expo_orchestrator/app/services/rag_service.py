@@ -1,47 +1,281 @@
 """
 RAG Service - Carga el catálogo de productos para contexto
+Construye un índice léxico (BM25) para inyectar solo los productos relevantes
 """
+import asyncio
+import heapq
+import math
+import re
+import unicodedata
 import httpx
+from collections import Counter
 from typing import List, Dict, Any
 from app.config import get_settings
+from app.services.single_flight import SingleFlight
 
 settings = get_settings()
 
+# Palabras vacías frecuentes en las consultas (ya sin tildes)
+STOPWORDS = {
+    "a", "al", "con", "cual", "cuanto", "cuanta", "de", "del", "el", "en", "es",
+    "hay", "la", "las", "lo", "los", "me", "mi", "para", "por", "que", "se",
+    "su", "sus", "tienen", "tienes", "un", "una", "unos", "unas", "y", "o",
+}
+
+
+def stem(term: str) -> str:
+    """Reduce plurales simples del español (monitores -> monitor, sillas -> silla)"""
+    if len(term) > 4 and term.endswith("es") and term[-3] in "rlndz":
+        return term[:-2]
+    if len(term) > 3 and term.endswith("s"):
+        return term[:-1]
+    return term
+
+
+def tokenize(text: str) -> List[str]:
+    """Normaliza (minúsculas, sin tildes) y separa en términos sin palabras vacías"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+    return [stem(term) for term in re.findall(r"\w+", normalized) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """Índice BM25 en memoria sobre nombre y descripción de los productos"""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = [len(doc) for doc in documents]
+        self.avg_length = sum(self.doc_lengths) / len(documents) if documents else 0.0
+
+        # Índice invertido: término -> [(documento, frecuencia)]
+        self.postings: Dict[str, List[tuple[int, int]]] = {}
+        for i, doc in enumerate(documents):
+            for term, freq in Counter(doc).items():
+                self.postings.setdefault(term, []).append((i, freq))
+
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query_terms: List[str], k: int) -> List[int]:
+        """Retorna los índices de los k documentos con mayor puntaje (> 0)"""
+        scores: Dict[int, float] = {}
+        for term in set(query_terms):
+            for i, freq in self.postings.get(term, []):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+
+        return heapq.nlargest(k, scores, key=scores.get)
+
 
 class RAGService:
     """Servicio para Retrieval Augmented Generation"""
-    
+
     def __init__(self):
         self.products_api_url = settings.PRODUCTS_API_URL
+        self.client = httpx.AsyncClient(timeout=10.0)
         self.catalog_cache: str | None = None
-    
+        self.catalog_version: str | None = None
+        self.etag: str | None = None
+        self.products: List[Dict[str, Any]] = []
+        self.index: BM25Index | None = None
+        self._revalidation_task: asyncio.Task | None = None
+        # El feed de cambios está al día: la revalidación periódica no hace falta
+        # (tras apply_changes el ETag ya no corresponde y forzaría una descarga completa)
+        self.change_feed_healthy = False
+        # Cargas y revalidaciones concurrentes comparten una sola descarga
+        self.flight = SingleFlight("catalog")
+
     async def load_catalog(self) -> str:
         """
         Carga el catálogo completo de productos para RAG
-        Retorna un string formateado para incluir en el System Prompt
+        Construye el índice léxico y retorna el listado completo formateado
         """
         # Si ya está en caché, retornar
         if self.catalog_cache:
             return self.catalog_cache
-            
+
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.products_api_url}/products/summary/catalog")
-                response.raise_for_status()
-                data = response.json()
-                
-                # Crear resumen ligero para el contexto
-                catalog_text = "CATÁLOGO DE PRODUCTOS DISPONIBLES:\n"
-                for product in data.get("catalog", []):
-                    catalog_text += f"- {product['id']}: {product['name']} (${product['price']})\n"
-                
-                self.catalog_cache = catalog_text
-                return catalog_text
-                
+            await self.revalidate()
+            return self.catalog_cache
+
         except Exception as e:
             print(f"⚠️ Error cargando catálogo: {e}")
             return "CATÁLOGO: No disponible en este momento"
-    
+
+    async def revalidate(self) -> bool:
+        """
+        Petición condicional del catálogo (If-None-Match con el ETag vigente)
+        Las llamadas concurrentes (arranque en frío, /chat/reset, revalidación
+        periódica) esperan la misma petición
+
+        Returns:
+            True si el catálogo cambió y se reconstruyó el índice,
+            False si el servidor respondió 304
+        """
+        return await self.flight.do("catalog", self._revalidate)
+
+    async def _revalidate(self) -> bool:
+        """Descarga el catálogo si cambió y reconstruye el índice"""
+        headers = {"If-None-Match": self.etag} if self.etag and self.catalog_cache else {}
+        response = await self.client.get(
+            f"{self.products_api_url}/products/summary/catalog",
+            params={"include_description": True},
+            headers=headers
+        )
+
+        if response.status_code == 304:
+            return False
+
+        response.raise_for_status()
+        data = response.json()
+
+        self._set_products(data.get("catalog", []))
+        self.catalog_version = data.get("version")
+        self.etag = response.headers.get("ETag")
+        print(f"📚 Catálogo actualizado: {len(self.products)} productos (versión {self.catalog_version})")
+        return True
+
+    def _set_products(self, products: List[Dict[str, Any]]):
+        """Reemplaza los productos y reconstruye el índice y el listado completo"""
+        self.products = products
+        self.index = BM25Index([
+            tokenize(f"{p['id']} {p['name']} {p.get('description') or ''}")
+            for p in self.products
+        ])
+
+        # Listado completo (fallback cuando no hay coincidencias)
+        self.catalog_cache = self.format_products(self.products)
+
+    def apply_changes(self, changes: List[Dict[str, Any]], version: int) -> bool:
+        """
+        Aplica los cambios del feed de productos sin descargar el catálogo
+
+        Args:
+            changes: Cambios del feed ("product" es None si se eliminó)
+            version: Versión del feed tras aplicar los cambios
+
+        Returns:
+            True si el catálogo cambió (la versión cambia y con ella las
+            claves del caché de respuestas). Los cambios que solo tocan el
+            stock no lo cambian: las herramientas revalidan ese dato
+        """
+        if not changes or self.catalog_cache is None:
+            return False
+
+        by_id = {p["id"]: p for p in self.products}
+        changed = False
+        for change in changes:
+            product = change.get("product")
+            if product is None:
+                changed = by_id.pop(change["product_id"], None) is not None or changed
+            else:
+                entry = {
+                    "id": product["id"],
+                    "name": product["name"],
+                    "description": product.get("description"),
+                    "price": product["price"]
+                }
+                if by_id.get(product["id"]) != entry:
+                    by_id[product["id"]] = entry
+                    changed = True
+
+        if not changed:
+            return False
+
+        self._set_products([by_id[i] for i in sorted(by_id)])
+        self.catalog_version = f"feed-{version}"
+        print(f"📡 Catálogo actualizado por el feed: {len(changes)} cambios (versión {self.catalog_version})")
+        return True
+
+    async def _revalidation_loop(self, interval: float):
+        """Revalida el catálogo periódicamente (salvo mientras el feed de cambios esté sano)"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.change_feed_healthy:
+                continue
+            try:
+                await self.revalidate()
+            except Exception as e:
+                print(f"⚠️ Error revalidando catálogo: {e}")
+
+    def start_revalidation(self):
+        """Inicia la revalidación periódica (RAG_REVALIDATE_SECONDS; 0 la desactiva)"""
+        if settings.RAG_REVALIDATE_SECONDS > 0 and self._revalidation_task is None:
+            self._revalidation_task = asyncio.create_task(
+                self._revalidation_loop(settings.RAG_REVALIDATE_SECONDS)
+            )
+
+    async def stop_revalidation(self):
+        """Detiene la revalidación periódica"""
+        if self._revalidation_task is not None:
+            self._revalidation_task.cancel()
+            try:
+                await self._revalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._revalidation_task = None
+
+    def format_products(self, products: List[Dict[str, Any]]) -> str:
+        """Crea el resumen ligero de productos para el contexto"""
+        catalog_text = "CATÁLOGO DE PRODUCTOS DISPONIBLES:\n"
+        for product in products:
+            catalog_text += f"- {product['id']}: {product['name']} (${product['price']})\n"
+        return catalog_text
+
+    def retrieve(self, query: str, k: int = None) -> List[Dict[str, Any]]:
+        """
+        Recupera los k productos más relevantes para la consulta
+
+        Args:
+            query: Texto del usuario
+            k: Número de productos (default: RAG_TOP_K)
+        """
+        if not self.index:
+            return []
+
+        k = k or settings.RAG_TOP_K
+        return [self.products[i] for i in self.index.search(tokenize(query), k)]
+
+    def get_context(self, query: str) -> str | None:
+        """
+        Contexto de catálogo para el System Prompt de un turno
+
+        Solo incluye los productos relevantes para la consulta; usa el
+        listado completo si RAG_MODE es "full" o si no hay coincidencias
+        y RAG_FULL_CATALOG_FALLBACK está activo
+        """
+        if settings.RAG_MODE == "full":
+            return self.catalog_cache
+
+        products = self.retrieve(query)
+        if products:
+            return (
+                self.format_products(products)
+                + f"(Mostrando {len(products)} de {len(self.products)} productos; "
+                "usa buscar_productos para encontrar otros)\n"
+            )
+
+        if settings.RAG_FULL_CATALOG_FALLBACK:
+            return self.catalog_cache
+
+        return (
+            f"CATÁLOGO: {len(self.products)} productos disponibles. "
+            "Usa buscar_productos para encontrarlos.\n"
+        )
+
     def clear_cache(self):
         """Limpia el caché del catálogo"""
         self.catalog_cache = None
+        self.catalog_version = None
+        self.etag = None
+        self.products = []
+        self.index = None
+
+    async def close(self):
+        """Detiene la revalidación y cierra el cliente HTTP"""
+        await self.stop_revalidation()
+        await self.client.aclose()
@@ -0,0 +1,78 @@
+"""
+Response Cache - Caché de respuestas para preguntas repetidas
+La clave combina el mensaje normalizado, una huella corta del historial
+reciente y la versión del catálogo. Cada entrada guarda los resultados de
+herramientas usados para responder, de modo que se pueda invalidar si el
+stock o el precio cambiaron
+"""
+import hashlib
+import re
+import unicodedata
+from typing import List, Dict, Any, Optional
+from app.config import get_settings
+from app.services.tool_cache import TTLCache
+
+settings = get_settings()
+
+
+def normalize_message(text: str) -> str:
+    """Minúsculas, sin tildes, sin signos de puntuación y espacios colapsados"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", normalized))
+
+
+class ResponseCache:
+    """Caché de respuestas completas de generate_response"""
+
+    def __init__(self):
+        self.cache = TTLCache(
+            "responses",
+            settings.RESPONSE_CACHE_TTL,
+            settings.RESPONSE_CACHE_MAX_SIZE
+        )
+        self.invalidations = 0
+
+    def make_key(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]],
+        catalog_version: Optional[str]
+    ) -> tuple[str, str, str]:
+        """Clave: (mensaje normalizado, huella del historial reciente, versión del catálogo)"""
+        turns = settings.RESPONSE_CACHE_HISTORY_TURNS
+        recent = conversation_history[-turns:] if turns > 0 else []
+        fingerprint = hashlib.sha256(
+            "\n".join(f"{m['role']}:{normalize_message(m['content'])}" for m in recent).encode()
+        ).hexdigest()[:16]
+        return normalize_message(user_message), fingerprint, catalog_version or ""
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Respuesta en caché (sin validar los resultados de herramientas)"""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        return self.cache.get(key)
+
+    def set(self, key: tuple, result: Dict[str, Any]):
+        """
+        Guarda una respuesta
+        No se guardan respuestas vacías ni con errores en las herramientas
+        """
+        if not settings.RESPONSE_CACHE_ENABLED or not result.get("response"):
+            return
+        if any("error" in (f.get("result") or {}) for f in result.get("functions_called") or []):
+            return
+        self.cache.set(key, result)
+
+    def invalidate(self, key: tuple):
+        """Descarta una respuesta cuyos datos de herramientas cambiaron"""
+        if self.cache.invalidate(key):
+            self.invalidations += 1
+
+    def clear(self):
+        """Descarta todas las respuestas"""
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del caché de respuestas"""
+        return {**self.cache.stats(), "invalidations": self.invalidations}
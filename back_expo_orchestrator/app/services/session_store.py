@@ -0,0 +1,202 @@
+"""
+Session Store - Historial de conversación guardado en el servidor
+Permite que el cliente envíe solo el mensaje nuevo y un session_id
+- memory: LRU en memoria con expiración por inactividad
+- sqlite: persistente en un archivo SQLite (sobrevive reinicios), con la misma
+  expiración y el mismo máximo de sesiones
+"""
+import asyncio
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class InMemorySessionStore:
+    """Sesiones en memoria, acotadas en cantidad y en mensajes por sesión"""
+
+    def __init__(self, max_sessions: int, ttl: float, max_messages: int):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self._sessions: "OrderedDict[str, tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+
+    async def create(self) -> str:
+        """Crea una sesión vacía y retorna su ID"""
+        session_id = uuid.uuid4().hex
+        self._sessions[session_id] = (time.monotonic(), [])
+        self._evict()
+        return session_id
+
+    async def get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        """Historial de la sesión o None si no existe o expiró"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+
+        last_seen, messages = entry
+        if time.monotonic() - last_seen > self.ttl:
+            del self._sessions[session_id]
+            return None
+
+        self._sessions.move_to_end(session_id)
+        return list(messages)
+
+    async def append(self, session_id: str, messages: List[Dict[str, str]]):
+        """Agrega mensajes a la sesión (conserva los últimos max_messages)"""
+        _, history = self._sessions.get(session_id, (0.0, []))
+        history = (history + messages)[-self.max_messages:]
+        self._sessions[session_id] = (time.monotonic(), history)
+        self._sessions.move_to_end(session_id)
+        self._evict()
+
+    async def delete(self, session_id: str) -> bool:
+        """Elimina una sesión; retorna True si existía"""
+        return self._sessions.pop(session_id, None) is not None
+
+    async def close(self):
+        """Sin recursos que liberar"""
+
+    def _evict(self):
+        """Desaloja las sesiones menos usadas si se supera el máximo"""
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+class SQLiteSessionStore:
+    """Sesiones persistidas en SQLite (las operaciones corren en un hilo)"""
+
+    def __init__(self, path: str, max_sessions: int, ttl: float, max_messages: int):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = asyncio.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS session_messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS ix_sessions_updated_at ON sessions (updated_at);
+        """)
+        self.conn.commit()
+
+    async def _run(self, fn, *args):
+        """Ejecuta una operación de SQLite fuera del event loop"""
+        async with self.lock:
+            return await asyncio.to_thread(fn, *args)
+
+    async def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        await self._run(self._create, session_id)
+        return session_id
+
+    def _create(self, session_id: str):
+        self.conn.execute(
+            "INSERT INTO sessions (id, updated_at) VALUES (?, ?)",
+            (session_id, time.time())
+        )
+        self._evict()
+        self.conn.commit()
+
+    async def get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        return await self._run(self._get, session_id)
+
+    def _get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        row = self.conn.execute(
+            "SELECT updated_at FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if time.time() - row[0] > self.ttl:
+            self._delete(session_id)
+            return None
+
+        rows = self.conn.execute(
+            "SELECT role, content FROM session_messages WHERE session_id = ? ORDER BY seq",
+            (session_id,)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    async def append(self, session_id: str, messages: List[Dict[str, str]]):
+        await self._run(self._append, session_id, messages)
+
+    def _append(self, session_id: str, messages: List[Dict[str, str]]):
+        next_seq = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), -1) + 1 FROM session_messages WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()[0]
+        self.conn.executemany(
+            "INSERT INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [(session_id, next_seq + i, m["role"], m["content"]) for i, m in enumerate(messages)]
+        )
+        # Conservar solo los últimos max_messages
+        self.conn.execute(
+            "DELETE FROM session_messages WHERE session_id = ? AND seq < ?",
+            (session_id, next_seq + len(messages) - self.max_messages)
+        )
+        self.conn.execute(
+            "INSERT INTO sessions (id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, time.time())
+        )
+        self._evict()
+        self.conn.commit()
+
+    async def delete(self, session_id: str) -> bool:
+        return await self._run(self._delete, session_id)
+
+    def _delete(self, session_id: str) -> bool:
+        self.conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+        deleted = self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+        self.conn.commit()
+        return deleted > 0
+
+    async def close(self):
+        self.conn.close()
+
+    def _evict(self):
+        """
+        Elimina las sesiones expiradas y, si se supera el máximo, las
+        actualizadas hace más tiempo (sin esto las sesiones abandonadas
+        harían crecer el archivo indefinidamente)
+        """
+        expired = "SELECT id FROM sessions WHERE updated_at < ?"
+        cutoff = (time.time() - self.ttl,)
+        self.conn.execute(f"DELETE FROM session_messages WHERE session_id IN ({expired})", cutoff)
+        self.conn.execute(f"DELETE FROM sessions WHERE id IN ({expired})", cutoff)
+
+        count = self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if count <= self.max_sessions:
+            return
+        oldest = "SELECT id FROM sessions ORDER BY updated_at LIMIT ?"
+        overflow = (count - self.max_sessions,)
+        self.conn.execute(f"DELETE FROM session_messages WHERE session_id IN ({oldest})", overflow)
+        self.conn.execute(f"DELETE FROM sessions WHERE id IN ({oldest})", overflow)
+
+
+def create_session_store():
+    """Crea el almacén de sesiones según SESSION_BACKEND"""
+    if settings.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(
+            settings.SESSION_SQLITE_PATH,
+            settings.SESSION_MAX_SESSIONS,
+            settings.SESSION_TTL_SECONDS,
+            settings.SESSION_MAX_MESSAGES
+        )
+    return InMemorySessionStore(
+        settings.SESSION_MAX_SESSIONS,
+        settings.SESSION_TTL_SECONDS,
+        settings.SESSION_MAX_MESSAGES
+    )
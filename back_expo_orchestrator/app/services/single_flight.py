@@ -0,0 +1,56 @@
+"""
+Single Flight - Agrupa llamadas concurrentes idénticas en una sola ejecución
+El primer llamador con una clave ejecuta la corrutina; los que llegan
+mientras sigue en curso esperan el mismo resultado (o la misma excepción)
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from app.metrics import SINGLE_FLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalescencia de llamadas en curso por clave"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta fn una sola vez por clave entre los llamadores concurrentes
+
+        La ejecución corre en su propia tarea: si el primer llamador se
+        cancela (cliente desconectado) los demás siguen esperando el resultado
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.shared += 1
+            SINGLE_FLIGHT_CALLS.inc(name=self.name, role="shared")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        self.executions += 1
+        SINGLE_FLIGHT_CALLS.inc(name=self.name, role="leader")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        """Libera la clave; la siguiente llamada vuelve a ejecutar"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marca la excepción como recuperada aunque todos los llamadores se hayan cancelado
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Ejecuciones reales y llamadas que compartieron una ejecución en curso"""
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "shared": self.shared
+        }
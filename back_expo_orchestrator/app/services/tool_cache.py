@@ -0,0 +1,85 @@
+"""
+Tool Cache - Caché en memoria para resultados de herramientas
+LRU acotado con expiración (TTL) y contadores de aciertos/fallos
+Cada invalidación sube la generación del caché: un resultado obtenido antes
+de una invalidación no se guarda después de ella
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Caché LRU con TTL por entrada"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self.stale_writes = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor si existe y no expiró (None en caso contrario)"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        Guarda un valor, desalojando el menos usado si se supera el tamaño
+
+        Args:
+            generation: Generación leída antes de obtener el valor; si hubo
+                una invalidación desde entonces el valor se descarta
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation:
+            self.stale_writes += 1
+            return
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Elimina una entrada; retorna True si existía"""
+        self.generation += 1
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        self.generation += 1
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso del caché"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_writes": self.stale_writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
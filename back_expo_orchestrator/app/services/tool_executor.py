@@ -2,9 +2,17 @@
 Tool Executor - Ejecuta las funciones llamadas por el LLM
 Conecta con el microservicio de productos
 """
+import asyncio
+import time
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Hashable, Callable, Awaitable
 from app.config import get_settings
+from app.metrics import TOOL_LATENCY, DEADLINE_EXCEEDED
+from app.services.chat_context import ChatContext, current_deadline
+from app.services.product_batcher import ProductBatcher
+from app.services.products_client import ProductsClient
+from app.services.single_flight import SingleFlight
+from app.services.tool_cache import TTLCache
 
 settings = get_settings()
 
@@ -14,16 +22,38 @@ class ToolExecutor:
     
     def __init__(self):
         self.products_api_url = settings.PRODUCTS_API_URL
-        self.client = httpx.AsyncClient(timeout=10.0)
-        self.execution_log: list[Dict[str, Any]] = []
+        # Timeout corto por intento; los reintentos y el circuit breaker van en ProductsClient
+        self.client = httpx.AsyncClient(timeout=settings.TOOL_TIMEOUT)
+        self.products = ProductsClient(self.client)
+        self.batcher = ProductBatcher(self.products)
+        # Llamadas idénticas en curso (de distintos chats) comparten una petición
+        self.flight = SingleFlight("tools")
+        # Cachés por herramienta: el precio cambia poco, el stock con frecuencia
+        self.caches = {
+            "verificar_stock": TTLCache(
+                "verificar_stock", settings.TOOL_CACHE_STOCK_TTL, settings.TOOL_CACHE_MAX_SIZE
+            ),
+            "consultar_precio": TTLCache(
+                "consultar_precio", settings.TOOL_CACHE_PRICE_TTL, settings.TOOL_CACHE_MAX_SIZE
+            ),
+            "buscar_productos": TTLCache(
+                "buscar_productos", settings.TOOL_CACHE_SEARCH_TTL, settings.TOOL_CACHE_MAX_SIZE
+            ),
+        }
     
-    async def execute(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    async def execute(
+        self,
+        function_name: str,
+        arguments: Dict[str, Any],
+        context: Optional[ChatContext] = None
+    ) -> Dict[str, Any]:
         """
         Ejecuta una función basada en su nombre
         
         Args:
             function_name: Nombre de la función a ejecutar
             arguments: Argumentos para la función
+            context: Contexto de la petición donde se registra la ejecución
             
         Returns:
             Resultado de la ejecución de la función
@@ -32,54 +62,132 @@ class ToolExecutor:
         clean_name = function_name.split(":")[-1]
         
         print(f"🔧 Ejecutando función: {clean_name} con args: {arguments}")
+        start = time.perf_counter()
+        deadline_token = current_deadline.set(context.deadline if context is not None else None)
         
         try:
-            result = None
+            # La espera se corta en el deadline del turno; la petición compartida
+            # (single flight) sigue en curso y su resultado queda en caché
+            timeout = context.deadline.remaining() if context is not None else None
+            if timeout is not None and timeout <= 0:
+                raise asyncio.TimeoutError
+            result = await asyncio.wait_for(self._dispatch(clean_name, arguments), timeout)
             
-            if clean_name == "verificar_stock":
-                result = await self._verificar_stock(arguments["product_id"])
+            # ProductsClient dejó de reintentar porque se agotó el presupuesto del turno
+            if "error" in result and context is not None and context.deadline.expired():
+                raise asyncio.TimeoutError
             
-            elif clean_name == "buscar_productos":
-                query = arguments["query"]
-                limit = arguments.get("limit", 5)
-                result = await self._buscar_productos(query, limit)
-            
-            elif clean_name == "consultar_precio":
-                result = await self._consultar_precio(arguments["product_id"])
-            
-            else:
-                result = {"error": f"Función {clean_name} no encontrada"}
-            
-            # Registrar ejecución
-            self.execution_log.append({
-                "name": clean_name,
-                "args": arguments,
-                "result": result
-            })
+            # Registrar ejecución en el contexto de la petición
+            if context is not None:
+                context.log_execution(clean_name, arguments, result)
             
             print(f"✅ Resultado: {result}")
             return result
+        
+        except asyncio.TimeoutError:
+            DEADLINE_EXCEEDED.inc(stage="tool")
+            error_result = {"error": f"Tiempo agotado ejecutando {clean_name}"}
+            print(f"⏱️ {error_result['error']}")
+            if context is not None:
+                context.tool_errors += 1
+                context.deadline_exceeded = True
+            return error_result
                 
         except Exception as e:
             error_result = {"error": f"Error ejecutando {clean_name}: {str(e)}"}
             print(f"❌ Error: {error_result}")
+            if context is not None:
+                context.tool_errors += 1
             return error_result
+        finally:
+            current_deadline.reset(deadline_token)
+            TOOL_LATENCY.observe(time.perf_counter() - start, tool=clean_name)
+    
+    async def _dispatch(self, clean_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecuta la herramienta por nombre"""
+        if clean_name == "verificar_stock":
+            return await self._verificar_stock(arguments["product_id"])
+        
+        if clean_name == "buscar_productos":
+            query = arguments["query"]
+            limit = arguments.get("limit", 5)
+            return await self._buscar_productos(query, limit)
+        
+        if clean_name == "consultar_precio":
+            return await self._consultar_precio(arguments["product_id"])
+        
+        return {"error": f"Función {clean_name} no encontrada"}
+    
+    async def _cached(
+        self,
+        tool_name: str,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Retorna el resultado en caché o lo obtiene con fetch
+        Solo se cachean resultados exitosos (sin clave "error"). En un fallo
+        de caché, las llamadas concurrentes con la misma clave esperan la
+        misma petición, salvo que haya una invalidación en medio: la
+        generación forma parte de la clave y las llamadas posteriores
+        inician una petición nueva
+        """
+        cache = self.caches[tool_name]
+        if settings.TOOL_CACHE_ENABLED:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        # Si el producto se invalida durante la petición, el resultado no se guarda
+        generation = cache.generation
+        
+        async def fetch_and_store() -> Dict[str, Any]:
+            result = await fetch()
+            if settings.TOOL_CACHE_ENABLED and "error" not in result:
+                cache.set(key, result, generation)
+            return result
+        
+        return await self.flight.do((tool_name, key, generation), fetch_and_store)
     
     async def _verificar_stock(self, product_id: str) -> Dict[str, Any]:
-        """Verifica stock de un producto"""
+        """Verifica stock de un producto (con caché de TTL corto)"""
+        return await self._cached(
+            "verificar_stock", product_id, lambda: self._fetch_stock(product_id)
+        )
+    
+    async def _buscar_productos(self, query: str, limit: int = 5) -> Dict[str, Any]:
+        """Busca productos por término (con caché)"""
+        return await self._cached(
+            "buscar_productos",
+            (query.strip().lower(), limit),
+            lambda: self._fetch_search(query, limit)
+        )
+    
+    async def _consultar_precio(self, product_id: str) -> Dict[str, Any]:
+        """Consulta precio de un producto (con caché de TTL largo)"""
+        return await self._cached(
+            "consultar_precio", product_id, lambda: self._fetch_price(product_id)
+        )
+    
+    async def _fetch_stock(self, product_id: str) -> Dict[str, Any]:
+        """Obtiene el stock (agrupado con las demás consultas del turno)"""
         try:
-            response = await self.client.get(
-                f"{self.products_api_url}/products/{product_id}/stock"
-            )
-            response.raise_for_status()
-            return response.json()
+            product = await self.batcher.load(product_id)
+            if product is None:
+                return {"error": f"Producto con ID {product_id} no encontrado", "product_id": product_id}
+            return {
+                "product_id": product["product_id"],
+                "product_name": product["product_name"],
+                "stock": product["stock"],
+                "status": product["status"]
+            }
         except httpx.HTTPError as e:
             return {"error": f"Error al verificar stock: {str(e)}", "product_id": product_id}
     
-    async def _buscar_productos(self, query: str, limit: int = 5) -> Dict[str, Any]:
-        """Busca productos por término"""
+    async def _fetch_search(self, query: str, limit: int = 5) -> Dict[str, Any]:
+        """Busca productos por término en el microservicio de productos"""
         try:
-            response = await self.client.get(
+            response = await self.products.get(
                 f"{self.products_api_url}/products/search/query",
                 params={"q": query, "limit": limit}
             )
@@ -103,29 +211,47 @@ class ToolExecutor:
         except httpx.HTTPError as e:
             return {"error": f"Error al buscar productos: {str(e)}"}
     
-    async def _consultar_precio(self, product_id: str) -> Dict[str, Any]:
-        """Consulta precio de un producto"""
+    async def _fetch_price(self, product_id: str) -> Dict[str, Any]:
+        """Obtiene el precio (agrupado con las demás consultas del turno)"""
         try:
-            response = await self.client.get(
-                f"{self.products_api_url}/products/{product_id}"
-            )
-            response.raise_for_status()
-            data = response.json()
+            product = await self.batcher.load(product_id)
+            if product is None:
+                return {"error": f"Producto con ID {product_id} no encontrado", "product_id": product_id}
             return {
                 "product_id": product_id,
-                "price": data["price"],
-                "currency": "USD"
+                "price": product["price"],
+                "currency": product["currency"]
             }
         except httpx.HTTPError as e:
             return {"error": f"Error al consultar precio: {str(e)}", "product_id": product_id}
     
-    def get_execution_log(self) -> list[Dict[str, Any]]:
-        """Retorna el log de ejecuciones"""
-        return self.execution_log
+    def invalidate_cache(self, product_id: Optional[str] = None):
+        """
+        Invalida los resultados en caché
+        
+        Args:
+            product_id: Si se indica, solo las entradas de ese producto (y las
+                búsquedas, que pueden incluirlo); si no, todas las entradas
+        """
+        if product_id is None:
+            for cache in self.caches.values():
+                cache.clear()
+            return
+        
+        self.caches["verificar_stock"].invalidate(product_id)
+        self.caches["consultar_precio"].invalidate(product_id)
+        self.caches["buscar_productos"].clear()
+    
+    async def warm_up(self):
+        """Abre la conexión con el backend de productos (lote vacío, sin consultar la base)"""
+        try:
+            await self.client.post(f"{self.products_api_url}/products/batch", json={"ids": []})
+        except httpx.HTTPError as e:
+            print(f"⚠️ No se pudo precalentar la conexión con productos: {e}")
     
-    def clear_log(self):
-        """Limpia el log de ejecuciones"""
-        self.execution_log = []
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas de los cachés de herramientas"""
+        return {name: cache.stats() for name, cache in self.caches.items()}
     
     async def close(self):
         """Cierra el cliente HTTP"""
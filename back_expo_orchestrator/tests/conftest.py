@@ -0,0 +1,56 @@
+"""
+Configuración común de las pruebas
+Las variables se fijan antes de importar app.config (get_settings se cachea)
+"""
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["FAST_PATH_ENABLED"] = "false"
+os.environ["CHANGE_FEED_ENABLED"] = "false"
+os.environ["WARMUP_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.gemini_service import GeminiService  # noqa: E402
+
+
+def mock_client(handler) -> httpx.AsyncClient:
+    """Cliente HTTP que responde con handler, sin tocar la red"""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture
+def settings():
+    """Configuración compartida (modificarla con monkeypatch.setattr)"""
+    return get_settings()
+
+
+@pytest.fixture
+async def make_service():
+    """
+    Crea GeminiService con Gemini y productos simulados
+    Cierra los clientes HTTP originales al reemplazarlos y el resto al terminar
+    """
+    services = []
+
+    async def build(gemini_handler, products_handler) -> GeminiService:
+        service = GeminiService()
+        await service.client.aclose()
+        await service.tool_executor.client.aclose()
+        await service.rag_service.client.aclose()
+
+        service.client = mock_client(gemini_handler)
+        products = mock_client(products_handler)
+        service.tool_executor.client = products
+        service.tool_executor.products.client = products
+        service.rag_service.client = products
+        service.catalog_loaded = True
+        services.append(service)
+        return service
+
+    yield build
+    for service in services:
+        await service.close()
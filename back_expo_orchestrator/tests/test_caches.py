@@ -0,0 +1,130 @@
+"""
+Cachés: TTLCache (LRU, TTL y generación) y revalidación del caché de respuestas
+"""
+import asyncio
+import json
+
+import httpx
+
+from app.services.tool_cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+async def test_ttl_cache_expires_entries():
+    cache = TTLCache("test", ttl=0.02, maxsize=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    await asyncio.sleep(0.03)
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_discards_writes_from_before_an_invalidation():
+    cache = TTLCache("test", ttl=60, maxsize=10)
+    generation = cache.generation
+
+    cache.invalidate("a")
+    cache.set("a", "viejo", generation)
+
+    assert cache.get("a") is None
+    assert cache.stats()["stale_writes"] == 1
+
+    cache.set("a", "nuevo", cache.generation)
+    assert cache.get("a") == "nuevo"
+
+
+async def test_tool_fetch_started_before_invalidation_is_not_cached_or_joined(make_service):
+    stock = {"S001": 5}
+    release = asyncio.Event()
+    requests = 0
+
+    async def products(request: httpx.Request) -> httpx.Response:
+        nonlocal requests
+        requests += 1
+        ids = json.loads(request.content)["ids"]
+        current = dict(stock)
+        # Solo la primera petición se demora hasta después de la invalidación
+        if requests == 1:
+            await release.wait()
+        return httpx.Response(200, json={
+            "products": [
+                {"product_id": pid, "product_name": pid, "stock": current[pid], "status": "Disponible",
+                 "price": 1.0, "currency": "USD"}
+                for pid in ids
+            ],
+            "not_found": []
+        })
+
+    service = await make_service(None, products)
+    executor = service.tool_executor
+
+    before = asyncio.create_task(executor.execute("verificar_stock", {"product_id": "S001"}))
+    await asyncio.sleep(0.01)
+    stock["S001"] = 0
+    executor.invalidate_cache("S001")
+    after = await executor.execute("verificar_stock", {"product_id": "S001"})
+    release.set()
+
+    assert after["stock"] == 0
+    assert (await before)["stock"] == 5
+    # El resultado viejo llegó último pero no pisó al nuevo
+    assert executor.caches["verificar_stock"].get("S001")["stock"] == 0
+    assert requests == 2
+
+
+async def test_cached_response_is_revalidated_against_tools(make_service, settings, monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "TOOL_CACHE_ENABLED", False)
+    stock = {"S001": 5}
+    gemini_calls = 0
+
+    async def gemini(request: httpx.Request) -> httpx.Response:
+        nonlocal gemini_calls
+        gemini_calls += 1
+        body = json.loads(request.content)
+        if body["contents"][-1]["role"] == "user":
+            parts = [{"functionCall": {"name": "verificar_stock", "args": {"product_id": "S001"}}}]
+        else:
+            result = body["contents"][-1]["parts"][0]["functionResponse"]["response"]
+            parts = [{"text": f"Quedan {result['stock']}"}]
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": parts}}]})
+
+    async def products(request: httpx.Request) -> httpx.Response:
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(200, json={
+            "products": [
+                {"product_id": pid, "product_name": pid, "stock": stock[pid], "status": "Disponible",
+                 "price": 1.0, "currency": "USD"}
+                for pid in ids
+            ],
+            "not_found": []
+        })
+
+    service = await make_service(gemini, products)
+
+    first = await service.generate_response("¿cuántas sillas S001 quedan?")
+    cached = await service.generate_response("¿Cuántas sillas S001 quedan?")
+    assert first["response"] == cached["response"] == "Quedan 5"
+    assert gemini_calls == 2
+
+    # El stock cambió: la entrada se invalida y se vuelve a consultar a Gemini
+    stock["S001"] = 2
+    fresh = await service.generate_response("¿cuántas sillas S001 quedan?")
+    assert fresh["response"] == "Quedan 2"
+    assert gemini_calls == 4
+    assert service.response_cache.invalidations == 1
@@ -0,0 +1,99 @@
+"""
+Aislamiento del estado por petición (ChatContext)
+Un único GeminiService atiende chats concurrentes: cada resultado debe traer
+solo sus herramientas y sus tokens, aunque los saltos se intercalen
+"""
+import asyncio
+import json
+import random
+import re
+
+import httpx
+
+CONCURRENT_CHATS = 20
+
+
+def usage(chat: int, hop: int) -> dict:
+    """usageMetadata distinto por chat y por salto"""
+    prompt = chat * 100 + hop
+    return {
+        "promptTokenCount": prompt,
+        "candidatesTokenCount": chat,
+        "totalTokenCount": prompt + chat
+    }
+
+
+def expected_tokens(chat: int) -> dict:
+    """Suma de los dos saltos de un chat"""
+    hops = [usage(chat, 1), usage(chat, 2)]
+    return {
+        "prompt_tokens": sum(h["promptTokenCount"] for h in hops),
+        "completion_tokens": sum(h["candidatesTokenCount"] for h in hops),
+        "total_tokens": sum(h["totalTokenCount"] for h in hops)
+    }
+
+
+async def fake_gemini(request: httpx.Request) -> httpx.Response:
+    """Primer salto: pide verificar_stock del producto del chat; segundo: responde texto"""
+    body = json.loads(request.content)
+    user_text = next(c for c in body["contents"] if c["role"] == "user")["parts"][0]["text"]
+    chat = int(re.search(r"P(\d+)", user_text).group(1))
+    # Latencias aleatorias para intercalar los saltos de los distintos chats
+    await asyncio.sleep(random.uniform(0, 0.02))
+
+    if body["contents"][-1]["role"] == "user":
+        parts = [{"functionCall": {"name": "verificar_stock", "args": {"product_id": f"P{chat}"}}}]
+        return httpx.Response(200, json={
+            "candidates": [{"content": {"parts": parts}}],
+            "usageMetadata": usage(chat, 1)
+        })
+
+    result = body["contents"][-1]["parts"][0]["functionResponse"]["response"]
+    return httpx.Response(200, json={
+        "candidates": [{"content": {"parts": [{"text": f"{result['product_id']}: {result['stock']}"}]}}],
+        "usageMetadata": usage(chat, 2)
+    })
+
+
+async def fake_products(request: httpx.Request) -> httpx.Response:
+    """/products/batch: el stock de P<n> es n"""
+    await asyncio.sleep(random.uniform(0, 0.01))
+    ids = json.loads(request.content)["ids"]
+    return httpx.Response(200, json={
+        "products": [
+            {
+                "product_id": pid,
+                "product_name": f"Producto {pid}",
+                "stock": int(pid[1:]),
+                "status": "Disponible",
+                "price": 1.0,
+                "currency": "USD"
+            }
+            for pid in ids
+        ],
+        "not_found": []
+    })
+
+
+async def test_concurrent_chats_do_not_share_state(make_service):
+    service = await make_service(fake_gemini, fake_products)
+
+    chats = range(1, CONCURRENT_CHATS + 1)
+    results = await asyncio.gather(*(
+        service.generate_response(f"¿Hay stock de P{chat}?") for chat in chats
+    ))
+
+    for chat, result in zip(chats, results):
+        assert result["response"] == f"P{chat}: {chat}"
+        assert result["functions_called"] == [{
+            "name": "verificar_stock",
+            "args": {"product_id": f"P{chat}"},
+            "result": {
+                "product_id": f"P{chat}",
+                "product_name": f"Producto P{chat}",
+                "stock": chat,
+                "status": "Disponible"
+            }
+        }]
+        assert result["tokens_used"] == expected_tokens(chat)
+        assert [hop["hop"] for hop in result["usage"]["hops"]] == [1, 2]
@@ -0,0 +1,141 @@
+"""
+Historial: compactación con HistoryManager y almacenes de sesiones
+"""
+import asyncio
+
+import pytest
+
+from app.services.chat_context import Deadline
+from app.services.history_manager import HistoryManager, truncate_words
+from app.services.session_store import InMemorySessionStore, SQLiteSessionStore
+
+
+def conversation(turns: int, words: int = 60) -> list:
+    """Historial de turnos usuario/asistente con texto suficiente para superar el presupuesto"""
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"pregunta {i} " + "palabra " * words})
+        messages.append({"role": "assistant", "content": f"respuesta {i} " + "palabra " * words})
+    return messages
+
+
+@pytest.fixture
+def small_budget(settings, monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_TOKEN_BUDGET", 400)
+    monkeypatch.setattr(settings, "HISTORY_SUMMARY_FOLD_STEP", 2)
+
+
+def test_truncate_words_cuts_at_word_boundary():
+    assert truncate_words("hola mundo", 20) == "hola mundo"
+    assert truncate_words("una frase bastante larga", 12) == "una frase…"
+
+
+async def test_short_history_is_kept_as_is():
+    manager = HistoryManager(None)
+    messages = conversation(1, words=5)
+
+    summary, recent = await manager.compact(messages)
+
+    assert summary is None
+    assert recent == messages
+
+
+async def test_summary_is_computed_once_and_reused(small_budget):
+    calls = []
+
+    async def summarize(text, timeout):
+        calls.append(text)
+        return f"resumen {len(calls)}"
+
+    manager = HistoryManager(summarize)
+    messages = conversation(6)
+
+    summary, recent = await manager.compact(messages)
+    assert summary == "resumen 1"
+    assert recent and recent[0]["role"] == "user"
+    assert len(recent) < len(messages)
+
+    again, _ = await manager.compact(messages)
+    assert again == "resumen 1"
+    assert len(calls) == 1
+
+
+async def test_failed_summary_falls_back_without_caching(small_budget):
+    calls = 0
+
+    async def summarize(text, timeout):
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("Gemini no disponible")
+
+    manager = HistoryManager(summarize)
+    messages = conversation(6)
+
+    summary, _ = await manager.compact(messages)
+    assert "Cliente: pregunta 0" in summary or "Asistente:" in summary
+
+    # El resumen truncado no se guardó: el siguiente turno vuelve a intentar
+    await manager.compact(messages)
+    assert calls == 2
+
+
+async def test_expired_deadline_skips_the_summary_call(small_budget):
+    async def summarize(text, timeout):
+        raise AssertionError("no debe llamarse sin presupuesto")
+
+    manager = HistoryManager(summarize)
+    summary, _ = await manager.compact(conversation(6), Deadline(0.1))
+
+    assert summary
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def make_store(request, tmp_path):
+    stores = []
+
+    def build(max_sessions=10, ttl=60.0, max_messages=4):
+        if request.param == "memory":
+            store = InMemorySessionStore(max_sessions, ttl, max_messages)
+        else:
+            store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_sessions, ttl, max_messages)
+        stores.append(store)
+        return store
+
+    yield build
+    for store in stores:
+        await store.close()
+
+
+async def test_session_store_keeps_last_messages(make_store):
+    store = make_store(max_messages=3)
+    session_id = await store.create()
+
+    await store.append(session_id, [{"role": "user", "content": "1"}, {"role": "assistant", "content": "2"}])
+    await store.append(session_id, [{"role": "user", "content": "3"}, {"role": "assistant", "content": "4"}])
+
+    assert [m["content"] for m in await store.get(session_id)] == ["2", "3", "4"]
+    assert await store.delete(session_id)
+    assert await store.get(session_id) is None
+
+
+async def test_session_store_expires_idle_sessions(make_store):
+    store = make_store(ttl=0.05)
+    session_id = await store.create()
+    await store.append(session_id, [{"role": "user", "content": "hola"}])
+
+    await asyncio.sleep(0.1)
+
+    assert await store.get(session_id) is None
+
+
+async def test_session_store_caps_session_count(make_store):
+    store = make_store(max_sessions=2)
+    first = await store.create()
+    await asyncio.sleep(0.01)
+    second = await store.create()
+    await asyncio.sleep(0.01)
+    third = await store.create()
+
+    assert await store.get(first) is None
+    assert await store.get(second) == []
+    assert await store.get(third) == []
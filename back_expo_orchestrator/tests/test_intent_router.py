@@ -0,0 +1,81 @@
+"""
+Camino rápido: IntentRouter (IDs, negaciones, confianza) y catálogo en GeminiService
+"""
+import json
+
+import httpx
+import pytest
+
+from app.services.intent_router import IntentRouter
+
+
+@pytest.fixture
+def router(settings, monkeypatch):
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", True)
+    return IntentRouter()
+
+
+@pytest.mark.parametrize("message, product_ids, intent", [
+    ("¿Hay stock de S001?", ["S001"], "stock"),
+    ("precio de s-001", ["S001"], "precio"),
+    ("¿Cuánto cuesta M005, por favor?", ["M005"], "precio"),
+    ("precio de S001 y M005", ["S001", "M005"], "precio"),
+])
+def test_simple_queries_take_the_fast_path(router, message, product_ids, intent):
+    result = router.route(message)
+
+    assert result is not None
+    assert result["product_ids"] == product_ids
+    assert [rule.name for rule in result["rules"]] == [intent]
+    assert result["confidence"] == 1.0
+
+
+@pytest.mark.parametrize("message", [
+    "no quiero saber el precio de S001",
+    "¿hay stock de S001? tampoco me importa",
+    "stock de a 100",
+    "stock de S001-2",
+    "¿cuánto cuesta S001 en euros?",
+    "recomiéndame algo parecido a S001",
+    "¿hay sillas en stock?",
+])
+def test_other_messages_go_to_the_llm(router, message):
+    assert router.route(message) is None
+
+
+def test_router_respects_fast_path_switch(settings, monkeypatch):
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", False)
+    assert IntentRouter().route("¿Hay stock de S001?") is None
+
+
+async def test_fast_path_skips_ids_missing_from_the_catalog(make_service, settings, monkeypatch):
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", True)
+    gemini_calls = 0
+
+    async def gemini(request: httpx.Request) -> httpx.Response:
+        nonlocal gemini_calls
+        gemini_calls += 1
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "No existe"}]}}]})
+
+    async def products(request: httpx.Request) -> httpx.Response:
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(200, json={
+            "products": [
+                {"product_id": pid, "product_name": "Silla", "stock": 3, "status": "Disponible",
+                 "price": 10.0, "currency": "USD"}
+                for pid in ids
+            ],
+            "not_found": []
+        })
+
+    service = await make_service(gemini, products)
+    service.rag_service._set_products([{"id": "S001", "name": "Silla", "description": None, "price": 10.0}])
+
+    known = await service.generate_response("¿Hay stock de S001?")
+    assert known["response"] == "Sí, tenemos 3 unidades disponibles de Silla (S001)."
+    assert gemini_calls == 0
+
+    unknown = await service.generate_response("¿Hay stock de X999?")
+    assert unknown["response"] == "No existe"
+    assert unknown["functions_called"] == []
+    assert gemini_calls == 1
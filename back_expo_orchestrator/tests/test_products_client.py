@@ -0,0 +1,151 @@
+"""
+ProductsClient: reintentos, hedging, circuit breaker y presupuesto del turno
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.chat_context import Deadline, current_deadline
+from app.services.circuit_breaker import OPEN
+from app.services.products_client import CircuitOpenError, DeadlineExceededError, ProductsClient
+from conftest import mock_client
+
+URL = "http://products/api/products/S001"
+
+
+@pytest.fixture
+async def make_client():
+    clients = []
+
+    def build(handler, max_retries=2, hedge_delay=0.0, failure_threshold=100) -> ProductsClient:
+        client = ProductsClient(mock_client(handler))
+        client.max_retries = max_retries
+        client.backoff = 0.0
+        client.hedge_delay = hedge_delay
+        client.breaker.failure_threshold = failure_threshold
+        clients.append(client)
+        return client
+
+    yield build
+    for client in clients:
+        await client.client.aclose()
+
+
+async def test_retries_retryable_status_until_success(make_client):
+    statuses = [503, 502, 200]
+
+    async def handler(request):
+        return httpx.Response(statuses.pop(0))
+
+    response = await make_client(handler).get(URL)
+
+    assert response.status_code == 200
+    assert statuses == []
+
+
+async def test_does_not_retry_client_errors(make_client):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(404)
+
+    response = await make_client(handler).get(URL)
+
+    assert response.status_code == 404
+    assert calls == 1
+
+
+async def test_returns_last_retryable_response_after_max_retries(make_client):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(503)
+
+    response = await make_client(handler, max_retries=2).get(URL)
+
+    assert response.status_code == 503
+    assert calls == 3
+
+
+async def test_network_errors_are_retried_then_raised(make_client):
+    async def handler(request):
+        raise httpx.ConnectError("sin conexión", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        await make_client(handler, max_retries=1).get(URL)
+
+
+async def test_open_circuit_fails_fast(make_client):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(500)
+
+    client = make_client(handler, max_retries=0, failure_threshold=2)
+    await client.get(URL)
+    await client.get(URL)
+    assert client.breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await client.get(URL)
+    assert calls == 2
+
+
+async def test_hedge_wins_when_primary_is_slow(make_client):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"call": calls})
+
+    response = await make_client(handler, hedge_delay=0.01).get(URL)
+
+    assert response.json() == {"call": 2}
+
+
+async def test_retryable_5xx_never_wins_a_hedge(make_client):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            # La primaria tarda pero responde bien; el hedge falla rápido con 503
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"call": 1})
+        return httpx.Response(503)
+
+    response = await make_client(handler, max_retries=0, hedge_delay=0.01).get(URL)
+
+    assert response.status_code == 200
+    assert response.json() == {"call": 1}
+
+
+async def test_expired_deadline_stops_retrying_without_tripping_the_breaker(make_client):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(503)
+
+    client = make_client(handler, max_retries=5)
+    token = current_deadline.set(Deadline(0))
+    try:
+        with pytest.raises(DeadlineExceededError):
+            await client.get(URL)
+    finally:
+        current_deadline.reset(token)
+
+    assert calls == 0
+    assert client.breaker.failures == 0
@@ -0,0 +1,152 @@
+"""
+Piezas de resiliencia: SingleFlight, CircuitBreaker y AdmissionController
+"""
+import asyncio
+
+import pytest
+
+from app.services.admission import (
+    AdmissionController, AdmissionRejected, PRIORITY_BACKGROUND, PRIORITY_CONTINUATION, PRIORITY_NEW
+)
+from app.services.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from app.services.single_flight import SingleFlight
+
+
+async def test_single_flight_shares_one_execution():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "shared": 4}
+    # Terminada la ejecución, la siguiente llamada vuelve a ejecutar
+    assert await flight.do("key", fetch) == 2
+
+
+async def test_single_flight_shares_exceptions_and_survives_leader_cancel():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ValueError("falló")
+
+    leader = asyncio.create_task(flight.do("key", failing))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", failing))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    release.set()
+    with pytest.raises(ValueError):
+        await follower
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+def test_circuit_breaker_transitions():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+async def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    await asyncio.sleep(0.06)
+
+    # Una sola llamada de prueba
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    # La prueba falla: vuelve a abrirse
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    await asyncio.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+async def test_admission_serves_queue_by_priority():
+    admission = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=1.0)
+    order = []
+
+    async def call(name, priority):
+        async with admission.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    holder = asyncio.create_task(call("holder", PRIORITY_NEW))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(call("background", PRIORITY_BACKGROUND)),
+        asyncio.create_task(call("new", PRIORITY_NEW)),
+        asyncio.create_task(call("continuation", PRIORITY_CONTINUATION)),
+    ]
+    await asyncio.gather(holder, *waiters)
+
+    assert order == ["holder", "continuation", "new", "background"]
+    assert admission.stats()["in_flight"] == 0
+    assert admission.stats()["queued"] == 0
+
+
+async def test_admission_rejects_full_queue_with_429():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with admission.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        async with admission.slot():
+            pass
+    assert rejected.value.status_code == 429
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+
+    release.set()
+    await asyncio.gather(holder, queued)
+
+
+async def test_admission_queue_timeout_returns_503_and_frees_the_queue():
+    admission = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=0.02)
+    release = asyncio.Event()
+
+    async def hold():
+        async with admission.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        async with admission.slot():
+            pass
+    assert rejected.value.status_code == 503
+    assert rejected.value.reason == "timeout"
+    assert 1 <= rejected.value.retry_after <= 60
+    assert admission.queued == 0
+
+    release.set()
+    await holder
+    assert admission.active == 0
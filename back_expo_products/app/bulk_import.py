@@ -0,0 +1,251 @@
+"""
+Importación masiva de inventario (upsert)
+Las filas llegan en streaming (CSV o NDJSON), se cargan por lotes en una tabla
+temporal y se aplican a products en una sola transacción
+- PostgreSQL: COPY (copy_records_to_table de asyncpg) hacia la tabla temporal
+- SQLite: executemany por lotes
+Solo se actualizan las filas que realmente cambian (con updated_at nuevo), de
+modo que el snapshot del catálogo y el feed de cambios reflejen la importación
+"""
+import csv
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+# Filas por lote enviado a la tabla temporal
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 5000))
+# Errores de validación incluidos en el reporte
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 20))
+
+IMPORT_FIELDS = ("id", "name", "description", "price", "stock")
+STAGING_COLUMNS = ("seq",) + IMPORT_FIELDS
+
+POSTGRES_STAGING = """
+    CREATE TEMP TABLE product_import (
+        seq bigint, id text, name text, description text,
+        price double precision, stock integer
+    ) ON COMMIT DROP
+"""
+
+SQLITE_STAGING = """
+    CREATE TEMP TABLE product_import (
+        seq INTEGER, id TEXT, name TEXT, description TEXT, price REAL, stock INTEGER
+    )
+"""
+
+STAGING_INSERT = text(
+    "INSERT INTO product_import (seq, id, name, description, price, stock) "
+    "VALUES (:seq, :id, :name, :description, :price, :stock)"
+)
+
+# Si un ID aparece varias veces gana la última fila
+DEDUPLICATE = text(
+    "DELETE FROM product_import WHERE seq NOT IN "
+    "(SELECT MAX(seq) FROM product_import GROUP BY id)"
+)
+
+# Las columnas ausentes en la importación conservan su valor actual
+UPSERT_UPDATE = text("""
+    UPDATE products SET
+        name = COALESCE(s.name, products.name),
+        description = COALESCE(s.description, products.description),
+        price = COALESCE(s.price, products.price),
+        stock = COALESCE(s.stock, products.stock),
+        updated_at = :now
+    FROM product_import s
+    WHERE products.id = s.id AND (
+        COALESCE(s.name, products.name) <> products.name
+        OR COALESCE(s.description, products.description) <> products.description
+        OR COALESCE(s.price, products.price) <> products.price
+        OR COALESCE(s.stock, products.stock) <> products.stock
+    )
+""").bindparams(bindparam("now", type_=DateTime(timezone=True)))
+
+# Los productos nuevos necesitan nombre, descripción y precio
+UPSERT_INSERT = text("""
+    INSERT INTO products (id, name, description, price, stock, created_at)
+    SELECT s.id, s.name, s.description, s.price, COALESCE(s.stock, 0), :now
+    FROM product_import s
+    WHERE s.name IS NOT NULL AND s.description IS NOT NULL AND s.price IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM products p WHERE p.id = s.id)
+""").bindparams(bindparam("now", type_=DateTime(timezone=True)))
+
+COUNT_INCOMPLETE = text(
+    "SELECT COUNT(*) FROM product_import s "
+    "WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.id = s.id)"
+)
+
+
+class ImportRowError(ValueError):
+    """Fila inválida (se omite y se informa en el reporte)"""
+
+
+def parse_record(record: Dict[str, Any]) -> Tuple:
+    """
+    Valida una fila y la convierte al orden de IMPORT_FIELDS
+
+    Solo id es obligatorio: las demás columnas vacías o ausentes conservan
+    el valor actual del producto
+    """
+    product_id = str(record.get("id") or "").strip()
+    if not product_id:
+        raise ImportRowError("id requerido")
+
+    def optional(name: str, cast):
+        value = record.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
+        try:
+            value = cast(value)
+        except (TypeError, ValueError):
+            raise ImportRowError(f"{name} inválido: {value!r}")
+        if cast is not str and value < 0:
+            raise ImportRowError(f"{name} no puede ser negativo")
+        return value
+
+    return (
+        product_id,
+        optional("name", str),
+        optional("description", str),
+        optional("price", float),
+        optional("stock", int),
+    )
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Reparte los bloques de bytes recibidos en líneas de texto"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8-sig").rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[str], format: str) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Registros (número de línea, dict) desde CSV con encabezado o NDJSON
+    En CSV cada registro debe ocupar una sola línea
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        if format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [column.strip().lower() for column in values]
+                if "id" not in header:
+                    raise ImportRowError("El encabezado CSV debe incluir la columna id")
+                continue
+            yield line_number, dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"__error__": f"JSON inválido: {e.msg}"}
+                continue
+            yield line_number, record if isinstance(record, dict) else {"__error__": "se esperaba un objeto JSON"}
+
+
+async def _create_staging(conn: AsyncConnection):
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text(POSTGRES_STAGING))
+    else:
+        await conn.execute(text("DROP TABLE IF EXISTS temp.product_import"))
+        await conn.execute(text(SQLITE_STAGING))
+
+
+async def _stage_batch(conn: AsyncConnection, batch: List[Tuple]):
+    """Carga un lote en la tabla temporal (COPY en PostgreSQL)"""
+    if conn.dialect.name == "postgresql":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "product_import", records=batch, columns=STAGING_COLUMNS
+        )
+    else:
+        await conn.execute(STAGING_INSERT, [dict(zip(STAGING_COLUMNS, row)) for row in batch])
+
+
+async def import_products(engine: AsyncEngine, chunks: AsyncIterator[bytes], format: str = "ndjson") -> Dict[str, Any]:
+    """
+    Importa productos (upsert) en una sola transacción
+
+    Args:
+        engine: Motor asíncrono de la base de datos
+        chunks: Contenido en bloques de bytes (cuerpo de la petición o archivo)
+        format: "csv" (con encabezado) o "ndjson"
+
+    Returns:
+        Reporte con filas recibidas, insertadas, actualizadas, sin cambios,
+        rechazadas y filas por segundo
+
+    Raises:
+        ImportRowError: Si el encabezado CSV no es válido (no se aplica nada)
+    """
+    start = time.perf_counter()
+    received = staged = 0
+    errors: List[Dict[str, Any]] = []
+    rejected = 0
+
+    async with engine.begin() as conn:
+        await _create_staging(conn)
+
+        batch: List[Tuple] = []
+        async for line_number, record in iter_records(iter_lines(chunks), format):
+            received += 1
+            try:
+                if "__error__" in record:
+                    raise ImportRowError(record["__error__"])
+                batch.append((line_number,) + parse_record(record))
+            except ImportRowError as e:
+                rejected += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await _stage_batch(conn, batch)
+                staged += len(batch)
+                batch = []
+
+        if batch:
+            await _stage_batch(conn, batch)
+            staged += len(batch)
+
+        await conn.execute(DEDUPLICATE)
+        now = datetime.now(timezone.utc)
+        updated = (await conn.execute(UPSERT_UPDATE, {"now": now})).rowcount
+        inserted = (await conn.execute(UPSERT_INSERT, {"now": now})).rowcount
+        incomplete = (await conn.execute(COUNT_INCOMPLETE)).scalar()
+        unique = (await conn.execute(text("SELECT COUNT(*) FROM product_import"))).scalar()
+
+        if conn.dialect.name != "postgresql":
+            await conn.execute(text("DROP TABLE temp.product_import"))
+
+    seconds = time.perf_counter() - start
+    report = {
+        "received": received,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": unique - inserted - updated - incomplete,
+        "duplicates": staged - unique,
+        "incomplete": incomplete,
+        "rejected": rejected,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(received / seconds, 1) if seconds > 0 else 0.0
+    }
+    print(
+        f"📥 Importación: {received} filas en {report['seconds']}s "
+        f"({report['rows_per_second']} filas/s), {inserted} nuevas, {updated} actualizadas"
+    )
+    return report
@@ -0,0 +1,71 @@
+"""
+Snapshot pre-serializado del resumen del catálogo
+Se versiona con el número de filas y el último updated_at; solo se
+reconstruye cuando la versión cambia
+"""
+import json
+from typing import Dict, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+
+
+class CatalogSnapshot:
+    """Resumen del catálogo serializado una vez por versión"""
+
+    def __init__(self):
+        # include_description -> (versión, cuerpo JSON)
+        self._bodies: Dict[bool, Tuple[str, bytes]] = {}
+
+    async def get_version(self, db: AsyncSession) -> str:
+        """
+        Versión actual del catálogo: número de productos + última modificación
+        Cambia al insertar, eliminar o actualizar productos
+        """
+        result = await db.execute(
+            select(
+                func.count(Product.id),
+                func.max(func.coalesce(Product.updated_at, Product.created_at))
+            )
+        )
+        count, last_modified = result.one()
+        timestamp = int(last_modified.timestamp() * 1_000_000) if last_modified else 0
+        return f"{count}-{timestamp}"
+
+    async def get_body(self, db: AsyncSession, version: str, include_description: bool) -> bytes:
+        """Retorna el JSON del resumen, reconstruyéndolo solo si la versión cambió"""
+        cached = self._bodies.get(include_description)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        columns = [Product.id, Product.name, Product.price]
+        if include_description:
+            columns.append(Product.description)
+
+        result = await db.execute(select(*columns).order_by(Product.id))
+        products = result.all()
+
+        body = json.dumps({
+            "total": len(products),
+            "version": version,
+            "catalog": [
+                {
+                    "id": p.id,
+                    "name": p.name,
+                    "price": p.price,
+                    **({"description": p.description} if include_description else {})
+                }
+                for p in products
+            ]
+        }, ensure_ascii=False).encode("utf-8")
+
+        self._bodies[include_description] = (version, body)
+        return body
+
+    def clear(self):
+        """Descarta los snapshots (se reconstruyen en la próxima petición)"""
+        self._bodies.clear()
+
+
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,287 @@
+"""
+Feed de cambios de productos
+Triggers de la base de datos registran cada alta, baja o cambio de nombre,
+descripción, precio o stock en product_changes. El id de cada registro es la
+versión del feed: los clientes piden los cambios posteriores a su versión con
+long-polling en GET /api/products/changes
+- PostgreSQL: el trigger además hace NOTIFY para despertar a los clientes en espera
+- SQLite: un contador de versión en memoria se actualiza consultando el registro
+En PostgreSQL los ids salen de una secuencia al insertar y las transacciones
+pueden confirmarse en otro orden: un hueco en los ids puede ser un cambio aún
+sin confirmar. El feed solo publica hasta la versión estable (sin huecos
+pendientes); un hueco que dura más de CHANGE_FEED_GAP_SECONDS se considera
+una transacción revertida. El registro conserva los últimos
+CHANGE_FEED_RETENTION cambios; un cliente más atrasado recibe reset
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+# Cada cuánto se consulta la última versión (respaldo de NOTIFY y único mecanismo en SQLite)
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_SECONDS", 1.0))
+# Espera máxima de una petición de long-polling
+CHANGE_FEED_MAX_TIMEOUT = float(os.getenv("CHANGE_FEED_MAX_TIMEOUT", 30.0))
+# Máximo de registros del feed por respuesta
+CHANGE_FEED_BATCH_LIMIT = int(os.getenv("CHANGE_FEED_BATCH_LIMIT", 500))
+# Espera máxima de un hueco en los ids antes de darlo por transacción revertida
+CHANGE_FEED_GAP_SECONDS = float(os.getenv("CHANGE_FEED_GAP_SECONDS", 10.0))
+# Registros del feed que se conservan (los más antiguos se eliminan)
+CHANGE_FEED_RETENTION = int(os.getenv("CHANGE_FEED_RETENTION", 100000))
+# Intervalo de la limpieza de registros antiguos
+CHANGE_FEED_PRUNE_SECONDS = float(os.getenv("CHANGE_FEED_PRUNE_SECONDS", 300.0))
+
+# Ids por consulta al buscar huecos; al arrancar solo se revisan los últimos
+GAP_SCAN_LIMIT = 10000
+
+NOTIFY_CHANNEL = "product_changes"
+
+POSTGRES_SETUP = [
+    f"""
+    CREATE OR REPLACE FUNCTION record_product_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO product_changes (product_id, operation) VALUES (OLD.id, 'delete');
+        ELSIF TG_OP = 'INSERT'
+            OR (NEW.name, NEW.description, NEW.price, NEW.stock)
+               IS DISTINCT FROM (OLD.name, OLD.description, OLD.price, OLD.stock) THEN
+            INSERT INTO product_changes (product_id, operation) VALUES (NEW.id, lower(TG_OP));
+        ELSE
+            RETURN NULL;
+        END IF;
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS products_change_feed ON products",
+    """
+    CREATE TRIGGER products_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION record_product_change()
+    """,
+]
+
+SQLITE_SETUP = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_changes_ai AFTER INSERT ON products BEGIN
+        INSERT INTO product_changes (product_id, operation) VALUES (new.id, 'insert');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_changes_au AFTER UPDATE ON products
+    WHEN new.name IS NOT old.name OR new.description IS NOT old.description
+        OR new.price IS NOT old.price OR new.stock IS NOT old.stock
+    BEGIN
+        INSERT INTO product_changes (product_id, operation) VALUES (new.id, 'update');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_changes_ad AFTER DELETE ON products BEGIN
+        INSERT INTO product_changes (product_id, operation) VALUES (old.id, 'delete');
+    END
+    """,
+]
+
+CHANGES_QUERY = text("""
+    SELECT c.id, c.product_id, c.operation,
+           p.name, p.description, p.price, p.stock
+    FROM product_changes c
+    LEFT JOIN products p ON p.id = c.product_id
+    WHERE c.id > :since AND c.id <= :until
+    ORDER BY c.id
+    LIMIT :limit
+""")
+
+BOUNDS_QUERY = text("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM product_changes")
+
+IDS_QUERY = text("SELECT id FROM product_changes WHERE id > :since ORDER BY id LIMIT :limit")
+
+
+def setup_change_feed(engine: Engine):
+    """
+    Crea los triggers que alimentan product_changes
+    Es idempotente: puede ejecutarse en cada arranque
+    """
+    dialect = engine.dialect.name
+    statements = POSTGRES_SETUP if dialect == "postgresql" else SQLITE_SETUP if dialect == "sqlite" else []
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+class ChangeFeed:
+    """Versión vigente del feed y espera de cambios para long-polling"""
+
+    def __init__(self):
+        # Versión estable: todos los cambios hasta ella están confirmados
+        self.latest_version = 0
+        self._changed = asyncio.Event()
+        self._poll_task: asyncio.Task | None = None
+        self._listen_connection = None
+        self._stable: Optional[int] = None
+        # Primera vez que se vio cada hueco, por el id que lo sigue
+        self._gaps: Dict[int, float] = {}
+        self._last_prune = time.monotonic()
+
+    async def start(self, engine: AsyncEngine):
+        """Lee la versión actual e inicia la detección de cambios"""
+        if self._poll_task is not None:
+            return
+        await self.refresh(engine)
+        self._poll_task = asyncio.create_task(self._poll_loop(engine))
+
+        if engine.dialect.name == "postgresql":
+            try:
+                self._listen_connection = await engine.connect()
+                raw = await self._listen_connection.get_raw_connection()
+                await raw.driver_connection.add_listener(
+                    NOTIFY_CHANNEL,
+                    lambda *_: asyncio.create_task(self.refresh(engine))
+                )
+            except Exception as e:
+                print(f"⚠️ LISTEN no disponible, el feed usa solo polling: {e}")
+
+    async def stop(self):
+        """Detiene la detección de cambios"""
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._listen_connection is not None:
+            await self._listen_connection.close()
+            self._listen_connection = None
+
+    async def refresh(self, engine: AsyncEngine):
+        """Actualiza la versión vigente y despierta a los clientes en espera si cambió"""
+        async with engine.connect() as conn:
+            version = await self.stable_version(conn)
+        if version != self.latest_version:
+            self.latest_version = version
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    async def stable_version(self, conn) -> int:
+        """
+        Última versión sin huecos pendientes por delante
+
+        Recorre los ids posteriores a la versión estable; se detiene en el
+        primer hueco visto hace menos de CHANGE_FEED_GAP_SECONDS
+        """
+        oldest, latest = (await conn.execute(BOUNDS_QUERY)).one()
+        if self._stable is None or latest < self._stable:
+            # Arranque o base recreada: los huecos antiguos ya no están en curso
+            self._stable = max(oldest - 1, latest - GAP_SCAN_LIMIT, 0)
+            self._gaps.clear()
+
+        stable = self._stable
+        now = time.monotonic()
+        while stable < latest:
+            ids = (await conn.execute(IDS_QUERY, {"since": stable, "limit": GAP_SCAN_LIMIT})).scalars().all()
+            blocked = False
+            for change_id in ids:
+                if change_id != stable + 1:
+                    first_seen = self._gaps.setdefault(change_id, now)
+                    if now - first_seen < CHANGE_FEED_GAP_SECONDS:
+                        blocked = True
+                        break
+                stable = change_id
+            if blocked or len(ids) < GAP_SCAN_LIMIT:
+                break
+
+        # Consultas concurrentes: la versión estable nunca retrocede
+        self._stable = max(self._stable, stable)
+        self._gaps = {change_id: seen for change_id, seen in self._gaps.items() if change_id > self._stable}
+        return self._stable
+
+    async def prune(self, engine: AsyncEngine):
+        """Elimina los registros anteriores a los últimos CHANGE_FEED_RETENTION"""
+        cutoff = self.latest_version - CHANGE_FEED_RETENTION
+        if cutoff <= 0:
+            return
+        async with engine.begin() as conn:
+            result = await conn.execute(text("DELETE FROM product_changes WHERE id <= :cutoff"), {"cutoff": cutoff})
+        if result.rowcount:
+            print(f"🧹 Feed de cambios: {result.rowcount} registros antiguos eliminados")
+
+    async def _poll_loop(self, engine: AsyncEngine):
+        while True:
+            await asyncio.sleep(CHANGE_FEED_POLL_SECONDS)
+            try:
+                await self.refresh(engine)
+                if time.monotonic() - self._last_prune >= CHANGE_FEED_PRUNE_SECONDS:
+                    self._last_prune = time.monotonic()
+                    await self.prune(engine)
+            except Exception as e:
+                print(f"⚠️ Error consultando el feed de cambios: {e}")
+
+    async def wait(self, since: int, timeout: float):
+        """Espera hasta que haya una versión posterior a since o venza el timeout"""
+        if self.latest_version > since:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def get_changes(self, db: AsyncSession, since: int, limit: int) -> Dict[str, Any]:
+        """
+        Cambios posteriores a since con el estado actual de cada producto
+
+        Si un producto cambió varias veces solo se incluye su último cambio.
+        "product" es None cuando el producto ya no existe. Solo se incluyen
+        cambios hasta la versión estable. reset indica que since es posterior
+        a la última versión (la base se recreó) o anterior a los registros
+        conservados, y el cliente debe recargar el catálogo completo
+        """
+        oldest, latest = (await db.execute(BOUNDS_QUERY)).one()
+        if since > latest or since < oldest - 1:
+            return empty_changes(self.latest_version, reset=True)
+
+        rows = (await db.execute(
+            CHANGES_QUERY, {"since": since, "until": self.latest_version, "limit": limit + 1}
+        )).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        latest: Dict[str, Any] = {}
+        for row in rows:
+            latest.pop(row.product_id, None)
+            latest[row.product_id] = {
+                "version": row.id,
+                "product_id": row.product_id,
+                "operation": row.operation,
+                "product": None if row.name is None else {
+                    "id": row.product_id,
+                    "name": row.name,
+                    "description": row.description,
+                    "price": row.price,
+                    "stock": row.stock
+                }
+            }
+
+        return {
+            "version": rows[-1].id if rows else since,
+            "changes": list(latest.values()),
+            "has_more": has_more,
+            "reset": False
+        }
+
+
+change_feed = ChangeFeed()
+
+
+def empty_changes(version: int, reset: bool = False) -> Dict[str, Any]:
+    """Respuesta sin cambios (arranque del cliente o feed reiniciado)"""
+    return {"version": version, "changes": [], "has_more": False, "reset": reset}
+
+
+def clamp_timeout(timeout: Optional[float]) -> float:
+    """Timeout de long-polling acotado a CHANGE_FEED_MAX_TIMEOUT"""
+    return max(0.0, min(timeout or 0.0, CHANGE_FEED_MAX_TIMEOUT))
@@ -1,22 +1,106 @@
-from sqlalchemy import create_engine
+import asyncio
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
+from app.metrics import instrument_engine
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+# Conexiones abiertas por adelantado al arrancar
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", DB_POOL_SIZE))
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Traduce la URL síncrona al driver asíncrono equivalente
+    postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://
+    """
+    if url.startswith("postgresql+asyncpg://") or url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+def get_sync_database_url(url: str) -> str:
+    """Traduce una URL asíncrona al driver síncrono (para init_db.py y el esquema)"""
+    return url.replace("+asyncpg", "").replace("+aiosqlite", "")
+
+
+def get_engine_options(url: str) -> dict:
+    """Opciones del pool según el motor (SQLite usa el pool por defecto)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Motor síncrono: creación del esquema e init_db.py
+engine = create_engine(
+    get_sync_database_url(DATABASE_URL),
+    **get_engine_options(DATABASE_URL)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono: rutas de la API (asyncpg / aiosqlite)
+async_engine = create_async_engine(
+    get_async_database_url(DATABASE_URL),
+    **get_engine_options(DATABASE_URL)
+)
+# Tiempo de cada consulta (histograma products_db_query_duration_seconds)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+
+async def warm_up_pool(connections: int = DB_WARMUP_CONNECTIONS):
+    """
+    Abre conexiones del pool asíncrono en paralelo antes de recibir tráfico
+    (las primeras peticiones no pagan el handshake con la base de datos)
+    """
+    async def ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(max(1, connections))))
+
 # Dependency para obtener la sesión de DB
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency para obtener la sesión asíncrona de DB
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
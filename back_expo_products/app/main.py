@@ -1,16 +1,73 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
+import asyncio
 import os
+import time
 
 from app.routers import products
-from app.database import engine, Base
+from app.database import engine, async_engine, warm_up_pool
+from app.schema import create_schema, DB_CREATE_SCHEMA
+from app.search import detect_search_features
+from app.change_feed import change_feed
+from app.read_model import read_model, READ_MODEL_ENABLED
+from app.metrics import HTTP_LATENCY, render_metrics
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Crear todas las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+# Espera entre intentos de calentamiento si la base de datos no responde
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 5.0))
+
+
+async def warm_up(app: FastAPI):
+    """
+    Prepara el servicio antes de marcarlo como listo (/ready):
+    pool de conexiones, capacidades de búsqueda, feed de cambios y read model
+    """
+    start = time.perf_counter()
+    while True:
+        try:
+            await warm_up_pool()
+            await detect_search_features(async_engine)
+            await change_feed.start(async_engine)
+            if READ_MODEL_ENABLED:
+                await read_model.start(async_engine)
+            break
+        except Exception as e:
+            # Base de datos aún no disponible o esquema sin crear: se reintenta
+            app.state.warmup_error = str(e)
+            print(f"⚠️ Error en el calentamiento, reintento en {WARMUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    app.state.ready = True
+    app.state.warmup_error = None
+    print(f"✅ Servicio listo en {time.perf_counter() - start:.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la aplicación
+    Crea el esquema solo si DB_CREATE_SCHEMA está activo, calienta el servicio
+    en segundo plano (/ready responde 503 hasta terminar) y libera el pool de
+    conexiones asíncrono al apagar el servicio
+    """
+    app.state.ready = False
+    app.state.warmup_error = None
+    if DB_CREATE_SCHEMA:
+        # DDL con el motor síncrono fuera del event loop
+        await asyncio.to_thread(create_schema, engine)
+        print("🔨 Esquema de la base de datos verificado")
+
+    warmup_task = asyncio.create_task(warm_up(app))
+    yield
+    warmup_task.cancel()
+    await read_model.stop()
+    await change_feed.stop()
+    await async_engine.dispose()
+
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -18,7 +75,8 @@ app = FastAPI(
     description="API REST para gestión de productos e inventario",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir peticiones desde el frontend
@@ -32,6 +90,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Registra la latencia de cada ruta (por plantilla, no por URL concreta)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_LATENCY.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=str(response.status_code)
+    )
+    return response
+
+
 # Incluir routers
 app.include_router(products.router)
 
@@ -48,7 +121,9 @@ def root():
         "endpoints": {
             "products": "/api/products",
             "stock": "/api/products/{product_id}/stock",
-            "pricing": "/api/products/{product_id}/pricing"
+            "pricing": "/api/products/{product_id}/pricing",
+            "changes": "/api/products/changes",
+            "import": "POST /api/products/import"
         }
     }
 
@@ -56,9 +131,30 @@ def root():
 @app.get("/health")
 def health_check():
     """
-    Health check endpoint para monitoreo
+    Health check endpoint para monitoreo (liveness: el proceso responde)
+    """
+    return {"status": "healthy", "read_model": read_model.stats()}
+
+
+@app.get("/ready")
+def readiness_check(response: Response):
+    """
+    Readiness: 200 cuando el calentamiento terminó y el servicio puede
+    recibir tráfico, 503 mientras tanto
+    """
+    if not app.state.ready:
+        response.status_code = 503
+        return {"status": "starting", "error": app.state.warmup_error}
+    return {"status": "ready"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Métricas en formato de texto de Prometheus
+    (latencia por ruta y duración de las consultas a la base de datos)
     """
-    return {"status": "healthy"}
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""
+Métricas en formato de texto de Prometheus
+Histogramas en memoria para latencia por ruta y tiempo de consultas a la
+base de datos. Se exponen en /metrics
+"""
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas (equivalente al de prometheus_client)"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # valores de etiquetas -> [conteo por bucket, suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str):
+        """Registra una observación"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        """Líneas en formato de texto de Prometheus"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total_sum, count) in sorted(self._series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {bucket_count}")
+            bucket_labels = ",".join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total_sum}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en formato de texto de Prometheus"""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+REGISTRY: List[Histogram] = []
+
+HTTP_LATENCY = Histogram(
+    "products_http_request_duration_seconds",
+    "Latencia de cada ruta de la API",
+    LATENCY_BUCKETS,
+    ("method", "route", "status")
+)
+DB_QUERY_LATENCY = Histogram(
+    "products_db_query_duration_seconds",
+    "Duración de cada consulta a la base de datos por tipo de sentencia",
+    LATENCY_BUCKETS,
+    ("operation",)
+)
+
+
+def instrument_engine(engine: Engine):
+    """Registra la duración de cada sentencia ejecutada por el motor"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_LATENCY.observe(elapsed, operation=operation)
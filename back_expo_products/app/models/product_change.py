@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ProductChange(Base):
+    """
+    Registro de cambios de productos (feed de cambios)
+    Lo llenan triggers de la base de datos; el id es la versión del feed
+    """
+    __tablename__ = "product_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(String, nullable=False, index=True)
+    operation = Column(String, nullable=False)  # insert, update, delete
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ProductChange(id={self.id}, product_id={self.product_id}, operation={self.operation})>"
@@ -0,0 +1,162 @@
+"""
+Read model en memoria de productos (opcional, READ_MODEL_ENABLED)
+Al arrancar carga los productos en registros compactos indexados por ID y
+sirve las lecturas por ID (producto, stock, precio y lotes) sin abrir una
+conexión a la base de datos. Se mantiene al día de forma incremental leyendo
+el registro del feed de cambios (product_changes), que a diferencia de
+updated_at también refleja las eliminaciones y los cambios hechos con SQL directo.
+Solo avanza hasta la versión estable del feed, para no saltarse cambios que se
+confirman fuera de orden, y recarga todo si los registros pendientes ya se eliminaron
+Si la última actualización exitosa supera READ_MODEL_MAX_STALENESS las
+lecturas vuelven a la base de datos
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.change_feed import change_feed, BOUNDS_QUERY
+from app.models.product import Product
+
+READ_MODEL_ENABLED = os.getenv("READ_MODEL_ENABLED", "False").lower() == "true"
+# Intervalo de actualización incremental
+READ_MODEL_REFRESH_SECONDS = float(os.getenv("READ_MODEL_REFRESH_SECONDS", 1.0))
+# Antigüedad máxima aceptada antes de volver a leer de la base de datos
+READ_MODEL_MAX_STALENESS = float(os.getenv("READ_MODEL_MAX_STALENESS", 5.0))
+
+# IDs por consulta IN (...) al aplicar cambios (por debajo del límite de parámetros)
+REFRESH_CHUNK_SIZE = 1000
+
+CHANGED_IDS_QUERY = text(
+    "SELECT DISTINCT product_id FROM product_changes WHERE id > :since AND id <= :until"
+)
+
+
+class ProductRecord:
+    """Producto en memoria (__slots__: sin __dict__ por instancia)"""
+
+    __slots__ = ("id", "name", "description", "price", "stock", "created_at", "updated_at")
+
+    def __init__(self, id, name, description, price, stock, created_at, updated_at):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.stock = stock
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+# Columnas de products en el orden de ProductRecord
+RECORD_COLUMNS = [Product.__table__.c[name] for name in ProductRecord.__slots__]
+
+
+class ReadModel:
+    """Snapshot de productos indexado por ID con actualización incremental"""
+
+    def __init__(self):
+        self.products: Dict[str, ProductRecord] = {}
+        self.version = 0
+        self.loaded = False
+        self.last_refresh = 0.0
+        self.reloads = 0
+        self.applied = 0
+        self._task: asyncio.Task | None = None
+
+    def get(self, product_id: str) -> Optional[ProductRecord]:
+        """Producto por ID (None si no existe)"""
+        return self.products.get(product_id)
+
+    def is_fresh(self) -> bool:
+        """True si las lecturas pueden servirse desde memoria"""
+        return self.loaded and time.monotonic() - self.last_refresh <= READ_MODEL_MAX_STALENESS
+
+    async def start(self, engine: AsyncEngine):
+        """Carga el snapshot e inicia la actualización periódica"""
+        if self._task is not None:
+            return
+        await self.reload(engine)
+        self._task = asyncio.create_task(self._refresh_loop(engine))
+
+    async def stop(self):
+        """Detiene la actualización periódica"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reload(self, engine: AsyncEngine):
+        """Carga completa de los productos"""
+        async with engine.connect() as conn:
+            # La versión se lee primero: los cambios posteriores se aplican en el siguiente refresh
+            version = await change_feed.stable_version(conn)
+            rows = (await conn.execute(select(*RECORD_COLUMNS))).all()
+
+        self.products = {row.id: ProductRecord(*row) for row in rows}
+        self.version = version
+        self.loaded = True
+        self.last_refresh = time.monotonic()
+        self.reloads += 1
+        print(f"🧠 Read model cargado: {len(self.products)} productos (versión {version})")
+
+    async def refresh(self, engine: AsyncEngine):
+        """Aplica los productos cambiados desde la última versión"""
+        async with engine.connect() as conn:
+            oldest, latest = (await conn.execute(BOUNDS_QUERY)).one()
+            version = await change_feed.stable_version(conn)
+            if latest < self.version or self.version < oldest - 1:
+                # El registro de cambios se reinició (base recreada) o ya no
+                # conserva los cambios pendientes
+                changed = None
+            elif version <= self.version:
+                changed = {}
+            else:
+                ids = (await conn.execute(
+                    CHANGED_IDS_QUERY, {"since": self.version, "until": version}
+                )).scalars().all()
+                changed = dict.fromkeys(ids)
+                for i in range(0, len(ids), REFRESH_CHUNK_SIZE):
+                    chunk = ids[i:i + REFRESH_CHUNK_SIZE]
+                    rows = (await conn.execute(select(*RECORD_COLUMNS).where(Product.id.in_(chunk)))).all()
+                    changed.update({row.id: ProductRecord(*row) for row in rows})
+
+        if changed is None:
+            await self.reload(engine)
+            return
+
+        for product_id, record in changed.items():
+            if record is None:
+                self.products.pop(product_id, None)
+            else:
+                self.products[product_id] = record
+        self.applied += len(changed)
+        self.version = version
+        self.last_refresh = time.monotonic()
+
+    async def _refresh_loop(self, engine: AsyncEngine):
+        while True:
+            await asyncio.sleep(READ_MODEL_REFRESH_SECONDS)
+            try:
+                await self.refresh(engine)
+            except Exception as e:
+                print(f"⚠️ Error actualizando el read model: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del read model"""
+        return {
+            "enabled": READ_MODEL_ENABLED,
+            "fresh": self.is_fresh(),
+            "products": len(self.products),
+            "version": self.version,
+            "staleness_seconds": round(time.monotonic() - self.last_refresh, 3) if self.loaded else None,
+            "reloads": self.reloads,
+            "applied": self.applied
+        }
+
+
+read_model = ReadModel()
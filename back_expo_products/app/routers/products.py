@@ -1,48 +1,291 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from typing import List, Optional
+import hmac
+import os
 
-from app.database import get_db
+from app.database import get_async_db, AsyncSessionLocal, async_engine
 from app.models.product import Product
-from app.schemas.product import ProductResponse, StockResponse, PricingResponse
+from app.catalog_snapshot import catalog_snapshot
+from app.change_feed import change_feed, empty_changes, clamp_timeout, CHANGE_FEED_BATCH_LIMIT
+from app.bulk_import import import_products, ImportRowError
+from app.read_model import read_model
+from app.search import (
+    search_terms,
+    build_search_statement,
+    build_search_query,
+    build_similarity_statement
+)
+from app.schemas.product import (
+    ProductResponse,
+    StockResponse,
+    PricingResponse,
+    BatchRequest,
+    BatchProductItem,
+    BatchResponse
+)
 
 router = APIRouter(
     prefix="/api/products",
     tags=["products"]
 )
 
+# Máximo de IDs aceptados en una consulta por lote
+MAX_BATCH_SIZE = 100
+
+# Filas por lote al recorrer el cursor del servidor en la exportación
+EXPORT_CHUNK_SIZE = 500
+
+# Token requerido por la importación masiva (sin token configurado el endpoint queda deshabilitado)
+IMPORT_TOKEN = os.getenv("IMPORT_TOKEN", "")
+
+
+async def _get_products_batch(ids: List[str], db: AsyncSession) -> BatchResponse:
+    """
+    Resuelve stock y precio de varios productos con una sola consulta IN (...)
+    """
+    # Eliminar duplicados preservando el orden de la petición
+    unique_ids = list(dict.fromkeys(i.strip() for i in ids if i.strip()))
+    
+    if len(unique_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {MAX_BATCH_SIZE} productos por lote"
+        )
+    
+    products = []
+    if read_model.is_fresh():
+        products = [p for p in map(read_model.get, unique_ids) if p is not None]
+    elif unique_ids:
+        result = await db.execute(select(Product).where(Product.id.in_(unique_ids)))
+        products = result.scalars().all()
+    found = {p.id: p for p in products}
+    
+    return BatchResponse(
+        products=[
+            BatchProductItem(
+                product_id=found[i].id,
+                product_name=found[i].name,
+                stock=found[i].stock,
+                status="Disponible" if found[i].stock > 0 else "Agotado",
+                price=found[i].price,
+                currency="USD"
+            )
+            for i in unique_ids if i in found
+        ],
+        not_found=[i for i in unique_ids if i not in found]
+    )
+
+
+async def _get_product(product_id: str, db: AsyncSession):
+    """
+    Producto por ID desde el read model en memoria si está vigente
+    (sin usar una conexión del pool) o desde la base de datos
+    """
+    if read_model.is_fresh():
+        product = read_model.get(product_id)
+    else:
+        product = await db.get(Product, product_id)
+
+    if not product:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Producto con ID {product_id} no encontrado"
+        )
+    return product
+
 
 @router.get("/", response_model=List[ProductResponse])
-def get_all_products(db: Session = Depends(get_db)):
+async def get_all_products(
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor: ID del último producto de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página (1-1000)"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Obtiene todos los productos disponibles
+    Obtiene los productos disponibles ordenados por ID
+    
+    Sin parámetros retorna el catálogo completo. Con `limit` pagina por
+    cursor (keyset) sobre el ID: `?after=S040&limit=100`. Si hay más
+    resultados, el cursor de la siguiente página va en el header `X-Next-Cursor`.
     """
-    products = db.query(Product).all()
+    query = select(Product).order_by(Product.id)
+    if after is not None:
+        query = query.where(Product.id > after)
+    if limit is not None:
+        # Una fila extra indica si existe una página siguiente
+        query = query.limit(limit + 1)
+    
+    result = await db.execute(query)
+    products = result.scalars().all()
+    
+    if limit is not None and len(products) > limit:
+        products = products[:limit]
+        response.headers["X-Next-Cursor"] = products[-1].id
+    
     return products
 
 
+@router.get("/export")
+async def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$", description="ndjson o json"),
+    after: Optional[str] = Query(None, description="Exportar a partir de este ID")
+):
+    """
+    Exporta el catálogo completo en streaming desde un cursor del servidor
+    
+    Las filas se serializan a medida que se leen, sin cargar la tabla en memoria.
+    
+    Args:
+        format: `ndjson` (una línea JSON por producto) o `json` (arreglo JSON)
+        after: Exportar solo los productos con ID mayor a este
+    """
+    query = select(Product).order_by(Product.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    if after is not None:
+        query = query.where(Product.id > after)
+    
+    async def rows():
+        # La sesión vive dentro del generador: se cierra al terminar el streaming
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query)
+            first = True
+            if format == "json":
+                yield "["
+            async for product in result.scalars():
+                data = ProductResponse.model_validate(product).model_dump_json()
+                if format == "json":
+                    yield data if first else "," + data
+                else:
+                    yield data + "\n"
+                first = False
+            if format == "json":
+                yield "]"
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(rows(), media_type=media_type)
+
+
+@router.get("/batch", response_model=BatchResponse)
+async def get_products_batch(
+    ids: str = Query(..., description="IDs separados por coma (ej: S001,M005,T010)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene stock y precio de varios productos en una sola consulta
+    
+    Args:
+        ids: IDs de productos separados por coma
+    
+    Returns:
+        BatchResponse con los productos encontrados y los IDs no encontrados
+    """
+    return await _get_products_batch(ids.split(","), db)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def post_products_batch(request: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Variante POST de la consulta por lote (para listas largas de IDs)
+    
+    Args:
+        request: Lista de IDs de productos
+    
+    Returns:
+        BatchResponse con los productos encontrados y los IDs no encontrados
+    """
+    return await _get_products_batch(request.ids, db)
+
+
+@router.post("/import")
+async def import_products_endpoint(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson o csv (con encabezado)"),
+    x_import_token: Optional[str] = Header(None)
+):
+    """
+    Importación masiva de inventario (upsert) en una sola transacción
+    
+    El cuerpo se procesa en streaming: una línea por producto con `id` y las
+    columnas a actualizar (`name`, `description`, `price`, `stock`). Las
+    columnas ausentes conservan su valor; los productos nuevos requieren
+    nombre, descripción y precio.
+    
+    Args:
+        format: `ndjson` o `csv`
+        x_import_token: Debe coincidir con IMPORT_TOKEN
+    
+    Returns:
+        Reporte con filas insertadas, actualizadas, rechazadas y filas por segundo
+    """
+    if not IMPORT_TOKEN:
+        raise HTTPException(status_code=403, detail="Importación deshabilitada: IMPORT_TOKEN no configurado")
+    if not x_import_token or not hmac.compare_digest(x_import_token.encode(), IMPORT_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de importación inválido")
+    
+    try:
+        report = await import_products(async_engine, request.stream(), format)
+    except ImportRowError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Despierta de inmediato a los clientes del feed de cambios
+    await change_feed.refresh(async_engine)
+    return report
+
+
+@router.get("/changes")
+async def get_product_changes(
+    since: Optional[int] = Query(None, ge=0, description="Última versión del feed que conoce el cliente"),
+    timeout: float = Query(0, ge=0, description="Segundos a esperar si no hay cambios (long-polling)"),
+    limit: int = Query(CHANGE_FEED_BATCH_LIMIT, ge=1, le=CHANGE_FEED_BATCH_LIMIT)
+):
+    """
+    Feed de cambios de productos con long-polling
+
+    Sin `since` retorna la versión actual para que el cliente empiece a
+    seguir el feed desde ahí. Con `since` retorna los cambios posteriores;
+    si no hay ninguno espera hasta `timeout` segundos a que ocurra alguno.
+
+    Args:
+        since: Versión a partir de la cual se quieren los cambios
+        timeout: Espera máxima (acotada por CHANGE_FEED_MAX_TIMEOUT)
+        limit: Máximo de registros del feed por respuesta
+
+    Returns:
+        version, changes (último cambio por producto con su estado actual),
+        has_more y reset (el cliente debe recargar el catálogo completo)
+    """
+    if since is None:
+        return empty_changes(change_feed.latest_version)
+
+    # Sesiones cortas: no se retiene una conexión del pool durante la espera
+    async with AsyncSessionLocal() as db:
+        changes = await change_feed.get_changes(db, since, limit)
+
+    if changes["changes"] or changes["reset"] or timeout <= 0:
+        return changes
+
+    await change_feed.wait(since, clamp_timeout(timeout))
+    async with AsyncSessionLocal() as db:
+        return await change_feed.get_changes(db, since, limit)
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product_by_id(product_id: str, db: Session = Depends(get_db)):
+async def get_product_by_id(product_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Obtiene un producto específico por su ID
     
     Args:
         product_id: ID del producto (ej: S001, M005, T010)
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    
-    if not product:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Producto con ID {product_id} no encontrado"
-        )
+    product = await _get_product(product_id, db)
     
     return product
 
 
 @router.get("/{product_id}/stock", response_model=StockResponse)
-def get_product_stock(product_id: str, db: Session = Depends(get_db)):
+async def get_product_stock(product_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Verifica la disponibilidad de inventario para un producto específico
     
@@ -52,13 +295,7 @@ def get_product_stock(product_id: str, db: Session = Depends(get_db)):
     Returns:
         StockResponse con información de disponibilidad en tiempo real
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    
-    if not product:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Producto con ID {product_id} no encontrado"
-        )
+    product = await _get_product(product_id, db)
     
     return StockResponse(
         product_id=product.id,
@@ -69,7 +306,7 @@ def get_product_stock(product_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{product_id}/pricing", response_model=PricingResponse)
-def get_product_pricing(product_id: str, db: Session = Depends(get_db)):
+async def get_product_pricing(product_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Obtiene el precio actual de un producto
     
@@ -79,13 +316,7 @@ def get_product_pricing(product_id: str, db: Session = Depends(get_db)):
     Returns:
         PricingResponse con información de precio actualizada
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    
-    if not product:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Producto con ID {product_id} no encontrado"
-        )
+    product = await _get_product(product_id, db)
     
     return PricingResponse(
         product_id=product.id,
@@ -95,57 +326,87 @@ def get_product_pricing(product_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/search/query", response_model=List[ProductResponse])
-def search_products(
+async def search_products(
     q: str = Query(..., description="Término de búsqueda"),
     limit: int = Query(5, ge=1, le=20, description="Máximo de resultados (1-20)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Busca productos por nombre o descripción
+    Busca productos por nombre o descripción, ordenados por relevancia
+    
+    Usa el índice de texto completo del motor (tsvector en PostgreSQL, FTS5 en
+    SQLite); en PostgreSQL, si no hay coincidencias, recurre a similitud de
+    trigramas para tolerar errores de tipeo
     
     Args:
-        q: Término de búsqueda (ej: 'gaming', 'laptop', 'monitor')
+        q: Término de búsqueda (ej: 'gaming', 'laptop', 'monitor curvo')
         limit: Número máximo de resultados (default: 5, max: 20)
     
     Returns:
         Lista limitada de productos que coinciden con la búsqueda
     """
-    search_term = f"%{q}%"
+    dialect = db.bind.dialect.name
+    statement = build_search_statement(dialect)
     
-    products = db.query(Product).filter(
-        or_(
-            Product.name.ilike(search_term),
-            Product.description.ilike(search_term)
+    if statement is not None:
+        if not search_terms(q):
+            return []
+        
+        result = await db.execute(
+            select(Product).from_statement(statement),
+            {"query": build_search_query(dialect, q), "limit": limit}
         )
-    ).limit(limit).all()
+        products = result.scalars().all()
+        
+        similarity = build_similarity_statement(dialect)
+        if not products and similarity is not None:
+            result = await db.execute(
+                select(Product).from_statement(similarity),
+                {"q": q, "limit": limit}
+            )
+            products = result.scalars().all()
+        
+        return products
     
-    return products
+    # Búsqueda sin índice (SEARCH_MODE=ilike u otros motores)
+    search_term = f"%{q}%"
+    
+    result = await db.execute(
+        select(Product).where(
+            or_(
+                Product.name.ilike(search_term),
+                Product.description.ilike(search_term)
+            )
+        ).limit(limit)
+    )
+    
+    return result.scalars().all()
 
 
 @router.get("/summary/catalog")
-def get_catalog_summary(db: Session = Depends(get_db)):
+async def get_catalog_summary(
+    request: Request,
+    include_description: bool = Query(False, description="Incluir descripciones (para indexar en RAG)"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Obtiene un resumen simplificado del catálogo
     
-    Retorna solo: ID, nombre y precio (sin descripciones)
+    Retorna solo: ID, nombre y precio (y la descripción si se solicita).
+    El JSON se sirve desde un snapshot pre-serializado versionado por número
+    de productos y último `updated_at`, con `ETag`; si el cliente envía
+    `If-None-Match` con la versión vigente se responde 304 sin cuerpo.
     
     Returns:
         Lista simplificada de productos
     """
-    products = db.query(
-        Product.id,
-        Product.name,
-        Product.price
-    ).all()
-    
-    return {
-        "total": len(products),
-        "catalog": [
-            {
-                "id": p.id,
-                "name": p.name,
-                "price": p.price
-            }
-            for p in products
-        ]
-    }
\ No newline at end of file
+    version = await catalog_snapshot.get_version(db)
+    etag = f'"{version}-{int(include_description)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    body = await catalog_snapshot.get_body(db, version, include_description)
+    return Response(content=body, media_type="application/json", headers=headers)
\ No newline at end of file
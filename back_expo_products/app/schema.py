@@ -0,0 +1,22 @@
+"""
+Creación del esquema de la base de datos
+Tablas, índices de búsqueda y triggers del feed de cambios. Se ejecuta desde
+init_db.py o, si DB_CREATE_SCHEMA está activo, al arrancar el servicio
+"""
+import os
+from sqlalchemy.engine import Engine
+
+from app.database import Base
+from app.models import product, product_change  # noqa: F401 (registra las tablas)
+from app.search import setup_search
+from app.change_feed import setup_change_feed
+
+# Crear el esquema al arrancar (desarrollo); en producción se usa init_db.py
+DB_CREATE_SCHEMA = os.getenv("DB_CREATE_SCHEMA", "False").lower() == "true"
+
+
+def create_schema(engine: Engine):
+    """Crea tablas, índices de búsqueda y triggers (idempotente)"""
+    Base.metadata.create_all(bind=engine)
+    setup_search(engine)
+    setup_change_feed(engine)
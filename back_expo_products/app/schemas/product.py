@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class ProductBase(BaseModel):
@@ -39,4 +39,25 @@ class PricingResponse(BaseModel):
     currency: str = "USD"
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class BatchRequest(BaseModel):
+    """Schema para consulta de varios productos en una sola petición"""
+    ids: List[str]
+
+
+class BatchProductItem(BaseModel):
+    """Schema con stock y precio de un producto dentro de un lote"""
+    product_id: str
+    product_name: str
+    stock: int
+    status: str  # "Disponible" o "Agotado"
+    price: float
+    currency: str = "USD"
+
+
+class BatchResponse(BaseModel):
+    """Schema para respuesta de consulta por lote"""
+    products: List[BatchProductItem]
+    not_found: List[str]
@@ -0,0 +1,192 @@
+"""
+Búsqueda de texto completo de productos
+- PostgreSQL: columna tsvector generada + índice GIN, y pg_trgm para tolerar errores de tipeo
+- SQLite: tabla virtual FTS5 sincronizada con triggers (ejecución local y pruebas)
+Los resultados se ordenan por relevancia y admiten consultas de varias palabras
+"""
+import os
+import re
+import unicodedata
+from typing import List, Optional
+from sqlalchemy import text, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql.elements import TextClause
+
+# "fts" usa los índices de texto completo; "ilike" mantiene la búsqueda anterior
+SEARCH_MODE = os.getenv("SEARCH_MODE", "fts")
+
+# Columnas del modelo Product (excluye search_vector de PostgreSQL)
+PRODUCT_COLUMNS = (
+    "products.id, products.name, products.description, products.price, "
+    "products.stock, products.created_at, products.updated_at"
+)
+
+# Se activa en setup_search si la extensión pg_trgm está disponible
+trgm_available = False
+
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+POSTGRES_TRGM_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING GIN (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_products_description_trgm ON products USING GIN (description gin_trgm_ops)",
+]
+
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        id UNINDEXED, name, description,
+        content='products', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, id, name, description)
+        VALUES (new.rowid, new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, id, name, description)
+        VALUES ('delete', old.rowid, old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, id, name, description)
+        VALUES ('delete', old.rowid, old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, id, name, description)
+        VALUES (new.rowid, new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def setup_search(engine: Engine):
+    """
+    Crea los índices de búsqueda de texto completo según el motor de base de datos
+    Es idempotente: puede ejecutarse en cada arranque
+    """
+    if SEARCH_MODE != "fts":
+        return
+
+    global trgm_available
+    dialect = engine.dialect.name
+
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            for statement in POSTGRES_SETUP:
+                conn.execute(text(statement))
+        try:
+            with engine.begin() as conn:
+                for statement in POSTGRES_TRGM_SETUP:
+                    conn.execute(text(statement))
+            trgm_available = True
+        except Exception as e:
+            print(f"⚠️ pg_trgm no disponible, se omite la búsqueda por similitud: {e}")
+
+    elif dialect == "sqlite":
+        is_new = not inspect(engine).has_table("products_fts")
+        with engine.begin() as conn:
+            for statement in SQLITE_SETUP:
+                conn.execute(text(statement))
+            if is_new:
+                # Indexar las filas que existían antes de crear la tabla FTS
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+
+async def detect_search_features(engine: AsyncEngine):
+    """
+    Detecta si pg_trgm está instalada sin modificar el esquema
+    (cuando el servicio arranca sin DB_CREATE_SCHEMA)
+    """
+    global trgm_available
+    if SEARCH_MODE != "fts" or engine.dialect.name != "postgresql":
+        return
+
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+        trgm_available = result.first() is not None
+
+
+def search_terms(q: str) -> List[str]:
+    """Separa la consulta en términos alfanuméricos (descarta operadores y símbolos)"""
+    return re.findall(r"\w+", q.lower())
+
+
+def build_search_statement(dialect: str) -> Optional[TextClause]:
+    """
+    Construye la consulta rankeada de texto completo para el motor dado
+
+    Cada término se busca por prefijo ("monitor" encuentra "monitores") y basta con
+    que coincida uno; los productos que coinciden con más términos rankean más alto.
+    Retorna None si el motor no soporta búsqueda de texto completo.
+
+    Parámetros ligados: :query y :limit
+    """
+    if SEARCH_MODE != "fts":
+        return None
+
+    if dialect == "postgresql":
+        return text(f"""
+            SELECT {PRODUCT_COLUMNS}
+            FROM products
+            WHERE search_vector @@ to_tsquery('spanish', :query)
+            ORDER BY ts_rank_cd(search_vector, to_tsquery('spanish', :query)) DESC, id
+            LIMIT :limit
+        """)
+
+    if dialect == "sqlite":
+        return text(f"""
+            SELECT {PRODUCT_COLUMNS}
+            FROM products_fts
+            JOIN products ON products.rowid = products_fts.rowid
+            WHERE products_fts MATCH :query
+            ORDER BY bm25(products_fts, 0.0, 10.0, 1.0), products.id
+            LIMIT :limit
+        """)
+
+    return None
+
+
+def build_search_query(dialect: str, q: str) -> str:
+    """Traduce los términos de la consulta a la sintaxis del motor"""
+    terms = search_terms(q)
+
+    if dialect == "postgresql":
+        return " | ".join(f"{term}:*" for term in terms)
+
+    # FTS5: términos entre comillas para neutralizar la sintaxis de consulta
+    normalized = [
+        "".join(c for c in unicodedata.normalize("NFKD", term) if not unicodedata.combining(c))
+        for term in terms
+    ]
+    return " OR ".join(f'"{term}"*' for term in normalized)
+
+
+def build_similarity_statement(dialect: str) -> Optional[TextClause]:
+    """
+    Consulta de respaldo por similitud de trigramas (tolera errores de tipeo)
+    Solo disponible en PostgreSQL con pg_trgm. Parámetros ligados: :q y :limit
+    """
+    if SEARCH_MODE != "fts" or dialect != "postgresql" or not trgm_available:
+        return None
+
+    return text(f"""
+        SELECT {PRODUCT_COLUMNS}
+        FROM products
+        WHERE name % :q OR description % :q
+        ORDER BY greatest(similarity(name, :q), similarity(description, :q)) DESC, id
+        LIMIT :limit
+    """)
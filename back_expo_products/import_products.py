@@ -0,0 +1,60 @@
+"""
+Script de importación masiva de inventario
+Aplica un archivo CSV o NDJSON (upsert por id) en una sola transacción
+
+Uso:
+    python import_products.py inventario.csv
+    python import_products.py inventario.ndjson
+    python import_products.py - --format csv < inventario.csv
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from app.database import async_engine
+from app.bulk_import import import_products, ImportRowError
+
+# Bytes leídos del archivo por bloque
+READ_CHUNK_SIZE = 1 << 20
+
+
+async def read_chunks(stream):
+    """Lee el archivo por bloques sin cargarlo completo en memoria"""
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def main(path: str, format: str):
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        report = await import_products(async_engine, read_chunks(stream), format)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        await async_engine.dispose()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importación masiva de productos (CSV o NDJSON)")
+    parser.add_argument("path", help="Archivo a importar ('-' para stdin)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Por defecto según la extensión")
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if Path(args.path).suffix.lower() == ".csv" else "ndjson")
+
+    print("=" * 50)
+    print(f"📦 Importando productos desde {args.path} ({format})")
+    print("=" * 50)
+    try:
+        asyncio.run(main(args.path, format))
+    except ImportRowError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✨ Importación completada")
@@ -3,6 +3,9 @@ Script de inicialización de base de datos
 Crea las tablas de la base de datos
 """
 from app.database import engine, Base
+from app.search import setup_search
+from app.change_feed import setup_change_feed
+from app.models import product, product_change  # noqa: F401 (registra las tablas)
 
 
 def init_db():
@@ -12,6 +15,16 @@ def init_db():
     print("🔨 Creando tablas en la base de datos...")
     Base.metadata.create_all(bind=engine)
     print("✅ Tablas creadas exitosamente")
+    
+    # Índices de búsqueda de texto completo
+    print("🔎 Creando índices de búsqueda...")
+    setup_search(engine)
+    print("✅ Índices de búsqueda creados")
+    
+    # Triggers del feed de cambios
+    print("📡 Creando triggers del feed de cambios...")
+    setup_change_feed(engine)
+    print("✅ Feed de cambios configurado")
     print("\n💡 Usa el archivo seed_products.sql para cargar productos de demo")
 
 
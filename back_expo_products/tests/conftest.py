@@ -0,0 +1,69 @@
+"""
+Configuración común de las pruebas
+Las variables se fijan antes de importar app (los módulos las leen al importarse):
+base SQLite temporal creada al arrancar y feed de cambios con esperas cortas
+"""
+import os
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="products-tests-"), "products.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DB_CREATE_SCHEMA"] = "true"
+os.environ["IMPORT_TOKEN"] = "test-token"
+os.environ["READ_MODEL_ENABLED"] = "false"
+os.environ["CHANGE_FEED_POLL_SECONDS"] = "0.05"
+os.environ["CHANGE_FEED_GAP_SECONDS"] = "0.3"
+
+import asyncio  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.change_feed import change_feed  # noqa: E402
+from app.database import engine, async_engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+
+PRODUCTS = [
+    ("S001", "Silla Ergonómica Pro", "Silla de oficina", 299.99, 15),
+    ("S002", "Silla Gamer", "Silla con soporte lumbar", 199.99, 0),
+    ("M005", "Monitor 4K Curvo", "Monitor de 32 pulgadas", 549.99, 4),
+    ("T010", "Teclado Mecánico", "Teclado con switches rojos", 89.99, 30),
+]
+
+
+def execute(*statements: str, **params):
+    """Ejecuta SQL con el motor síncrono (simula cambios hechos fuera de la API)"""
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement), params)
+
+
+@pytest.fixture
+async def client():
+    """
+    Servicio con el esquema creado y productos de ejemplo
+    Cada prueba empieza con las tablas vacías y el feed de cambios desde 1
+    """
+    async with lifespan(app):
+        while not app.state.ready:
+            await asyncio.sleep(0.01)
+
+        execute(
+            "DELETE FROM products",
+            "DELETE FROM product_changes",
+            "DELETE FROM sqlite_sequence WHERE name = 'product_changes'"
+        )
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO products (id, name, description, price, stock) "
+                    "VALUES (:id, :name, :description, :price, :stock)"
+                ),
+                [dict(zip(("id", "name", "description", "price", "stock"), p)) for p in PRODUCTS]
+            )
+        await change_feed.refresh(async_engine)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            yield http
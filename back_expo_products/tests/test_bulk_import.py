@@ -0,0 +1,55 @@
+"""
+Importación masiva: autenticación, reporte y errores de formato
+"""
+import pytest
+
+from app.routers import products as products_router
+
+HEADERS = {"X-Import-Token": "test-token"}
+
+
+async def test_import_requires_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(products_router, "IMPORT_TOKEN", "")
+    response = await client.post("/api/products/import", content=b"", headers=HEADERS)
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Import-Token": "otro"}])
+async def test_import_rejects_missing_or_wrong_token(client, headers):
+    response = await client.post("/api/products/import", content=b"", headers=headers)
+    assert response.status_code == 401
+
+
+async def test_csv_import_reports_each_outcome(client):
+    body = (
+        "id,name,description,price,stock\n"
+        "S001,,,,7\n"                           # actualiza solo el stock
+        "T010,Teclado Mecánico,,89.99,\n"       # sin cambios
+        "N001,Nuevo,Producto nuevo,10,3\n"      # alta
+        "N002,,,,1\n"                           # alta incompleta (sin nombre ni precio)
+        "N003,Otro,Descripción,caro,1\n"        # precio inválido
+    )
+    response = await client.post(
+        "/api/products/import", params={"format": "csv"}, content=body.encode(), headers=HEADERS
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["received"] == 5
+    assert report["inserted"] == 1
+    assert report["updated"] == 1
+    assert report["unchanged"] == 1
+    assert report["incomplete"] == 1
+    assert report["rejected"] == 1
+    assert report["errors"][0]["line"] == 6
+
+    stock = await client.get("/api/products/S001/stock")
+    assert stock.json()["stock"] == 7
+    assert (await client.get("/api/products/N001")).status_code == 200
+
+
+async def test_csv_without_id_column_is_rejected(client):
+    response = await client.post(
+        "/api/products/import", params={"format": "csv"}, content=b"name,price\nx,1\n", headers=HEADERS
+    )
+    assert response.status_code == 400
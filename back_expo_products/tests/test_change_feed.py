@@ -0,0 +1,132 @@
+"""
+Feed de cambios (long-polling, huecos, retención) y read model en memoria
+"""
+import asyncio
+import time
+
+from app.change_feed import change_feed
+from app.database import async_engine
+from app.read_model import ReadModel
+from conftest import PRODUCTS, execute
+
+
+def record_change(change_id: int, product_id: str = "S001"):
+    """Inserta un registro del feed con un id elegido (simula confirmaciones fuera de orden)"""
+    execute(
+        "INSERT INTO product_changes (id, product_id, operation) VALUES (:id, :product_id, 'update')",
+        id=change_id, product_id=product_id
+    )
+
+
+async def test_bootstrap_and_changes_since_a_version(client):
+    start = (await client.get("/api/products/changes")).json()
+    assert start == {"version": len(PRODUCTS), "changes": [], "has_more": False, "reset": False}
+
+    execute(
+        "UPDATE products SET stock = 3 WHERE id = 'S001'",
+        "UPDATE products SET stock = 2 WHERE id = 'S001'",
+        "DELETE FROM products WHERE id = 'S002'",
+        "UPDATE products SET name = name WHERE id = 'T010'",
+    )
+    await change_feed.refresh(async_engine)
+
+    data = (await client.get("/api/products/changes", params={"since": start["version"]})).json()
+    # Un cambio por producto (el último) y nada por actualizaciones sin cambios
+    assert [(c["product_id"], c["operation"]) for c in data["changes"]] == [("S001", "update"), ("S002", "delete")]
+    assert data["changes"][0]["product"]["stock"] == 2
+    assert data["changes"][1]["product"] is None
+    assert data["version"] == start["version"] + 3
+
+
+async def test_long_poll_wakes_up_on_a_change(client):
+    version = (await client.get("/api/products/changes")).json()["version"]
+
+    async def change_later():
+        await asyncio.sleep(0.1)
+        execute("UPDATE products SET price = 1.5 WHERE id = 'M005'")
+
+    writer = asyncio.create_task(change_later())
+    start = time.perf_counter()
+    data = (await client.get("/api/products/changes", params={"since": version, "timeout": 5})).json()
+    await writer
+
+    assert time.perf_counter() - start < 2
+    assert [c["product_id"] for c in data["changes"]] == ["M005"]
+
+
+async def test_feed_waits_for_gaps_before_advancing(client):
+    version = (await client.get("/api/products/changes")).json()["version"]
+
+    # version + 1 aún sin confirmar; version + 2 ya es visible
+    record_change(version + 2, "M005")
+    await change_feed.refresh(async_engine)
+    blocked = (await client.get("/api/products/changes", params={"since": version})).json()
+    assert blocked["version"] == version
+    assert blocked["changes"] == []
+
+    record_change(version + 1, "S001")
+    await change_feed.refresh(async_engine)
+    filled = (await client.get("/api/products/changes", params={"since": version})).json()
+    assert [c["product_id"] for c in filled["changes"]] == ["S001", "M005"]
+    assert filled["version"] == version + 2
+
+
+async def test_gap_is_skipped_after_the_gap_timeout(client):
+    version = (await client.get("/api/products/changes")).json()["version"]
+
+    record_change(version + 2, "M005")
+    data = (await client.get("/api/products/changes", params={"since": version, "timeout": 3})).json()
+
+    assert data["version"] == version + 2
+    assert [c["product_id"] for c in data["changes"]] == ["M005"]
+
+
+async def test_reset_when_since_is_outside_the_retained_range(client):
+    version = (await client.get("/api/products/changes")).json()["version"]
+
+    ahead = (await client.get("/api/products/changes", params={"since": version + 100})).json()
+    assert ahead["reset"] is True
+
+    execute("DELETE FROM product_changes WHERE id <= 2")
+    behind = (await client.get("/api/products/changes", params={"since": 0})).json()
+    assert behind["reset"] is True
+    assert behind["version"] == version
+
+    current = (await client.get("/api/products/changes", params={"since": 2})).json()
+    assert current["reset"] is False
+
+
+async def test_read_model_applies_changes_incrementally(client):
+    read_model = ReadModel()
+    await read_model.reload(async_engine)
+    assert read_model.get("S001").stock == 15
+
+    execute(
+        "UPDATE products SET stock = 42 WHERE id = 'S001'",
+        "DELETE FROM products WHERE id = 'S002'",
+        "INSERT INTO products (id, name, description, price, stock) VALUES ('A3', 'c', 'd', 3.0, 1)",
+    )
+    await read_model.refresh(async_engine)
+
+    assert read_model.get("S001").stock == 42
+    assert read_model.get("S002") is None
+    assert read_model.get("A3").name == "c"
+    assert read_model.reloads == 1
+    assert read_model.is_fresh()
+
+
+async def test_read_model_reloads_when_the_log_was_pruned(client):
+    read_model = ReadModel()
+    await read_model.reload(async_engine)
+
+    execute(
+        "UPDATE products SET stock = 2 WHERE id = 'T010'",
+        "UPDATE products SET stock = 3 WHERE id = 'T010'",
+    )
+    await change_feed.refresh(async_engine)
+    execute("DELETE FROM product_changes WHERE id <= :version", version=read_model.version + 1)
+
+    await read_model.refresh(async_engine)
+
+    assert read_model.reloads == 2
+    assert read_model.get("T010").stock == 3
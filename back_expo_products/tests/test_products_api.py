@@ -0,0 +1,61 @@
+"""
+Endpoints de lectura: lotes, paginación por cursor y snapshot del catálogo
+"""
+from conftest import PRODUCTS, execute
+
+
+async def test_batch_reports_found_and_not_found(client):
+    response = await client.post("/api/products/batch", json={"ids": ["M005", "X999", "M005", "S002"]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["product_id"] for p in data["products"]] == ["M005", "S002"]
+    assert data["products"][1]["status"] == "Agotado"
+    assert data["not_found"] == ["X999"]
+
+
+async def test_batch_get_variant_and_size_limit(client):
+    response = await client.get("/api/products/batch", params={"ids": "S001,T010"})
+    assert [p["product_id"] for p in response.json()["products"]] == ["S001", "T010"]
+
+    too_many = await client.post("/api/products/batch", json={"ids": [f"X{i:03d}" for i in range(101)]})
+    assert too_many.status_code == 400
+
+
+async def test_keyset_pagination_walks_the_catalog(client):
+    seen = []
+    params = {"limit": 3}
+    while True:
+        response = await client.get("/api/products/", params=params)
+        seen += [p["id"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 3, "after": cursor}
+
+    assert seen == sorted(p[0] for p in PRODUCTS)
+
+
+async def test_catalog_snapshot_etag_and_304(client):
+    first = await client.get("/api/products/summary/catalog", params={"include_description": True})
+    etag = first.headers["ETag"]
+    assert first.json()["total"] == len(PRODUCTS)
+
+    unchanged = await client.get(
+        "/api/products/summary/catalog",
+        params={"include_description": True},
+        headers={"If-None-Match": etag}
+    )
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    # Fecha explícita: CURRENT_TIMESTAMP de SQLite tiene resolución de segundos
+    execute("UPDATE products SET price = 9.99, updated_at = '2099-01-01 00:00:00' WHERE id = 'T010'")
+    changed = await client.get(
+        "/api/products/summary/catalog",
+        params={"include_description": True},
+        headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert {p["id"]: p["price"] for p in changed.json()["catalog"]}["T010"] == 9.99
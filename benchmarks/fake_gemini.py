@@ -0,0 +1,130 @@
+"""
+Fake Gemini - Servidor local que imita generateContent / streamGenerateContent
+Responde con un guion determinista para que el benchmark no dependa de la API real:
+- Mensaje con ID de producto (S001)        -> functionCall verificar_stock
+- Mensaje con "busca", "tienen", "recomienda" -> functionCall buscar_productos
+- Turno con functionResponse              -> texto que resume el resultado
+- Petición sin herramientas (resumen)     -> texto corto
+- Cualquier otro mensaje                  -> texto
+
+Variables de entorno:
+- FAKE_GEMINI_LATENCY_MS: latencia base por llamada (default 300)
+- FAKE_GEMINI_JITTER_MS: variación aleatoria adicional (default 100)
+- FAKE_GEMINI_CHUNK_DELAY_MS: pausa entre fragmentos en streaming (default 20)
+
+Uso:
+    uvicorn benchmarks.fake_gemini:app --port 8090
+"""
+import asyncio
+import json
+import os
+import random
+import re
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY_MS = float(os.getenv("FAKE_GEMINI_LATENCY_MS", 300))
+JITTER_MS = float(os.getenv("FAKE_GEMINI_JITTER_MS", 100))
+CHUNK_DELAY_MS = float(os.getenv("FAKE_GEMINI_CHUNK_DELAY_MS", 20))
+
+PRODUCT_ID_PATTERN = re.compile(r"\b([A-Za-z]\d{3})\b")
+SEARCH_WORDS = ("busca", "tienen", "recomienda", "muestra")
+
+app = FastAPI(title="Fake Gemini")
+
+stats = {"calls": 0, "stream_calls": 0}
+
+
+def estimate_tokens(payload: Dict[str, Any]) -> int:
+    """Tokens aproximados de la petición (~4 caracteres por token)"""
+    return len(json.dumps(payload, ensure_ascii=False)) // 4 + 1
+
+
+def script_parts(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Partes de la respuesta según el último turno de la conversación"""
+    last = payload["contents"][-1]
+    parts = last.get("parts", [])
+
+    if any("functionResponse" in part for part in parts):
+        results = [part["functionResponse"]["response"] for part in parts if "functionResponse" in part]
+        return [{"text": f"Según el inventario: {json.dumps(results, ensure_ascii=False)[:200]}. ¿Te ayudo con algo más?"}]
+
+    text = " ".join(part.get("text", "") for part in parts)
+
+    if not payload.get("tools"):
+        return [{"text": "Resumen: el cliente consultó productos de tecnología."}]
+
+    product_ids = PRODUCT_ID_PATTERN.findall(text)
+    if product_ids:
+        return [
+            {"functionCall": {"name": "verificar_stock", "args": {"product_id": pid.upper()}}}
+            for pid in product_ids[:3]
+        ]
+
+    lowered = text.lower()
+    if any(word in lowered for word in SEARCH_WORDS):
+        query = lowered.split()[-1].strip("¿?¡!.,")
+        return [{"functionCall": {"name": "buscar_productos", "args": {"query": query, "limit": 5}}}]
+
+    return [{"text": "¡Hola! Soy el asistente de la tienda. Puedo ayudarte con stock, precios y recomendaciones."}]
+
+
+def usage(payload: Dict[str, Any], parts: List[Dict[str, Any]]) -> Dict[str, int]:
+    """usageMetadata simulado"""
+    prompt = estimate_tokens(payload)
+    completion = len(json.dumps(parts, ensure_ascii=False)) // 4 + 1
+    return {
+        "promptTokenCount": prompt,
+        "candidatesTokenCount": completion,
+        "totalTokenCount": prompt + completion
+    }
+
+
+async def simulate_latency():
+    await asyncio.sleep((LATENCY_MS + random.uniform(0, JITTER_MS)) / 1000)
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate(model_action: str, request: Request):
+    """generateContent y streamGenerateContent (?alt=sse)"""
+    payload = await request.json()
+    parts = script_parts(payload)
+
+    if model_action.endswith(":streamGenerateContent"):
+        stats["stream_calls"] += 1
+        return StreamingResponse(stream_chunks(payload, parts), media_type="text/event-stream")
+
+    stats["calls"] += 1
+    await simulate_latency()
+    return {
+        "candidates": [{"content": {"role": "model", "parts": parts}}],
+        "usageMetadata": usage(payload, parts)
+    }
+
+
+async def stream_chunks(payload: Dict[str, Any], parts: List[Dict[str, Any]]):
+    """Emite la respuesta en fragmentos SSE; el último incluye usageMetadata"""
+    await simulate_latency()
+
+    chunks: List[List[Dict[str, Any]]] = []
+    for part in parts:
+        if "text" in part:
+            words = part["text"].split(" ")
+            chunks.extend([{"text": " ".join(words[i:i + 4]) + " "}] for i in range(0, len(words), 4))
+        else:
+            chunks.append([part])
+
+    for i, chunk_parts in enumerate(chunks):
+        chunk = {"candidates": [{"content": {"role": "model", "parts": chunk_parts}}]}
+        if i == len(chunks) - 1:
+            chunk["usageMetadata"] = usage(payload, parts)
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(CHUNK_DELAY_MS / 1000)
+
+
+@app.get("/stats")
+async def get_stats():
+    """Llamadas recibidas (útil para contar round-trips por petición)"""
+    return stats
@@ -0,0 +1,174 @@
+"""
+Load driver - Genera carga concurrente sobre /api/chat y los endpoints de productos
+Reporta por escenario: peticiones, errores, RPS, latencia p50/p95/p99 y tokens por petición
+
+Uso:
+    python benchmarks/load_driver.py --scenario all --concurrency 20 --duration 30
+    python benchmarks/load_driver.py --scenario chat --requests 500 --json results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Mensajes de chat: camino rápido, tool calling de stock, búsqueda y conversación simple
+CHAT_MESSAGES = [
+    "¿hay stock de S001?",
+    "precio de M005",
+    "¿Qué me recomiendas entre M005 y M006 para diseño gráfico?",
+    "busca monitores",
+    "¿tienen audífonos?",
+    "Hola, ¿qué tipo de productos venden?",
+]
+
+PRODUCT_IDS = ["S001", "T010", "M001", "W002", "H003", "M005", "M006", "M007"]
+SEARCH_TERMS = ["monitor", "teclado", "silla", "mouse", "audifonos", "webcam"]
+
+
+def build_requests(scenario: str, orchestrator_url: str, products_url: str) -> List[Dict[str, Any]]:
+    """Plantillas de petición del escenario (nombre, método, URL y cuerpo)"""
+    chat = [
+        {"name": "POST /api/chat", "method": "POST", "url": f"{orchestrator_url}/api/chat",
+         "json": {"message": message}}
+        for message in CHAT_MESSAGES
+    ]
+    products = [
+        {"name": "GET /api/products/", "method": "GET", "url": f"{products_url}/api/products/?limit=50"},
+        *[
+            {"name": "GET /api/products/{id}", "method": "GET", "url": f"{products_url}/api/products/{pid}"}
+            for pid in PRODUCT_IDS
+        ],
+        *[
+            {"name": "GET /api/products/search/query", "method": "GET",
+             "url": f"{products_url}/api/products/search/query?q={term}"}
+            for term in SEARCH_TERMS
+        ],
+        {"name": "POST /api/products/batch", "method": "POST", "url": f"{products_url}/api/products/batch",
+         "json": {"ids": PRODUCT_IDS}},
+        {"name": "GET /api/products/summary/catalog", "method": "GET",
+         "url": f"{products_url}/api/products/summary/catalog"},
+    ]
+
+    if scenario == "chat":
+        return chat
+    if scenario == "products":
+        return products
+    return chat + products
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Results:
+    """Latencias, errores y tokens acumulados por escenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.tokens: Dict[str, int] = {}
+
+    def record(self, name: str, latency: float, ok: bool, tokens: int = 0):
+        self.latencies.setdefault(name, []).append(latency)
+        self.errors[name] = self.errors.get(name, 0) + (0 if ok else 1)
+        self.tokens[name] = self.tokens.get(name, 0) + tokens
+
+    def summary(self, elapsed: float) -> List[Dict[str, Any]]:
+        rows = []
+        for name, latencies in sorted(self.latencies.items()):
+            rows.append({
+                "endpoint": name,
+                "requests": len(latencies),
+                "errors": self.errors[name],
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "tokens_per_request": round(self.tokens[name] / len(latencies), 1)
+            })
+        return rows
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    templates: List[Dict[str, Any]],
+    results: Results,
+    counter: "itertools.count[int]",
+    max_requests: Optional[int],
+    deadline: float
+):
+    """Envía peticiones hasta agotar el número o el tiempo"""
+    while time.monotonic() < deadline:
+        if max_requests is not None and next(counter) >= max_requests:
+            return
+
+        template = random.choice(templates)
+        start = time.perf_counter()
+        tokens = 0
+        try:
+            response = await client.request(template["method"], template["url"], json=template.get("json"))
+            ok = response.status_code < 400
+            if ok and template["name"] == "POST /api/chat":
+                tokens = (response.json().get("tokens_used") or {}).get("total_tokens", 0)
+        except httpx.HTTPError:
+            ok = False
+        results.record(template["name"], time.perf_counter() - start, ok, tokens)
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    templates = build_requests(args.scenario, args.orchestrator_url, args.products_url)
+    results = Results()
+    counter = itertools.count()
+    duration = args.duration if args.requests is None else float("inf")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.monotonic()
+        await asyncio.gather(*(
+            worker(client, templates, results, counter, args.requests, start + duration)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - start
+
+    rows = results.summary(elapsed)
+    total = sum(row["requests"] for row in rows)
+    print(f"\n📊 {total} peticiones en {elapsed:.1f}s ({total / elapsed:.1f} RPS) - concurrencia {args.concurrency}\n")
+    print(f"{'endpoint':<36}{'n':>7}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'tok/req':>10}")
+    for row in rows:
+        print(
+            f"{row['endpoint']:<36}{row['requests']:>7}{row['errors']:>6}{row['rps']:>9}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['tokens_per_request']:>10}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"elapsed_seconds": round(elapsed, 2), "concurrency": args.concurrency, "results": rows}, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+    return rows
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generador de carga para el orquestador y el servicio de productos")
+    parser.add_argument("--scenario", choices=["chat", "products", "all"], default="all")
+    parser.add_argument("--orchestrator-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--products-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de carga (si no se indica --requests)")
+    parser.add_argument("--requests", type=int, default=None, help="Número total de peticiones")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", default=None, help="Archivo donde guardar los resultados")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
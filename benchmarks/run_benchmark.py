@@ -0,0 +1,117 @@
+"""
+Benchmark end-to-end del stack completo en local
+1. Crea la base SQLite escalada a N productos
+2. Levanta Fake Gemini, el servicio de productos y el orquestador
+3. Ejecuta el load driver y reporta p50/p95/p99, RPS y tokens por petición
+
+Uso:
+    python benchmarks/run_benchmark.py --products 5000 --concurrency 20 --duration 30
+    python benchmarks/run_benchmark.py --scenario chat --env RESPONSE_CACHE_ENABLED=false
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+import load_driver
+from seed_sqlite import seed
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / "benchmarks"
+
+
+def start(name: str, args: list[str], cwd: Path, env: dict) -> subprocess.Popen:
+    """Lanza un servicio con uvicorn"""
+    print(f"🚀 Iniciando {name}...")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--log-level", "warning"],
+        cwd=cwd,
+        env={**os.environ, **env}
+    )
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    """Espera a que el servicio esté listo (calentamiento terminado)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servicio no respondió a tiempo: {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end con Fake Gemini y SQLite")
+    parser.add_argument("--products", type=int, default=1000, help="Productos en la base SQLite")
+    parser.add_argument("--db", default="/tmp/bench_products.db")
+    parser.add_argument("--gemini-latency-ms", type=float, default=300)
+    parser.add_argument("--gemini-port", type=int, default=8090)
+    parser.add_argument("--products-port", type=int, default=8000)
+    parser.add_argument("--orchestrator-port", type=int, default=8001)
+    parser.add_argument(
+        "--env", action="append", default=[],
+        help="Variable extra para el orquestador (KEY=VALUE, repetible)"
+    )
+    args, driver_args = parser.parse_known_args()
+
+    seed(args.db, args.products)
+
+    orchestrator_env = {
+        "GEMINI_API_KEY": "benchmark",
+        "GEMINI_API_URL": f"http://127.0.0.1:{args.gemini_port}/v1beta/models",
+        "PRODUCTS_API_URL": f"http://127.0.0.1:{args.products_port}/api",
+        **dict(item.split("=", 1) for item in args.env)
+    }
+
+    processes = [
+        start(
+            "Fake Gemini",
+            ["fake_gemini:app", "--port", str(args.gemini_port)],
+            BENCH_DIR,
+            {"FAKE_GEMINI_LATENCY_MS": str(args.gemini_latency_ms)}
+        ),
+        start(
+            "servicio de productos",
+            ["app.main:app", "--port", str(args.products_port)],
+            ROOT / "back_expo_products",
+            {"DATABASE_URL": f"sqlite:///{args.db}"}
+        ),
+        start(
+            "orquestador",
+            ["app.main:app", "--port", str(args.orchestrator_port)],
+            ROOT / "back_expo_orchestrator",
+            orchestrator_env
+        ),
+    ]
+
+    try:
+        wait_ready(f"http://127.0.0.1:{args.gemini_port}/stats")
+        wait_ready(f"http://127.0.0.1:{args.products_port}/ready")
+        wait_ready(f"http://127.0.0.1:{args.orchestrator_port}/ready")
+
+        driver = load_driver.parse_args([
+            "--orchestrator-url", f"http://127.0.0.1:{args.orchestrator_port}",
+            "--products-url", f"http://127.0.0.1:{args.products_port}",
+            *driver_args
+        ])
+        asyncio.run(load_driver.run(driver))
+
+        gemini_stats = httpx.get(f"http://127.0.0.1:{args.gemini_port}/stats").json()
+        print(f"\n🤖 Llamadas a Fake Gemini: {gemini_stats}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
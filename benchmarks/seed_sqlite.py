@@ -0,0 +1,85 @@
+"""
+Crea una base SQLite para el benchmark con el catálogo de seed_products.sql
+escalado a N productos (las copias reciben IDs "S001-2", "S001-3", ...)
+
+Uso:
+    python benchmarks/seed_sqlite.py --products 5000 --db /tmp/bench_products.db
+"""
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PRODUCTS_DIR = ROOT / "back_expo_products"
+SEED_FILE = PRODUCTS_DIR / "seed_products.sql"
+
+# ('S001', 'Nombre', 'Descripción', 299.99, 15)
+ROW_PATTERN = re.compile(
+    r"\('([^']*)',\s*'((?:[^']|'')*)',\s*'((?:[^']|'')*)',\s*([\d.]+),\s*(\d+)\)"
+)
+
+
+def load_seed_rows() -> list[dict]:
+    """Productos definidos en seed_products.sql"""
+    rows = []
+    for pid, name, description, price, stock in ROW_PATTERN.findall(SEED_FILE.read_text(encoding="utf-8")):
+        rows.append({
+            "id": pid,
+            "name": name.replace("''", "'"),
+            "description": description.replace("''", "'"),
+            "price": float(price),
+            "stock": int(stock)
+        })
+    return rows
+
+
+def scale_rows(rows: list[dict], total: int) -> list[dict]:
+    """Repite el catálogo base hasta llegar a total productos"""
+    scaled = []
+    for i in range(total):
+        base = rows[i % len(rows)]
+        copy = i // len(rows)
+        if copy == 0:
+            scaled.append(dict(base))
+            continue
+        scaled.append({
+            **base,
+            "id": f"{base['id']}-{copy + 1}",
+            "name": f"{base['name']} #{copy + 1}",
+            "stock": (base["stock"] + copy) % 100
+        })
+    return scaled
+
+
+def seed(db_path: str, total: int):
+    """Crea el esquema del servicio de productos y carga los productos"""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    # El servicio de productos lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, str(PRODUCTS_DIR))
+    from app.database import engine, SessionLocal
+    from app.models.product import Product
+    from app.schema import create_schema
+
+    create_schema(engine)
+
+    rows = scale_rows(load_seed_rows(), total)
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(Product, rows)
+        db.commit()
+
+    # Los triggers de FTS indexan las filas insertadas
+    engine.dispose()
+    print(f"✅ {len(rows)} productos cargados en {db_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Base SQLite para el benchmark")
+    parser.add_argument("--products", type=int, default=1000, help="Número de productos")
+    parser.add_argument("--db", default="/tmp/bench_products.db", help="Ruta del archivo SQLite")
+    args = parser.parse_args()
+    seed(args.db, args.products)
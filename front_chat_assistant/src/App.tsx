@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react';
-import { sendMessage, checkHealth, type Message as OrchestratorMessage } from './services/orchestrator';
+import { sendMessageStream, checkHealth, type Message as OrchestratorMessage } from './services/orchestrator';
 import { type Message } from './types/demo';
 import { 
   ChatHeader, 
@@ -16,6 +16,8 @@ const App: React.FC = () => {
   const [orchestratorReady, setOrchestratorReady] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const chatEndRef = useRef<HTMLDivElement>(null);
+  // Sesión en el orquestador: el historial se guarda en el servidor
+  const sessionIdRef = useRef<string | null>(null);
 
   // Verificar que el orquestador esté disponible
   useEffect(() => {
@@ -58,20 +60,43 @@ const App: React.FC = () => {
         content: msg.text
       }));
       
-      // Llamar al microservicio orquestador
-      const response = await sendMessage(userMessage.text, conversationHistory);
+      // Burbuja del bot que se completa a medida que llegan los tokens
+      const botTimestamp = new Date();
+      let botText = '';
+      const renderBotText = () => {
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          const botMessage: Message = { sender: 'bot', text: botText, timestamp: botTimestamp };
+          if (last?.sender === 'bot' && last.timestamp === botTimestamp) {
+            return [...prev.slice(0, -1), botMessage];
+          }
+          return [...prev, botMessage];
+        });
+      };
+      
+      // Llamar al microservicio orquestador en streaming
+      const response = await sendMessageStream(userMessage.text, conversationHistory, {
+        onToken: (token) => {
+          botText += token;
+          renderBotText();
+        },
+        onToolCallStart: (name, args) => console.log('🔧 Ejecutando función:', name, args),
+        onToolCallEnd: (name, result) => console.log('✅ Resultado de', name, result),
+      }, sessionIdRef.current);
+      
+      if (response.session_id) {
+        sessionIdRef.current = response.session_id;
+      }
       
       console.log('📊 Tokens usados:', response.tokens_used);
       if (response.functions_called && response.functions_called.length > 0) {
         console.log('🔧 Funciones ejecutadas:', response.functions_called);
       }
       
-      const botMessage: Message = { 
-        sender: 'bot', 
-        text: response.response,
-        timestamp: new Date()
-      };
-      setMessages(prev => [...prev, botMessage]);
+      if (!botText) {
+        botText = response.response;
+        renderBotText();
+      }
       
     } catch (error) {
       console.error("Error durante la orquestación full stack:", error);
@@ -116,7 +141,7 @@ const App: React.FC = () => {
             <MessageBubble key={index} message={msg} />
           ))}
           
-          {isLoading && <LoadingIndicator />}
+          {isLoading && messages[messages.length - 1]?.sender !== 'bot' && <LoadingIndicator />}
           <div ref={chatEndRef} />
         </main>
 
@@ -13,6 +13,8 @@ export interface Message {
 export interface ChatRequest {
   message: string;
   conversation_history: Message[];
+  session_id?: string;
+  use_session?: boolean;
 }
 
 export interface FunctionCall {
@@ -29,6 +31,7 @@ export interface ChatResponse {
     completion_tokens: number;
     total_tokens: number;
   };
+  session_id?: string | null;
 }
 
 /**
@@ -62,6 +65,94 @@ export async function sendMessage(
   }
 }
 
+export interface StreamHandlers {
+  onToken?: (text: string) => void;
+  onToolCallStart?: (name: string, args: Record<string, any>) => void;
+  onToolCallEnd?: (name: string, result: any) => void;
+}
+
+/**
+ * Envía un mensaje al orquestador y procesa la respuesta en streaming (SSE)
+ * Los handlers se invocan a medida que llegan los eventos
+ *
+ * Modo sesión: sin sessionId se inicia una sesión (se envía el historial una
+ * sola vez); con sessionId solo se envía el mensaje nuevo
+ */
+export async function sendMessageStream(
+  message: string,
+  conversationHistory: Message[],
+  handlers: StreamHandlers,
+  sessionId?: string | null
+): Promise<ChatResponse> {
+  const response = await fetch(`${ORCHESTRATOR_URL}/api/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify((
+      sessionId
+        ? { message, conversation_history: [], session_id: sessionId }
+        : { message, conversation_history: conversationHistory, use_session: true }
+    ) as ChatRequest)
+  });
+
+  if (!response.ok || !response.body) {
+    const errorText = await response.text();
+    throw new Error(`Error del orquestador: ${response.status} - ${errorText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  let final: Omit<ChatResponse, 'response'> = {};
+
+  const handleEvent = (rawEvent: string) => {
+    let eventName = 'message';
+    let data = '';
+    for (const line of rawEvent.split('\n')) {
+      if (line.startsWith('event:')) eventName = line.slice(6).trim();
+      else if (line.startsWith('data:')) data += line.slice(5).trim();
+    }
+    if (!data) return;
+    const payload = JSON.parse(data);
+
+    switch (eventName) {
+      case 'token':
+        text += payload.text;
+        handlers.onToken?.(payload.text);
+        break;
+      case 'tool_call_start':
+        handlers.onToolCallStart?.(payload.name, payload.args);
+        break;
+      case 'tool_call_end':
+        handlers.onToolCallEnd?.(payload.name, payload.result);
+        break;
+      case 'done':
+        final = payload;
+        break;
+      case 'error':
+        throw new Error(payload.detail);
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let separator = buffer.indexOf('\n\n');
+    while (separator !== -1) {
+      handleEvent(buffer.slice(0, separator));
+      buffer = buffer.slice(separator + 2);
+      separator = buffer.indexOf('\n\n');
+    }
+  }
+
+  return { response: text, ...final };
+}
+
 /**
  * Reinicia la conversación (limpia caché)
  */